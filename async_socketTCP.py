@@ -0,0 +1,801 @@
+from __future__ import annotations
+import asyncio
+import socket
+import struct
+import time
+from collections import deque
+from random import randint
+from typing import Callable
+from congestion_control import CongestionControl, RenoCongestionControl
+from socketTCP import SocketTCP
+from utilities import (
+  HeaderTCP, PendingHandshake, RTOEstimator, BINARY_HEADER, BINARY_HEADER_VERSION,
+  BINARY_NEGOTIATION_FLAG, MSS_OPTION, MSS_VALUE, encode_options, seq_add, seq_diff
+)
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+  """Protocolo de asyncio que entrega los datagramas recibidos por un
+  endpoint udp al AsyncSocketTCP dueño del endpoint.
+  """
+
+  def __init__(
+    self, on_datagram: Callable[[bytes, tuple[str, int]], None],
+    on_lost: Callable[[Exception | None], None]
+  ):
+    self.__on_datagram = on_datagram
+    self.__on_lost = on_lost
+
+  def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+    self.__on_datagram(data, addr)
+
+  def error_received(self, exc: Exception) -> None:
+    # Los errores de envío (por ejemplo un ICMP port unreachable) se
+    # manejan igual que una pérdida: con retransmisiones
+    pass
+
+  def connection_lost(self, exc: Exception | None) -> None:
+    self.__on_lost(exc)
+
+
+class AsyncSocketTCP:
+  """Variante de SocketTCP para asyncio: en lugar de bloquear en recvfrom,
+  cada socket recibe sus datagramas a través de un endpoint creado con
+  loop.create_datagram_endpoint, y sus operaciones son corrutinas. Los
+  timers de retransmisión se programan en el event loop, por lo que un
+  único hilo puede atender miles de conexiones a la vez.
+
+  El handshake, los números de secuencia, el formato de los segmentos y
+  las variantes de ventana deslizante son los mismos de SocketTCP, por lo
+  que ambas clases pueden conectarse entre sí.
+  """
+
+  GO_BACK_N: str = SocketTCP.GO_BACK_N
+  SELECTIVE_REPEAT: str = SocketTCP.SELECTIVE_REPEAT
+  MAX_RETRANSMISSIONS: int = SocketTCP.MAX_RETRANSMISSIONS
+  MAX_FIN_RETRANSMISSIONS: int = SocketTCP.MAX_FIN_RETRANSMISSIONS
+  MAX_RECENT_SYNS: int = SocketTCP.MAX_RECENT_SYNS
+
+  def __init__(
+    self, window_size: int = 1, mode: str = GO_BACK_N, binary_header: bool = True,
+    congestion_control: Callable[[], CongestionControl] = RenoCongestionControl,
+    mss: int | None = None
+  ):
+    """Constructor de AsyncSocketTCP. El endpoint udp se crea al llamar a
+    bind o connect, pues requiere un event loop corriendo.
+
+    Parameters:
+    -----------
+    Los mismos de SocketTCP.
+    """
+    if window_size < 1:
+      raise ValueError("window_size must be at least 1")
+    if mode not in (self.GO_BACK_N, self.SELECTIVE_REPEAT):
+      raise ValueError(f"Unknown sliding window mode: {mode}")
+    if mss is not None and not 1 <= mss <= SocketTCP.MAX_MSS:
+      raise ValueError(f"mss must be between 1 and {SocketTCP.MAX_MSS}")
+
+    self.__transport: asyncio.DatagramTransport | None = None
+    self.__window_size: int = window_size
+    self.__mode: str = mode
+
+    # MSS configurado por el usuario, y el negociado para la conexión
+    self.__configured_mss: int | None = mss
+    self.__mss: int = SocketTCP.LEGACY_MSS
+
+    # Control de congestión de la conexión
+    self.__congestion_control_factory = congestion_control
+    self.__congestion: CongestionControl = congestion_control()
+
+    # Si se soporta el header binario, y si fue negociado en la conexión
+    self.__binary_supported: bool = binary_header
+    self.__binary_header: bool = False
+    self.__conn_id: int = 0
+
+    # Estado del receptor (ver SocketTCP)
+    self.__bytes_left_to_recv: int = 0
+    self.__expecting_length: bool = True
+    self.__recv_buffer: bytearray = bytearray()
+    self.__out_of_order: dict[int, bytes] = {}
+
+    # Timeout de las operaciones fijado por el usuario y estimador del RTO
+    self.__timeout: float | None = None
+    self.__rto: RTOEstimator = RTOEstimator()
+    self.__handshake_ack: bytes | None = None
+
+    # Datagramas recibidos aún no procesados, el future que despierta a la
+    # corrutina que espera uno, y el error con que se cerró el endpoint
+    self.__inbox: deque[tuple[bytes, tuple[str, int]]] = deque()
+    self.__waiter: asyncio.Future | None = None
+    self.__lost: Exception | None = None
+
+    # Estado de un socket que escucha (ver listen), y, para una conexión
+    # aceptada por él, el socket que escucha y su llave en el demultiplexor
+    self.__backlog: int = 0
+    self.__connections: dict[tuple[tuple[str, int], int], AsyncSocketTCP] | None = None
+    self.__handshakes: dict[tuple[tuple[str, int], int], PendingHandshake] = {}
+    self.__handshake_timers: dict[tuple[tuple[str, int], int], asyncio.TimerHandle] = {}
+    self.__accept_queue: asyncio.Queue[AsyncSocketTCP] | None = None
+    self.__recent_syns: dict[tuple[tuple[str, int], int], None] = {}
+    self.__next_conn_id: int = 0
+    self.__listener: AsyncSocketTCP | None = None
+    self.__demux_key: tuple[tuple[str, int], int] | None = None
+
+  @property
+  def rto(self) -> float:
+    """RTO actual de la conexión, en segundos."""
+    return self.__rto.rto
+
+  @property
+  def srtt(self) -> float | None:
+    """RTT suavizado de la conexión, en segundos (None sin muestras)."""
+    return self.__rto.srtt
+
+  @property
+  def mss(self) -> int:
+    """MSS negociado para la conexión, en bytes."""
+    return self.__mss
+
+  @property
+  def cwnd(self) -> float:
+    """Ventana de congestión actual de la conexión, en segmentos."""
+    return self.__congestion.cwnd
+
+  def settimeout(self, timeout_in_seconds: float | None) -> None:
+    """Fija el tiempo máximo de espera de accept y recv. None espera sin
+    límite.
+
+    Parameters:
+    -----------
+    timeout_in_seconds (float | None): Timeout en segundos.
+    """
+    self.__timeout = timeout_in_seconds
+
+  async def bind(self, address: tuple[str, int]) -> None:
+    """Crea el endpoint udp del socket asociado a address.
+
+    Parameters:
+    -----------
+    address (tuple[str, int]): Dirección a la cual asociar el socket.
+    """
+    loop = asyncio.get_running_loop()
+    self.__transport, _ = await loop.create_datagram_endpoint(
+      lambda: _DatagramProtocol(self.__datagram_received, self.__connection_lost),
+      local_addr=address
+    )
+    self.address = self.__transport.get_extra_info("sockname")[:2]
+
+  def listen(self, backlog: int = 16) -> None:
+    """Pone al socket (ya asociado con bind) a escuchar conexiones. Al
+    igual que SocketTCP.listen, todas las conexiones comparten el endpoint
+    udp del socket, y sus datagramas se reparten según (dirección de
+    origen, identificador de conexión).
+
+    Parameters:
+    -----------
+    backlog (int): Cantidad máxima de conexiones en handshake o esperando
+                   ser aceptadas.
+    """
+    if backlog < 1:
+      raise ValueError("backlog must be at least 1")
+    if self.__transport is None:
+      raise OSError("socket must be bound before listening")
+    if self.__connections is not None:
+      return
+
+    # Todas las conexiones reciben por este endpoint, por lo que agrandamos
+    # el buffer del socket udp para que quepan sus ventanas
+    rcvbuf = backlog * self.__window_size * (SocketTCP.DEFAULT_MSS + BINARY_HEADER.size)
+    sock = self.__transport.get_extra_info("socket")
+    try:
+      if sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF) < rcvbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    except OSError:
+      pass
+
+    self.__backlog = backlog
+    self.__connections = {}
+    self.__accept_queue = asyncio.Queue()
+    self.__next_conn_id = randint(1, 0xFFFF)
+
+  async def accept(self) -> tuple[AsyncSocketTCP, tuple[str, int]]:
+    """Retira la próxima conexión establecida por un socket que escucha.
+
+    Returns:
+    --------
+    (tuple[AsyncSocketTCP, tuple[str, int]]): Conexión aceptada y dirección
+                                              donde se encuentra escuchando.
+
+    Raises:
+    -------
+    socket.timeout: Si no se establece una conexión antes del timeout.
+    """
+    if self.__connections is None:
+      raise OSError("socket is not listening")
+    try:
+      new_socketTCP = await asyncio.wait_for(self.__accept_queue.get(), self.__timeout)
+    except asyncio.TimeoutError:
+      raise socket.timeout("timed out") from None
+    return new_socketTCP, new_socketTCP.address
+
+  async def connect(self, address: tuple[str, int]) -> None:
+    """Implementa el lado del cliente del 3-way handshake, igual que
+    SocketTCP.connect. Si el socket no fue asociado con bind, se crea un
+    endpoint en un puerto cualquiera.
+
+    Parameters:
+    -----------
+    address (tuple[str, int]): Dirección del socket que escucha.
+
+    Raises:
+    -------
+    socket.timeout: Si el servidor no responde tras MAX_RETRANSMISSIONS
+                    retransmisiones del SYN.
+    """
+    if self.__transport is None:
+      await self.bind(("0.0.0.0", 0))
+
+    # El SYN va en texto, ofreciendo el header binario y nuestro MSS
+    seq = randint(0, 100)
+    local_mss = self.__configured_mss or SocketTCP.route_mss(address)
+    fst_msg = SocketTCP.generate_header(HeaderTCP(True, False, False, seq)).encode()
+    if self.__binary_supported:
+      syn_options = encode_options({MSS_OPTION: MSS_VALUE.pack(local_mss)})
+      fst_msg += BINARY_NEGOTIATION_FLAG + syn_options.hex().encode()
+
+    response = await self.__send_and_wait(
+      fst_msg, address,
+      lambda header, data, _: header == HeaderTCP(True, True, False, seq_add(seq, 1))
+    )
+    if response is None:
+      raise socket.timeout("Connection timed out while waiting for SYN+ACK")
+    server_response, server_response_header, transmitter_addr = response
+
+    # Un SYN+ACK binario acepta el header binario, trae el MSS del servidor
+    # y el identificador de la conexión
+    self.__binary_header = server_response[0] == BINARY_HEADER_VERSION
+    if self.__binary_header:
+      _, server_response_data = SocketTCP.parse_segment(server_response)
+      self.__mss = min(local_mss, SocketTCP.peer_mss(server_response_data))
+      self.__conn_id = server_response_header.conn_id
+
+    # Respondemos ACK, guardándolo por si se retransmite el SYN+ACK
+    self.seq = seq_add(seq, 2)
+    self.__handshake_ack = self.__build_segment(HeaderTCP(False, True, False, self.seq))
+    self.conn_sock_addr = transmitter_addr
+    self.__sendto(transmitter_addr, self.__handshake_ack)
+
+  async def send(self, msg: str | bytes | memoryview) -> None:
+    """Envía un mensaje con ventana deslizante (Go-Back-N o Selective
+    Repeat según el modo del socket), igual que SocketTCP.send.
+
+    Parameters:
+    -----------
+    msg (str | bytes | memoryview): Mensaje a enviar. Si es un str se
+                                    codifica en UTF-8.
+
+    Raises:
+    -------
+    socket.timeout: Si se agotan las retransmisiones sin recibir un ACK.
+    """
+    if isinstance(msg, str):
+      msg = msg.encode()
+    msg_view = memoryview(msg).cast("B")
+
+    # Largo del mensaje seguido por trozos de a lo más MSS bytes, con el
+    # número de secuencia de cada uno y el del ACK que lo confirma
+    mss = self.__mss
+    segments = [memoryview(str(len(msg_view)).encode())]
+    segments += [msg_view[i:i + mss] for i in range(0, len(msg_view), mss)]
+    seqs = []
+    ack_seqs = []
+    seq = self.seq
+    for segment in segments:
+      seqs.append(seq)
+      seq = seq_add(seq, len(segment))
+      ack_seqs.append(seq)
+    acks_to_index = {ack_seq: i for i, ack_seq in enumerate(ack_seqs)}
+
+    base = 0
+    next_to_send = 0
+    sent = 0
+    acked = [False] * len(segments)
+    sent_at = [0.0] * len(segments)
+    retransmitted = [False] * len(segments)
+    deadlines = [0.0] * len(segments)
+    timer = None
+    retransmissions = 0
+    while base < len(segments):
+
+      # Enviamos todos los segmentos que caben en la ventana
+      window = max(int(min(self.__window_size, self.__congestion.cwnd)), 1)
+      now = time.monotonic()
+      while next_to_send < len(segments) and next_to_send < base + window:
+        if not acked[next_to_send]:
+          self.__send_data_segment(seqs[next_to_send], segments[next_to_send])
+          if next_to_send < sent:
+            retransmitted[next_to_send] = True
+          else:
+            sent_at[next_to_send] = now
+            sent = next_to_send + 1
+          deadlines[next_to_send] = now + self.__rto.rto
+          if timer is None:
+            timer = now + self.__rto.rto
+        next_to_send += 1
+
+      # Esperamos respuesta hasta que venza el próximo timer
+      if self.__mode == self.GO_BACK_N:
+        deadline = timer
+      else:
+        deadline = min(deadlines[i] for i in range(base, next_to_send) if not acked[i])
+
+      try:
+        recvd_msg, transmitter_address = await self.__recvfrom(self.__time_until(deadline))
+        recvd_msg_header, _ = SocketTCP.parse_segment(recvd_msg)
+
+      # Si vence el timer retransmitimos como en SocketTCP.send
+      except socket.timeout:
+        if retransmissions == self.MAX_RETRANSMISSIONS:
+          raise socket.timeout("Connection timed out while waiting for ACK")
+        retransmissions += 1
+        self.__rto.backoff()
+        self.__congestion.on_timeout(next_to_send - base)
+        if self.__mode == self.GO_BACK_N:
+          next_to_send = base
+          timer = None
+        else:
+          window = max(int(min(self.__window_size, self.__congestion.cwnd)), 1)
+          now = time.monotonic()
+          for i in range(base, next_to_send):
+            if acked[i] or deadlines[i] > now:
+              continue
+            if i < base + window:
+              self.__send_data_segment(seqs[i], segments[i])
+              retransmitted[i] = True
+            deadlines[i] = now + self.__rto.rto
+        continue
+
+      except (struct.error, ValueError, IndexError):
+        continue
+
+      # Reenviamos el ACK del handshake si se retransmitió el SYN+ACK
+      if recvd_msg_header.syn and recvd_msg_header.ack and self.__handshake_ack is not None:
+        self.__sendto(transmitter_address, self.__handshake_ack)
+        continue
+
+      if recvd_msg_header.syn or recvd_msg_header.fin or not recvd_msg_header.ack:
+        continue
+
+      # ACK duplicado en Go-Back-N
+      if self.__mode == self.GO_BACK_N and recvd_msg_header.seq == seqs[base] and base < next_to_send:
+        if self.__congestion.on_dup_ack(next_to_send - base):
+          self.__send_data_segment(seqs[base], segments[base])
+          retransmitted[base] = True
+          timer = time.monotonic() + self.__rto.rto
+        continue
+
+      i = acks_to_index.get(recvd_msg_header.seq)
+      if i is None or i < base or i >= next_to_send or acked[i]:
+        continue
+
+      now = time.monotonic()
+      if not retransmitted[i]:
+        self.__rto.add_sample(now - sent_at[i])
+      retransmissions = 0
+
+      if self.__mode == self.GO_BACK_N:
+        for j in range(base, i + 1):
+          acked[j] = True
+      else:
+        acked[i] = True
+
+      old_base = base
+      while base < len(segments) and acked[base]:
+        base += 1
+      timer = now + self.__rto.rto if base < next_to_send else None
+
+      if base > old_base:
+        self.__rto.reset_backoff()
+        self.__congestion.on_ack(base - old_base)
+      elif self.__congestion.on_dup_ack(next_to_send - base):
+        self.__send_data_segment(seqs[base], segments[base])
+        retransmitted[base] = True
+        deadlines[base] = now + self.__rto.rto
+
+    self.seq = seq
+
+  async def recv(self, buff_size: int) -> bytes:
+    """Recibe a lo más buff_size bytes del mensaje actual, igual que
+    SocketTCP.recv.
+
+    Parameters:
+    -----------
+    buff_size (int): Cantidad máxima de bytes a recibir.
+
+    Returns:
+    --------
+    (bytes): Datos recibidos. Es b"" si el otro extremo cerró la conexión.
+
+    Raises:
+    -------
+    socket.timeout: Si no llegan datos antes del timeout.
+    """
+    while True:
+      msg_finished = not self.__expecting_length and self.__bytes_left_to_recv == 0
+      if len(self.__recv_buffer) >= buff_size or msg_finished:
+        break
+
+      last_recvd_msg, transmitter_address = await self.__recvfrom(self.__timeout)
+      try:
+        last_recvd_msg_header, last_recvd_msg_data = SocketTCP.parse_segment(last_recvd_msg)
+      except (struct.error, ValueError, IndexError):
+        continue
+
+      # El otro extremo cierra la conexión: respondemos FIN+ACK hasta
+      # recibir su ACK, o hasta agotar las retransmisiones
+      if last_recvd_msg_header == HeaderTCP(False, False, True, self.seq):
+        fin_ack_msg = self.__build_segment(HeaderTCP(False, True, True, seq_add(self.seq, 1)))
+        await self.__send_and_wait(
+          fin_ack_msg, transmitter_address,
+          lambda header, data, _: header == HeaderTCP(False, True, False, seq_add(self.seq, 2)),
+          self.MAX_FIN_RETRANSMISSIONS
+        )
+        self.__release()
+        return b""
+
+      if last_recvd_msg_header.syn and last_recvd_msg_header.ack and self.__handshake_ack is not None:
+        self.__sendto(transmitter_address, self.__handshake_ack)
+        continue
+
+      if last_recvd_msg_header.syn or last_recvd_msg_header.ack or last_recvd_msg_header.fin:
+        continue
+
+      self.__process_data_segment(
+        last_recvd_msg_header.seq, last_recvd_msg_data, transmitter_address
+      )
+
+    recvd_total_msg = bytes(self.__recv_buffer[:buff_size])
+    del self.__recv_buffer[:len(recvd_total_msg)]
+    if not self.__expecting_length and self.__bytes_left_to_recv == 0 and len(self.__recv_buffer) == 0:
+      self.__expecting_length = True
+      self.__deliver_out_of_order()
+    return recvd_total_msg
+
+  async def close(self) -> None:
+    """Cierra la conexión desde este extremo, igual que SocketTCP.close.
+    En un socket que escucha se cierra el endpoint udp, lo que termina
+    todas sus conexiones.
+    """
+    if self.__connections is not None:
+      self.__transport.close()
+      return
+
+    fin_msg_to_send = self.__build_segment(HeaderTCP(False, False, True, self.seq))
+
+    def is_fin_ack(header: HeaderTCP, data: memoryview, address: tuple[str, int]) -> bool:
+      # Reconfirmamos los segmentos de datos duplicados
+      if not header.syn and not header.ack and not header.fin and seq_diff(header.seq, self.seq) < 0:
+        self.__process_data_segment(header.seq, data, address)
+        return False
+      return header == HeaderTCP(False, True, True, seq_add(self.seq, 1))
+
+    response = await self.__send_and_wait(
+      fin_msg_to_send, self.conn_sock_addr, is_fin_ack, self.MAX_FIN_RETRANSMISSIONS
+    )
+    if response is not None:
+      self.__sendto(
+        self.conn_sock_addr, self.__build_segment(HeaderTCP(False, True, False, seq_add(self.seq, 2)))
+      )
+    self.__release()
+
+  def __build_segment(self, header: HeaderTCP, data: bytes = b"") -> bytes:
+    """Construye un segmento en el formato negociado para la conexión."""
+    if self.__binary_header:
+      header.conn_id = self.__conn_id
+      return SocketTCP.generate_binary_header(
+        header, len(data), self.__window_size * self.__mss
+      ) + data
+    return SocketTCP.generate_header(header).encode() + data
+
+  def __send_data_segment(self, seq: int, data: memoryview) -> None:
+    """Envía un segmento de datos con número de secuencia seq."""
+    header = HeaderTCP(False, False, False, seq)
+    if self.__binary_header:
+      header.conn_id = self.__conn_id
+      header = SocketTCP.generate_binary_header(header, len(data), self.__window_size * self.__mss)
+    else:
+      header = SocketTCP.generate_header(header).encode()
+    self.__sendto(self.conn_sock_addr, header, data)
+
+  def __process_data_segment(self, seq: int, data: bytes | memoryview, address: tuple[str, int]) -> None:
+    """Procesa un segmento de datos recibido y responde el ACK que
+    corresponde según el modo del socket (ver SocketTCP).
+    """
+    segment_ack = seq_add(seq, len(data))
+    if seq_diff(seq, self.seq) < 0:
+      ack_seq = self.seq if self.__mode == self.GO_BACK_N else segment_ack
+    elif seq == self.seq and self.__accepting_data():
+      self.__deliver(data)
+      self.__deliver_out_of_order()
+      ack_seq = self.seq if self.__mode == self.GO_BACK_N else segment_ack
+    elif self.__mode == self.GO_BACK_N:
+      ack_seq = self.seq
+    elif seq in self.__out_of_order or len(self.__out_of_order) < self.__window_size:
+      self.__out_of_order[seq] = bytes(data)
+      ack_seq = segment_ack
+    else:
+      return
+    self.__sendto(address, self.__build_segment(HeaderTCP(False, True, False, ack_seq)))
+
+  def __accepting_data(self) -> bool:
+    """Retorna si es posible entregar datos al mensaje actual."""
+    return self.__expecting_length or self.__bytes_left_to_recv > 0
+
+  def __deliver(self, data: bytes | memoryview) -> None:
+    """Entrega en orden los datos de un segmento, ya sea como el largo del
+    próximo mensaje o como parte del mensaje actual.
+    """
+    self.seq = seq_add(self.seq, len(data))
+    if self.__expecting_length:
+      self.__bytes_left_to_recv = int(bytes(data))
+      self.__expecting_length = False
+    else:
+      self.__recv_buffer += data
+      self.__bytes_left_to_recv -= len(data)
+
+  def __deliver_out_of_order(self) -> None:
+    """Entrega los segmentos guardados fuera de orden que ya son contiguos
+    a lo recibido.
+    """
+    while self.seq in self.__out_of_order and self.__accepting_data():
+      self.__deliver(self.__out_of_order.pop(self.seq))
+
+  def __sendto(self, address: tuple[str, int], *parts: bytes | memoryview) -> None:
+    """Envía un datagrama formado por la concatenación de parts. Los
+    transportes de asyncio no admiten scatter-gather, por lo que las
+    partes se concatenan.
+    """
+    if self.__transport is None or self.__transport.is_closing():
+      return
+    self.__transport.sendto(parts[0] if len(parts) == 1 else b"".join(parts), address)
+
+  async def __recvfrom(self, timeout: float | None) -> tuple[bytes, tuple[str, int]]:
+    """Espera el próximo datagrama de la conexión. El timeout se programa
+    en el event loop con call_later, sin crear tareas adicionales.
+
+    Parameters:
+    -----------
+    timeout (float | None): Tiempo máximo de espera en segundos. None
+                            espera sin límite.
+
+    Returns:
+    --------
+    (tuple[bytes, tuple[str, int]]): Datagrama recibido y dirección de origen.
+
+    Raises:
+    -------
+    socket.timeout: Si no llega nada antes de timeout.
+    OSError: Si se cerró el endpoint udp.
+    """
+    if not self.__inbox:
+      if self.__lost is not None:
+        raise self.__lost
+      loop = asyncio.get_running_loop()
+      self.__waiter = loop.create_future()
+      handle = None
+      if timeout is not None:
+        handle = loop.call_later(timeout, self.__wake, socket.timeout("timed out"))
+      try:
+        await self.__waiter
+      finally:
+        if handle is not None:
+          handle.cancel()
+        self.__waiter = None
+    return self.__inbox.popleft()
+
+  def __wake(self, exc: Exception | None = None) -> None:
+    """Despierta a la corrutina que espera un datagrama, con exc si se
+    indica.
+    """
+    if self.__waiter is None or self.__waiter.done():
+      return
+    if exc is None:
+      self.__waiter.set_result(None)
+    else:
+      self.__waiter.set_exception(exc)
+
+  @staticmethod
+  def __time_until(deadline: float) -> float:
+    """Retorna el tiempo en segundos que falta para deadline (según
+    time.monotonic), con un mínimo de un milisegundo.
+    """
+    return max(deadline - time.monotonic(), 0.001)
+
+  async def __send_and_wait(
+    self, segment: bytes, address: tuple[str, int],
+    is_response: Callable[[HeaderTCP, memoryview, tuple[str, int]], bool],
+    max_retransmissions: int | None = None
+  ) -> tuple[bytes, HeaderTCP, tuple[str, int]] | None:
+    """Envía un segmento de control y lo retransmite cada vez que vence el
+    RTO hasta recibir una respuesta que cumpla is_response, igual que en
+    SocketTCP.
+
+    Returns:
+    --------
+    (tuple[bytes, HeaderTCP, tuple[str, int]] | None): Datagrama, header y
+        dirección de origen de la respuesta, o None si se agotaron las
+        retransmisiones.
+    """
+    if max_retransmissions is None:
+      max_retransmissions = self.MAX_RETRANSMISSIONS
+
+    retransmissions = 0
+    sent_at = time.monotonic()
+    deadline = sent_at + self.__rto.rto
+    self.__sendto(address, segment)
+    while True:
+      try:
+        response, response_address = await self.__recvfrom(self.__time_until(deadline))
+        response_header, response_data = SocketTCP.parse_segment(response)
+      except socket.timeout:
+        if retransmissions == max_retransmissions:
+          return None
+        retransmissions += 1
+        self.__rto.backoff()
+        deadline = time.monotonic() + self.__rto.rto
+        self.__sendto(address, segment)
+        continue
+      except (struct.error, ValueError, IndexError):
+        continue
+
+      if is_response(response_header, response_data, response_address):
+        if retransmissions == 0:
+          self.__rto.add_sample(time.monotonic() - sent_at)
+        return response, response_header, response_address
+
+  def __datagram_received(self, datagram: bytes, address: tuple[str, int]) -> None:
+    """Recibe un datagrama del endpoint udp: en un socket que escucha lo
+    reparte a su conexión, y en otro caso lo encola para la corrutina que
+    espera datagramas.
+    """
+    if self.__connections is None:
+      self.__inbox.append((datagram, address))
+      self.__wake()
+      return
+
+    try:
+      header, data = SocketTCP.parse_segment(datagram)
+    except (struct.error, ValueError, IndexError):
+      return
+    if header.syn and not header.ack and not header.fin:
+      self.__handle_syn(header.seq, bytes(data), address)
+    else:
+      self.__route(header, datagram, address)
+
+  def __connection_lost(self, exc: Exception | None) -> None:
+    """Se llama al cerrarse el endpoint udp: despierta a las corrutinas que
+    esperan datagramas en él, incluidas las de las conexiones aceptadas.
+    """
+    self.__lost = exc or OSError("socket closed")
+    self.__wake(self.__lost)
+    if self.__connections is not None:
+      for timer in self.__handshake_timers.values():
+        timer.cancel()
+      for new_socketTCP in self.__connections.values():
+        new_socketTCP.__lost = self.__lost
+        new_socketTCP.__wake(self.__lost)
+
+  def __handle_syn(self, syn_seq: int, syn_data: bytes, address: tuple[str, int]) -> None:
+    """Atiende un SYN recibido por un socket que escucha, igual que
+    SocketTCP: si hay espacio en el backlog crea la conexión, le asigna un
+    identificador y responde SYN+ACK.
+    """
+    if self.__accept_queue.qsize() + len(self.__handshakes) >= self.__backlog:
+      return
+    if (address, syn_seq) in self.__recent_syns:
+      return
+    self.__recent_syns[(address, syn_seq)] = None
+    if len(self.__recent_syns) > self.MAX_RECENT_SYNS:
+      del self.__recent_syns[next(iter(self.__recent_syns))]
+
+    binary_header = self.__binary_supported and syn_data.startswith(BINARY_NEGOTIATION_FLAG)
+    conn_id = 0
+    if binary_header:
+      conn_id = self.__next_conn_id
+      while conn_id == 0 or (address, conn_id) in self.__connections:
+        conn_id = (conn_id + 1) & 0xFFFF
+      self.__next_conn_id = (conn_id + 1) & 0xFFFF
+    elif (address, 0) in self.__connections:
+      return
+
+    new_socketTCP = AsyncSocketTCP(
+      self.__window_size, self.__mode, self.__binary_supported,
+      self.__congestion_control_factory, self.__configured_mss
+    )
+    new_socketTCP.__transport = self.__transport
+    new_socketTCP.__listener = self
+    new_socketTCP.__demux_key = (address, conn_id)
+    new_socketTCP.__binary_header = binary_header
+    new_socketTCP.__conn_id = conn_id
+    new_socketTCP.address = self.address
+    new_socketTCP.conn_sock_addr = address
+
+    # Con el header binario anunciamos nuestro MSS y usamos el menor
+    syn_ack_data = b""
+    if binary_header:
+      local_mss = self.__configured_mss or SocketTCP.route_mss(address)
+      try:
+        syn_options = bytes.fromhex(syn_data[len(BINARY_NEGOTIATION_FLAG):].decode())
+      except (UnicodeDecodeError, ValueError):
+        syn_options = b""
+      new_socketTCP.__mss = min(local_mss, SocketTCP.peer_mss(syn_options))
+      syn_ack_data = encode_options({MSS_OPTION: MSS_VALUE.pack(local_mss)})
+    syn_ack = new_socketTCP.__build_segment(HeaderTCP(True, True, False, seq_add(syn_seq, 1)), syn_ack_data)
+
+    key = (address, conn_id)
+    now = time.monotonic()
+    self.__connections[key] = new_socketTCP
+    self.__handshakes[key] = PendingHandshake(syn_seq, syn_ack, now, now + new_socketTCP.__rto.rto)
+    self.__handshake_timers[key] = asyncio.get_running_loop().call_later(
+      new_socketTCP.__rto.rto, self.__retransmit_syn_ack, key
+    )
+    self.__sendto(address, syn_ack)
+
+  def __route(self, header: HeaderTCP, datagram: bytes, address: tuple[str, int]) -> None:
+    """Entrega un datagrama a la conexión a la que corresponde. Si esta
+    aún está en handshake y el datagrama lo completa, la conexión pasa a
+    la cola de conexiones por aceptar.
+    """
+    key = (address, header.conn_id)
+    new_socketTCP = self.__connections.get(key)
+    if new_socketTCP is None:
+      return
+
+    handshake = self.__handshakes.get(key)
+    if handshake is not None:
+      if header not in (
+        HeaderTCP(False, True, False, seq_add(handshake.syn_seq, 2)),
+        HeaderTCP(False, False, False, seq_add(handshake.syn_seq, 2))
+      ):
+        return
+      del self.__handshakes[key]
+      self.__handshake_timers.pop(key).cancel()
+      if handshake.retransmissions == 0:
+        new_socketTCP.__rto.add_sample(time.monotonic() - handshake.sent_at)
+      new_socketTCP.seq = seq_add(handshake.syn_seq, 2)
+      self.__accept_queue.put_nowait(new_socketTCP)
+      if header.ack:
+        return
+
+    new_socketTCP.__datagram_received(datagram, address)
+
+  def __retransmit_syn_ack(self, key: tuple[tuple[str, int], int]) -> None:
+    """Timer de retransmisión del SYN+ACK de un handshake en curso: lo
+    retransmite duplicando el RTO, o descarta el handshake si agotó sus
+    retransmisiones.
+    """
+    handshake = self.__handshakes.get(key)
+    if handshake is None:
+      return
+    new_socketTCP = self.__connections[key]
+    if handshake.retransmissions == self.MAX_RETRANSMISSIONS:
+      del self.__handshakes[key]
+      del self.__handshake_timers[key]
+      del self.__connections[key]
+      return
+    handshake.retransmissions += 1
+    new_socketTCP.__rto.backoff()
+    handshake.deadline = time.monotonic() + new_socketTCP.__rto.rto
+    self.__handshake_timers[key] = asyncio.get_running_loop().call_later(
+      new_socketTCP.__rto.rto, self.__retransmit_syn_ack, key
+    )
+    self.__sendto(key[0], handshake.syn_ack)
+
+  def __release(self) -> None:
+    """Libera el endpoint udp de la conexión: lo cierra si es propio, o se
+    desregistra del socket que escucha si es compartido.
+    """
+    if self.__listener is not None:
+      self.__listener.__connections.pop(self.__demux_key, None)
+    elif self.__transport is not None:
+      self.__transport.close()
@@ -0,0 +1,302 @@
+from __future__ import annotations
+import ctypes
+import ctypes.util
+import errno
+import select
+import socket
+import sys
+import time
+
+
+class _IOVec(ctypes.Structure):
+  _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+  _fields_ = [
+    ("msg_name", ctypes.c_void_p), ("msg_namelen", ctypes.c_uint32),
+    ("msg_iov", ctypes.POINTER(_IOVec)), ("msg_iovlen", ctypes.c_size_t),
+    ("msg_control", ctypes.c_void_p), ("msg_controllen", ctypes.c_size_t),
+    ("msg_flags", ctypes.c_int),
+  ]
+
+
+class _MMsgHdr(ctypes.Structure):
+  _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+
+class _SockAddrIn(ctypes.Structure):
+  # El puerto y la dirección van en orden de red, por lo que se guardan
+  # como bytes
+  _fields_ = [
+    ("sin_family", ctypes.c_ushort), ("sin_port", ctypes.c_uint8 * 2),
+    ("sin_addr", ctypes.c_uint8 * 4), ("sin_zero", ctypes.c_uint8 * 8),
+  ]
+
+
+def _load_libc() -> ctypes.CDLL | None:
+  """Carga la libc si el sistema es Linux y esta tiene recvmmsg y
+  sendmmsg, None en otro caso.
+  """
+  if not sys.platform.startswith("linux") or not hasattr(socket, "MSG_DONTWAIT"):
+    return None
+  try:
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    recvmmsg, sendmmsg = libc.recvmmsg, libc.sendmmsg
+  except (OSError, AttributeError):
+    return None
+  recvmmsg.argtypes = [
+    ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p
+  ]
+  recvmmsg.restype = ctypes.c_int
+  sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int]
+  sendmmsg.restype = ctypes.c_int
+  return libc
+
+
+_libc = _load_libc()
+
+# Flag de recvmmsg (que el módulo socket no define) con que solo se espera
+# el primer datagrama del lote; los siguientes se reciben sin esperar
+MSG_WAITFORONE = 0x10000
+
+
+class BatchDatagramIO:
+  """Envío y recepción de datagramas en lote sobre un socket udp IPv4, con
+  las llamadas al sistema recvmmsg y sendmmsg de Linux: cada llamada
+  recibe todos los datagramas que esperan en el socket (hasta batch_size),
+  o envía todos los datagramas encolados.
+
+  Los datagramas se reciben en un conjunto de buffers reutilizables, uno
+  por datagrama, y los enviados se copian a un buffer reutilizable antes
+  de enviarlos. Solo está disponible si available es True; en otro caso
+  quien lo usa debe recibir y enviar de a un datagrama.
+
+  Attributes:
+  -----------
+
+  available (bool): Si el sistema soporta el envío y recepción en lote.
+  """
+
+  available: bool = _libc is not None
+
+  def __init__(self, batch_size: int = 16):
+    """Constructor de BatchDatagramIO.
+
+    Parameters:
+    -----------
+    batch_size (int): Cantidad máxima de datagramas por llamada.
+    """
+    if not self.available:
+      raise OSError("Batched datagram I/O is not supported on this platform")
+    self.batch_size: int = batch_size
+
+    # Headers de los mensajes, con su dirección de origen o destino y su
+    # único bloque de datos, para la recepción y para el envío. Los largos
+    # se leen y escriben a través de vistas, más rápidas que los campos de
+    # ctypes.
+    self.__recv_messages, self.__recv_addresses, self.__recv_iovecs = self.__new_messages()
+    self.__send_messages, self.__send_addresses, self.__send_iovecs = self.__new_messages()
+    self.__recv_lengths: memoryview = memoryview(self.__recv_messages).cast("B").cast("I")
+    self.__recv_sockaddrs: memoryview = memoryview(self.__recv_addresses).cast("B")
+    self.__send_iovec_fields: memoryview = memoryview(self.__send_iovecs).cast("B").cast("N")
+    self.__send_sockaddrs: memoryview = memoryview(self.__send_addresses).cast("B")
+
+    # Buffers de recepción y de envío, con espacio para batch_size
+    # datagramas de slot_size bytes cada uno, asignados al primer uso
+    self.__recv_slot_size: int = 0
+    self.__recv_view: memoryview = memoryview(bytearray())
+    self.__send_slot_size: int = 0
+    self.__send_view: memoryview = memoryview(bytearray())
+
+    # Última dirección escrita en cada header de envío, y direcciones de
+    # origen ya decodificadas
+    self.__send_destinations: list[tuple[str, int] | None] = [None] * batch_size
+    self.__source_addresses: dict[bytes, tuple[str, int]] = {}
+
+  def recv(
+    self, sock: socket.socket, slot_size: int, timeout: float | None = 0.0
+  ) -> list[tuple[memoryview, tuple[str, int]]]:
+    """Recibe los datagramas que esperan en sock, esperando a lo más
+    timeout segundos a que llegue el primero. Solo se espera el primero:
+    el resto del lote son los que ya esperaban, por lo que la llamada al
+    sistema que espera es la misma que recibe el lote.
+
+    Parameters:
+    -----------
+    sock (socket.socket): Socket udp IPv4.
+    slot_size (int): Tamaño máximo de cada datagrama. Los más largos se
+                     truncan.
+    timeout (float | None): Segundos a esperar el primer datagrama. Con 0
+                            no se espera, y con None se espera sin límite.
+
+    Returns:
+    --------
+    (list[tuple[memoryview, tuple[str, int]]]): Vista y dirección de origen
+        de cada datagrama recibido, vacía si no había ninguno. Las vistas
+        solo son válidas hasta la siguiente llamada a recv.
+
+    Raises:
+    -------
+    socket.timeout: Si no llega ningún datagrama antes de timeout.
+    OSError: Si la recepción falla por otro motivo que no haber datagramas,
+             por ejemplo si sock fue cerrado.
+    """
+    # Un socket cerrado falla como en socket.recvfrom, en vez de con el
+    # ValueError de poll al registrar su descriptor -1
+    if sock.fileno() < 0:
+      raise OSError(errno.EBADF, "Bad file descriptor")
+    if slot_size != self.__recv_slot_size:
+      self.__recv_slot_size = slot_size
+      self.__recv_view = self.__new_slots(self.__recv_iovecs, slot_size)
+
+    if timeout == 0.0:
+      count = self.__call(
+        _libc.recvmmsg, sock, self.__recv_messages, self.batch_size, socket.MSG_DONTWAIT, None
+      )
+      if count < 0:
+        return []
+
+    # Un socket sin timeout es bloqueante, por lo que recvmmsg espera por sí
+    # misma. Uno con timeout no lo es, y se espera con poll antes.
+    elif timeout is None and sock.gettimeout() is None:
+      count = self.__call(
+        _libc.recvmmsg, sock, self.__recv_messages, self.batch_size, MSG_WAITFORONE, None
+      )
+    else:
+      poller = select.poll()
+      poller.register(sock, select.POLLIN)
+      deadline = None if timeout is None else time.monotonic() + timeout
+      while True:
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0) * 1000
+        if not poller.poll(remaining):
+          raise socket.timeout("timed out")
+        count = self.__call(
+          _libc.recvmmsg, sock, self.__recv_messages, self.batch_size, socket.MSG_DONTWAIT, None
+        )
+        if count >= 0:
+          break
+
+    # El largo de cada datagrama es el campo msg_len que sigue a su msghdr,
+    # y su dirección de origen el puerto y la IP de su sockaddr_in
+    message_words = ctypes.sizeof(_MMsgHdr) // 4
+    length_offset = _MMsgHdr.msg_len.offset // 4
+    sockaddr_size = ctypes.sizeof(_SockAddrIn)
+    datagrams = []
+    for i in range(count):
+      start = i * slot_size
+      raw_address = bytes(self.__recv_sockaddrs[i * sockaddr_size + 2:i * sockaddr_size + 8])
+      address = self.__source_addresses.get(raw_address)
+      if address is None:
+        if len(self.__source_addresses) >= 1024:
+          self.__source_addresses.clear()
+        address = (socket.inet_ntoa(raw_address[2:]), int.from_bytes(raw_address[:2], "big"))
+        self.__source_addresses[raw_address] = address
+      datagrams.append((
+        self.__recv_view[start:start + self.__recv_lengths[i * message_words + length_offset]],
+        address,
+      ))
+    return datagrams
+
+  def send(
+    self, sock: socket.socket, datagrams: list[tuple[tuple[str, int], tuple[bytes | memoryview, ...]]],
+    slot_size: int
+  ) -> int:
+    """Envía en lote, sin bloquear, datagramas formados por la
+    concatenación de sus partes.
+
+    Parameters:
+    -----------
+    sock (socket.socket): Socket udp IPv4.
+    datagrams (list): Pares (dirección de destino, partes) de a lo más
+                      batch_size datagramas. Las direcciones deben ser IPs
+                      numéricas.
+    slot_size (int): Tamaño máximo de cada datagrama.
+
+    Returns:
+    --------
+    (int): Cantidad de datagramas enviados, desde el primero. Los restantes
+           no se enviaron (por ejemplo, porque el buffer del socket se
+           llenó, su dirección no es numérica o no caben en slot_size) y
+           deben enviarse de a uno.
+    """
+    if slot_size != self.__send_slot_size:
+      self.__send_slot_size = slot_size
+      self.__send_view = self.__new_slots(self.__send_iovecs, slot_size)
+      self.__send_destinations = [None] * self.batch_size
+
+    sockaddr_size = ctypes.sizeof(_SockAddrIn)
+    count = 0
+    for address, parts in datagrams:
+
+      # La dirección de destino suele repetirse, por lo que solo se escribe
+      # si cambió
+      if address != self.__send_destinations[count]:
+        try:
+          packed_ip = socket.inet_aton(address[0])
+        except OSError:
+          break
+        offset = count * sockaddr_size
+        self.__send_sockaddrs[offset + 2:offset + 4] = address[1].to_bytes(2, "big")
+        self.__send_sockaddrs[offset + 4:offset + 8] = packed_ip
+        self.__send_destinations[count] = address
+
+      start = offset = count * slot_size
+      end = start + slot_size
+      for part in parts:
+        if offset + len(part) > end:
+          break
+        self.__send_view[offset:offset + len(part)] = part
+        offset += len(part)
+      else:
+        self.__send_iovec_fields[2 * count + 1] = offset - start
+        count += 1
+        continue
+      break
+
+    if count == 0:
+      return 0
+    return max(self.__call(_libc.sendmmsg, sock, self.__send_messages, count, socket.MSG_DONTWAIT), 0)
+
+  def __new_messages(self) -> tuple[ctypes.Array, ctypes.Array, ctypes.Array]:
+    """Crea batch_size headers de mensajes, cada uno con su dirección IPv4
+    y un bloque de datos.
+    """
+    messages = (_MMsgHdr * self.batch_size)()
+    addresses = (_SockAddrIn * self.batch_size)()
+    iovecs = (_IOVec * self.batch_size)()
+    for i in range(self.batch_size):
+      addresses[i].sin_family = socket.AF_INET
+      messages[i].msg_hdr.msg_name = ctypes.addressof(addresses[i])
+      messages[i].msg_hdr.msg_namelen = ctypes.sizeof(_SockAddrIn)
+      messages[i].msg_hdr.msg_iov = ctypes.pointer(iovecs[i])
+      messages[i].msg_hdr.msg_iovlen = 1
+    return messages, addresses, iovecs
+
+  def __new_slots(self, iovecs: ctypes.Array, slot_size: int) -> memoryview:
+    """Asigna un buffer para batch_size datagramas de slot_size bytes, y
+    apunta a él los bloques de datos de los headers.
+    """
+    buffer = bytearray(slot_size * self.batch_size)
+    base = ctypes.addressof(ctypes.c_char.from_buffer(buffer))
+    for i in range(self.batch_size):
+      iovecs[i].iov_base = base + i * slot_size
+      iovecs[i].iov_len = slot_size
+    return memoryview(buffer)
+
+  @staticmethod
+  def __call(function, sock: socket.socket, messages: ctypes.Array, count: int, *args) -> int:
+    """Llama a recvmmsg o sendmmsg sobre los primeros count mensajes,
+    reintentando si una señal la interrumpe. Retorna -1 si el socket no
+    está listo (no hay datagramas, o su buffer de envío está lleno).
+    """
+    while True:
+      result = function(sock.fileno(), messages, count, *args)
+      if result >= 0:
+        return result
+      error = ctypes.get_errno()
+      if error == errno.EINTR:
+        continue
+      if error in (errno.EAGAIN, errno.EWOULDBLOCK, errno.ENOBUFS):
+        return -1
+      raise OSError(error, f"{function.__name__} failed: {errno.errorcode.get(error, error)}")
@@ -0,0 +1,395 @@
+from __future__ import annotations
+import argparse
+import contextlib
+import heapq
+import json
+import os
+import platform
+import random
+import selectors
+import socket
+import statistics
+import struct
+import threading
+import time
+from dataclasses import dataclass, asdict
+from socketTCP import SocketTCP
+from compression import CODECS
+
+
+@dataclass
+class Impairment:
+  """Data Class usada para representar las alteraciones que el proxy
+  aplica a cada datagrama, en ambas direcciones.
+
+  Attributes:
+  -----------
+
+  loss (float): Probabilidad de descartar un datagrama.
+  delay (float): Retardo fijo de cada datagrama, en segundos.
+  jitter (float): Variación máxima (uniforme) del retardo, en segundos.
+  duplicate (float): Probabilidad de entregar un datagrama dos veces.
+  reorder (float): Probabilidad de retrasar un datagrama reorder_delay
+                   segundos extra, de modo que lo adelanten los siguientes.
+  reorder_delay (float): Retardo extra de un datagrama reordenado.
+  corrupt (float): Probabilidad de invertir un bit al azar de un datagrama.
+  """
+  loss: float = 0.0
+  delay: float = 0.0
+  jitter: float = 0.0
+  duplicate: float = 0.0
+  reorder: float = 0.0
+  reorder_delay: float = 0.01
+  corrupt: float = 0.0
+
+
+class ImpairmentProxy:
+  """Proxy udp que se ubica entre un cliente y un servidor SocketTCP y
+  altera los datagramas según un Impairment. Cada cliente recibe su propio
+  socket hacia el servidor (como un NAT), y los datagramas del cliente se
+  envían a la última dirección desde la que respondió el servidor, por lo
+  que funciona tanto con listen como con el accept de un puerto por
+  conexión.
+
+  También cuenta, sin modificar los sockets, las retransmisiones que ve
+  pasar: todo segmento que no sea un ACK puro y que ya había pasado.
+
+  Attributes:
+  -----------
+
+  address (tuple[str, int]): Dirección a la cual deben conectarse los clientes.
+  stats (dict[str, int]): Contadores de datagramas y retransmisiones.
+  """
+
+  def __init__(self, target: tuple[str, int], impairment: Impairment, seed: int | None = None):
+    self.__target = target
+    self.__impairment = impairment
+    self.__random = random.Random(seed)
+
+    self.__listen_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    self.__listen_socket.bind(("127.0.0.1", 0))
+    self.address: tuple[str, int] = self.__listen_socket.getsockname()
+
+    # Por cada cliente, su socket hacia el servidor y la dirección actual
+    # del servidor; y por cada socket hacia el servidor, su cliente
+    self.__upstreams: dict[tuple[str, int], list] = {}
+    self.__clients: dict[socket.socket, tuple[str, int]] = {}
+
+    # Datagramas retrasados: (momento de entrega, orden, socket, datos, destino)
+    self.__pending: list[tuple[float, int, socket.socket, bytes, tuple[str, int]]] = []
+    self.__pending_count = 0
+
+    self.__selector = selectors.DefaultSelector()
+    self.__selector.register(self.__listen_socket, selectors.EVENT_READ)
+    self.__seen: set[tuple] = set()
+    self.__closed = threading.Event()
+    self.__thread = threading.Thread(target=self.__run, daemon=True)
+    self.stats: dict[str, int] = {
+      "datagrams": 0, "dropped": 0, "duplicated": 0, "reordered": 0, "corrupted": 0,
+      "retransmitted_segments": 0, "retransmitted_bytes": 0
+    }
+
+  def start(self) -> None:
+    """Comienza a reenviar datagramas en un hilo aparte."""
+    self.__thread.start()
+
+  def close(self) -> None:
+    """Detiene el proxy y cierra sus sockets."""
+    self.__closed.set()
+    self.__thread.join()
+    self.__selector.close()
+    self.__listen_socket.close()
+    for sock in self.__clients:
+      sock.close()
+
+  def __run(self) -> None:
+    """Ciclo del proxy: recibe de cualquiera de sus sockets y entrega los
+    datagramas retrasados cuyo momento llegó.
+    """
+    while not self.__closed.is_set():
+      timeout = 0.05
+      if self.__pending:
+        timeout = min(max(self.__pending[0][0] - time.monotonic(), 0), timeout)
+
+      for key, _ in self.__selector.select(timeout):
+        sock = key.fileobj
+        try:
+          datagram, address = sock.recvfrom(65535)
+        except OSError:
+          continue
+
+        # Del cliente hacia el servidor
+        if sock is self.__listen_socket:
+          if address not in self.__upstreams:
+            upstream = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            upstream.bind(("127.0.0.1", 0))
+            self.__upstreams[address] = [upstream, self.__target]
+            self.__clients[upstream] = address
+            self.__selector.register(upstream, selectors.EVENT_READ)
+          upstream, server_address = self.__upstreams[address]
+          self.__count(address, datagram)
+          self.__forward(upstream, datagram, server_address)
+
+        # Del servidor hacia el cliente
+        else:
+          client = self.__clients[sock]
+          self.__upstreams[client][1] = address
+          self.__count(address, datagram)
+          self.__forward(self.__listen_socket, datagram, client)
+
+      now = time.monotonic()
+      while self.__pending and self.__pending[0][0] <= now:
+        _, _, sock, datagram, address = heapq.heappop(self.__pending)
+        sock.sendto(datagram, address)
+
+  def __count(self, source: tuple[str, int], datagram: bytes) -> None:
+    """Cuenta un datagrama, y si es un segmento (que no sea un ACK puro)
+    que ya había pasado, una retransmisión.
+    """
+    self.stats["datagrams"] += 1
+    try:
+      header, data = SocketTCP.parse_segment(datagram)
+    except (struct.error, ValueError, IndexError):
+      return
+    if header.ack and not header.syn and not header.fin:
+      return
+    key = (
+      source, header.conn_id, header.stream_id, header.syn, header.ack, header.fin,
+      header.seq, len(data)
+    )
+    if key in self.__seen:
+      self.stats["retransmitted_segments"] += 1
+      self.stats["retransmitted_bytes"] += len(data)
+    else:
+      self.__seen.add(key)
+
+  def __forward(self, sock: socket.socket, datagram: bytes, address: tuple[str, int]) -> None:
+    """Aplica las alteraciones a un datagrama y lo agenda para su entrega."""
+    impairment = self.__impairment
+    if self.__random.random() < impairment.loss:
+      self.stats["dropped"] += 1
+      return
+
+    if datagram and self.__random.random() < impairment.corrupt:
+      self.stats["corrupted"] += 1
+      corrupted = bytearray(datagram)
+      bit = self.__random.randrange(len(corrupted) * 8)
+      corrupted[bit // 8] ^= 1 << (bit % 8)
+      datagram = bytes(corrupted)
+
+    copies = 1
+    if self.__random.random() < impairment.duplicate:
+      self.stats["duplicated"] += 1
+      copies = 2
+
+    for _ in range(copies):
+      delay = impairment.delay + self.__random.uniform(0, impairment.jitter)
+      if self.__random.random() < impairment.reorder:
+        self.stats["reordered"] += 1
+        delay += impairment.reorder_delay
+      if delay <= 0:
+        sock.sendto(datagram, address)
+        continue
+      self.__pending_count += 1
+      heapq.heappush(
+        self.__pending,
+        (time.monotonic() + delay, self.__pending_count, sock, datagram, address)
+      )
+
+
+def run_trial(
+  payload: bytes, impairment: Impairment, window_size: int, mode: str,
+  timeout: float, seed: int | None = None, compression: str | None = None
+) -> dict:
+  """Transfiere payload de un cliente a un servidor SocketTCP a través de
+  un ImpairmentProxy, y mide la transferencia.
+
+  Parameters:
+  -----------
+  payload (bytes): Datos a transferir.
+  impairment (Impairment): Alteraciones del proxy.
+  window_size (int): Tamaño de ventana de ambos extremos.
+  mode (str): Variante de ventana deslizante de ambos extremos.
+  timeout (float): Timeout del cliente, en segundos.
+  seed (int | None): Semilla de las alteraciones del proxy.
+  compression (str | None): Nombre del algoritmo de compresión que ofrecen
+                            ambos extremos, None para no comprimir.
+
+  Returns:
+  --------
+  (dict): Resultado de la transferencia: si llegó completa, latencia del
+          handshake, goodput, retransmisiones, segmentos corruptos
+          descartados, tiempo de CPU por MB y bytes de datos enviados por
+          la red.
+  """
+  codecs = [codec for codec in CODECS.values() if codec.name == compression]
+  server_socketTCP = SocketTCP(window_size, mode, compression=codecs)
+  server_socketTCP.bind(("127.0.0.1", 0))
+  server_socketTCP.listen()
+  proxy = ImpairmentProxy(server_socketTCP.address, impairment, seed)
+  proxy.start()
+
+  # El servidor recibe el mensaje completo y cierra la conexión
+  server_result = {}
+  def serve() -> None:
+    cpu_start = time.thread_time()
+    connection, _ = server_socketTCP.accept()
+    buffer = bytearray(len(payload))
+    buffer_view = memoryview(buffer)
+    received = 0
+    while received < len(payload):
+      nbytes = connection.recv_into(buffer_view[received:])
+      if nbytes == 0:
+        break
+      received += nbytes
+    server_result["received_at"] = time.perf_counter()
+    server_result["complete"] = buffer == payload
+    connection.close()
+    server_result["corrupted_segments"] = connection.stats.corrupted_segments
+    server_result["cpu"] = time.thread_time() - cpu_start
+
+  server_thread = threading.Thread(target=serve, daemon=True)
+  server_thread.start()
+
+  client_socketTCP = SocketTCP(window_size, mode, compression=codecs)
+  client_socketTCP.settimeout(timeout)
+  result = {"bytes": len(payload)}
+  cpu_start = time.thread_time()
+  try:
+    started_at = time.perf_counter()
+    client_socketTCP.connect(proxy.address)
+    connected_at = time.perf_counter()
+    client_socketTCP.send(payload)
+    client_socketTCP.recv(1)
+  except OSError as err:
+    result["error"] = f"{type(err).__name__}: {err}"
+  client_cpu = time.thread_time() - cpu_start
+  server_thread.join(timeout)
+  proxy.close()
+  server_socketTCP.close()
+
+  if "error" in result or "received_at" not in server_result:
+    result.setdefault("error", "server did not receive the payload")
+    result["complete"] = False
+    result.update(proxy.stats)
+    return result
+
+  transfer_time = server_result["received_at"] - connected_at
+  megabytes = len(payload) / 1e6
+  stats = client_socketTCP.stats
+  wire_bytes = len(payload) - stats.compression_input_bytes + stats.compression_output_bytes
+  result.update({
+    "complete": server_result["complete"],
+    "handshake_ms": (connected_at - started_at) * 1e3,
+    "transfer_s": transfer_time,
+    "goodput_mbps": len(payload) * 8 / 1e6 / transfer_time if transfer_time > 0 else None,
+    "cpu_s_per_mb": (client_cpu + server_result.get("cpu", 0.0)) / megabytes if megabytes else None,
+    "mss": client_socketTCP.mss,
+    "srtt_ms": client_socketTCP.srtt * 1e3 if client_socketTCP.srtt is not None else None,
+    "compression": client_socketTCP.compression,
+    "wire_bytes": wire_bytes,
+    "compression_ratio": wire_bytes / len(payload) if payload else None,
+    "corrupted_segments": stats.corrupted_segments + server_result["corrupted_segments"],
+  })
+  result.update(proxy.stats)
+  return result
+
+
+def summarize(trials: list[dict]) -> dict:
+  """Resume los intentos exitosos de un payload con la mediana de cada
+  métrica.
+  """
+  completed = [trial for trial in trials if trial.get("complete")]
+  summary = {"trials": len(trials), "completed": len(completed)}
+  for metric in (
+    "handshake_ms", "goodput_mbps", "cpu_s_per_mb", "retransmitted_segments", "compression_ratio"
+  ):
+    values = [trial[metric] for trial in completed if trial.get(metric) is not None]
+    summary[f"median_{metric}"] = statistics.median(values) if values else None
+  return summary
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(
+    description="Benchmark de SocketTCP sobre un enlace simulado con pérdidas."
+  )
+  parser.add_argument("--loss", type=float, default=0.01)
+  parser.add_argument("--delay", type=float, default=0.002, help="segundos")
+  parser.add_argument("--jitter", type=float, default=0.001, help="segundos")
+  parser.add_argument("--duplicate", type=float, default=0.005)
+  parser.add_argument("--reorder", type=float, default=0.01)
+  parser.add_argument("--corrupt", type=float, default=0.0)
+  parser.add_argument("--window", type=int, default=16)
+  parser.add_argument(
+    "--mode", choices=(SocketTCP.GO_BACK_N, SocketTCP.SELECTIVE_REPEAT),
+    default=SocketTCP.SELECTIVE_REPEAT
+  )
+  parser.add_argument(
+    "--sizes", default="1024,65536,1048576",
+    help="tamaños de payload en bytes, separados por comas"
+  )
+  parser.add_argument(
+    "--file", action="append", default=None,
+    help="archivo a usar como payload (por defecto archivo.txt)"
+  )
+  parser.add_argument(
+    "--compression", default="none",
+    help="algoritmos de compresión a comparar, separados por comas "
+         f"(none, {', '.join(codec.name for codec in CODECS.values())})"
+  )
+  parser.add_argument("--repeat", type=int, default=3)
+  parser.add_argument("--timeout", type=float, default=10.0)
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--output", help="archivo donde escribir el JSON (por defecto stdout)")
+  args = parser.parse_args()
+
+  impairment = Impairment(
+    args.loss, args.delay, args.jitter, args.duplicate, args.reorder, corrupt=args.corrupt
+  )
+  compressions: list[str | None] = []
+  for name in args.compression.split(","):
+    if name != "none" and name not in (codec.name for codec in CODECS.values()):
+      parser.error(f"compression algorithm {name!r} is not available")
+    compressions.append(None if name == "none" else name)
+
+  # Payloads aleatorios de cada tamaño, más los archivos pedidos
+  payloads: list[tuple[str, bytes]] = []
+  rng = random.Random(args.seed)
+  for size in (int(size) for size in args.sizes.split(",") if size):
+    payloads.append((f"random-{size}", rng.randbytes(size)))
+  files = args.file
+  if files is None:
+    files = [os.path.join(os.path.dirname(os.path.abspath(__file__)), "archivo.txt")]
+  for file_name in files:
+    with open(file_name, "rb") as f:
+      payloads.append((os.path.basename(file_name), f.read()))
+
+  # SocketTCP imprime su progreso al recibir, lo que no debe mezclarse con
+  # el JSON
+  results = []
+  with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+    for name, payload in payloads:
+      for compression in compressions:
+        trials = [
+          run_trial(
+            payload, impairment, args.window, args.mode, args.timeout, args.seed + i, compression
+          )
+          for i in range(args.repeat)
+        ]
+        results.append({
+          "payload": name, "bytes": len(payload), "compression": compression,
+          "summary": summarize(trials), "trials": trials
+        })
+
+  report = {
+    "config": {
+      "impairment": asdict(impairment), "window": args.window, "mode": args.mode,
+      "repeat": args.repeat, "seed": args.seed, "python": platform.python_version(),
+    },
+    "results": results,
+  }
+  if args.output:
+    with open(args.output, "w") as f:
+      json.dump(report, f, indent=2)
+  else:
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,692 @@
+from __future__ import annotations
+import argparse
+import contextlib
+import cProfile
+import os
+import pstats
+import selectors
+import socket
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import BinaryIO, Callable, Iterable, Iterator
+from utilities import (
+  HeaderTCP, BINARY_HEADER, BINARY_HEADER_VERSION, CHECKSUM_FLAG, CHECKSUM, parse_sack, seq_add
+)
+
+# Las capturas usan el formato pcap clásico, legible por tcpdump o
+# Wireshark, con timestamps en microsegundos y el tipo de enlace
+# LINKTYPE_USER0, reservado para protocolos propios. Cada paquete comienza
+# con un pseudo-header con su sentido (CAPTURE_SENT o CAPTURE_RECEIVED) y
+# las direcciones IPv4 local y remota del socket que lo capturó, seguido
+# del datagrama udp tal como se envió o recibió.
+PCAP_HEADER = struct.Struct("<IHHiIII")
+PCAP_MAGIC = 0xA1B2C3D4
+PCAP_RECORD_HEADER = struct.Struct("<IIII")
+LINKTYPE_SOCKETTCP = 147
+CAPTURE_HEADER = struct.Struct("!B4sH4sH")
+CAPTURE_SENT = 0
+CAPTURE_RECEIVED = 1
+
+# Offset del identificador de conexión en el header binario
+CONN_ID_FIELD = struct.Struct("!H")
+CONN_ID_OFFSET = 2
+
+
+class PacketCapture:
+  """Captura de los datagramas que envían y reciben uno o más SocketTCP
+  (ver su parámetro capture), escrita en formato pcap a medida que
+  ocurren. Puede compartirse entre sockets y entre hilos; si la comparten
+  ambos extremos de una conexión, cada datagrama aparece como enviado por
+  uno y recibido por el otro.
+
+  Los datagramas se guardan truncados a snaplen bytes, lo que basta para
+  sus headers si solo interesa analizar la conexión; para reproducirla
+  (ver replay_capture) deben guardarse completos.
+
+  Attributes:
+  -----------
+
+  datagrams (int): Cantidad de datagramas capturados.
+  """
+
+  def __init__(
+    self, file: str | BinaryIO, snaplen: int = 0xFFFF, clock: Callable[[], float] = time.time
+  ):
+    """Constructor de PacketCapture.
+
+    Parameters:
+    -----------
+    file (str | BinaryIO): Ruta del archivo donde escribir la captura, o
+                           archivo binario ya abierto (que no se cierra
+                           con close).
+    snaplen (int): Bytes que se guardan de cada datagrama.
+    clock (Callable[[], float]): Reloj con que se marca cada datagrama, en
+                           segundos (por ejemplo, el tiempo virtual de una
+                           simulation.SimulatedNetwork).
+    """
+    self.__owns_file: bool = isinstance(file, str)
+    self.__file: BinaryIO = open(file, "wb") if self.__owns_file else file
+    self.__snaplen: int = snaplen
+    self.__clock: Callable[[], float] = clock
+    self.__lock: threading.Lock = threading.Lock()
+    self.__packed_ips: dict[str, bytes] = {}
+    self.datagrams: int = 0
+    self.__file.write(PCAP_HEADER.pack(
+      PCAP_MAGIC, 2, 4, 0, 0, CAPTURE_HEADER.size + snaplen, LINKTYPE_SOCKETTCP
+    ))
+
+  def record(
+    self, sent: bool, local: tuple[str, int], remote: tuple[str, int], *parts: bytes | memoryview
+  ) -> None:
+    """Escribe en la captura un datagrama formado por la concatenación de
+    parts.
+
+    Parameters:
+    -----------
+    sent (bool): Si el socket envió el datagrama (True) o lo recibió (False).
+    local (tuple[str, int]): Dirección del socket.
+    remote (tuple[str, int]): Dirección de destino u origen del datagrama.
+    parts (bytes | memoryview): Partes del datagrama.
+    """
+    microseconds = int(self.__clock() * 1e6)
+    length = sum(len(part) for part in parts)
+    captured = min(length, self.__snaplen)
+    pseudo_header = CAPTURE_HEADER.pack(
+      CAPTURE_SENT if sent else CAPTURE_RECEIVED,
+      self.__pack_ip(local[0]), local[1], self.__pack_ip(remote[0]), remote[1]
+    )
+    with self.__lock:
+      self.__file.write(PCAP_RECORD_HEADER.pack(
+        microseconds // 1000000, microseconds % 1000000,
+        CAPTURE_HEADER.size + captured, CAPTURE_HEADER.size + length
+      ))
+      self.__file.write(pseudo_header)
+      for part in parts:
+        if len(part) > captured:
+          part = part[:captured]
+        self.__file.write(part)
+        captured -= len(part)
+        if captured == 0:
+          break
+      self.datagrams += 1
+
+  def flush(self) -> None:
+    """Escribe en el archivo lo capturado hasta ahora."""
+    with self.__lock:
+      self.__file.flush()
+
+  def close(self) -> None:
+    """Termina la captura, cerrando su archivo si lo abrió el constructor."""
+    with self.__lock:
+      if self.__owns_file:
+        self.__file.close()
+      else:
+        self.__file.flush()
+
+  def __enter__(self) -> PacketCapture:
+    return self
+
+  def __exit__(self, *exc_info) -> None:
+    self.close()
+
+  def __pack_ip(self, host: str) -> bytes:
+    """Retorna la IPv4 de host en orden de red, o ceros si no es una."""
+    packed_ip = self.__packed_ips.get(host)
+    if packed_ip is None:
+      try:
+        packed_ip = socket.inet_aton(socket.gethostbyname(host))
+      except OSError:
+        packed_ip = bytes(4)
+      if len(self.__packed_ips) >= 1024:
+        self.__packed_ips.clear()
+      self.__packed_ips[host] = packed_ip
+    return packed_ip
+
+
+@dataclass
+class CapturedDatagram:
+  """Data Class usada para representar un datagrama leído de una captura.
+
+  Attributes:
+  -----------
+
+  time (float): Momento de la captura, en segundos del reloj de la captura.
+  sent (bool): Si el socket que lo capturó lo envió (True) o lo recibió.
+  local (tuple[str, int]): Dirección del socket que lo capturó.
+  remote (tuple[str, int]): Dirección del otro extremo.
+  data (bytes): Datagrama, truncado al snaplen de la captura.
+  length (int): Largo original del datagrama.
+  """
+  time: float
+  sent: bool
+  local: tuple[str, int]
+  remote: tuple[str, int]
+  data: bytes
+  length: int
+
+
+def read_capture(file: str | BinaryIO) -> Iterator[CapturedDatagram]:
+  """Lee los datagramas de una captura escrita por PacketCapture.
+
+  Parameters:
+  -----------
+  file (str | BinaryIO): Ruta del archivo de la captura, o archivo binario
+                         ya abierto.
+
+  Returns:
+  --------
+  (Iterator[CapturedDatagram]): Datagramas de la captura, en el orden en
+                                que se capturaron.
+
+  Raises:
+  -------
+  ValueError: Si el archivo no es una captura pcap de SocketTCP.
+  """
+  with contextlib.ExitStack() as stack:
+    if isinstance(file, str):
+      file = stack.enter_context(open(file, "rb"))
+
+    # El orden de los bytes del header lo indica su número mágico
+    raw_header = file.read(PCAP_HEADER.size)
+    if len(raw_header) < PCAP_HEADER.size:
+      raise ValueError("Not a pcap file")
+    byte_order = "<" if raw_header[:4] == PCAP_MAGIC.to_bytes(4, "little") else ">"
+    magic, _, _, _, _, _, linktype = struct.unpack(byte_order + PCAP_HEADER.format[1:], raw_header)
+    if magic != PCAP_MAGIC:
+      raise ValueError("Not a pcap file")
+    if linktype != LINKTYPE_SOCKETTCP:
+      raise ValueError(f"Unexpected pcap link type {linktype}")
+    record_header = struct.Struct(byte_order + PCAP_RECORD_HEADER.format[1:])
+
+    while True:
+      raw_record = file.read(record_header.size)
+      if len(raw_record) < record_header.size:
+        return
+      seconds, microseconds, captured, length = record_header.unpack(raw_record)
+      packet = file.read(captured)
+      if len(packet) < captured or captured < CAPTURE_HEADER.size:
+        return
+      direction, local_ip, local_port, remote_ip, remote_port = CAPTURE_HEADER.unpack_from(packet)
+      yield CapturedDatagram(
+        seconds + microseconds / 1e6, direction == CAPTURE_SENT,
+        (socket.inet_ntoa(local_ip), local_port), (socket.inet_ntoa(remote_ip), remote_port),
+        packet[CAPTURE_HEADER.size:], length - CAPTURE_HEADER.size
+      )
+
+
+@dataclass
+class SegmentRecord:
+  """Data Class usada para representar un segmento decodificado en la
+  línea de tiempo de una conexión.
+
+  Attributes:
+  -----------
+
+  time (float): Segundos desde el primer datagrama de la conexión.
+  datagram (CapturedDatagram): Datagrama capturado.
+  header (HeaderTCP | None): Header del segmento, None si no se pudo
+                             decodificar.
+  length (int): Largo de los datos del segmento.
+  sack (list[tuple[int, int]]): Bloques SACK, si es un ACK que los trae.
+  retransmission (bool): Si el segmento ya se había enviado antes (o, si
+                         se recibió, si es un duplicado).
+  corrupted (bool): Si su checksum no coincide con su contenido.
+  rtt (float | None): RTT medido con este ACK, si confirma un segmento
+                      enviado una sola vez.
+  """
+  time: float
+  datagram: CapturedDatagram
+  header: HeaderTCP | None
+  length: int = 0
+  sack: list[tuple[int, int]] = field(default_factory=list)
+  retransmission: bool = False
+  corrupted: bool = False
+  rtt: float | None = None
+
+  @property
+  def kind(self) -> str:
+    """Tipo del segmento según sus flags: "SYN", "SYN+ACK", "ACK", "FIN",
+    "FIN+ACK", "DATA", o "?" si no se pudo decodificar.
+    """
+    if self.header is None:
+      return "?"
+    flags = [name for name, is_set in (
+      ("SYN", self.header.syn), ("FIN", self.header.fin), ("ACK", self.header.ack)
+    ) if is_set]
+    return "+".join(flags) or "DATA"
+
+
+@dataclass
+class ConnectionTimeline:
+  """Data Class usada para representar la línea de tiempo de una conexión
+  reconstruida desde una captura, vista desde el socket que la capturó.
+
+  Attributes:
+  -----------
+
+  local (tuple[str, int]): Dirección del socket que la capturó.
+  remote (tuple[str, int]): Dirección del otro extremo.
+  start (float): Momento del primer datagrama, en segundos del reloj de la
+                 captura.
+  segments (list[SegmentRecord]): Segmentos enviados y recibidos, en orden.
+  rtt_samples (list[float]): RTTs medidos, en segundos.
+  retransmissions (int): Segmentos enviados más de una vez.
+  duplicates (int): Segmentos recibidos más de una vez.
+  corrupted (int): Segmentos cuyo checksum no coincide.
+  bytes_sent (int): Bytes de datos enviados, sin contar retransmisiones.
+  bytes_received (int): Bytes de datos recibidos, sin contar duplicados.
+  """
+  local: tuple[str, int]
+  remote: tuple[str, int]
+  start: float
+  segments: list[SegmentRecord] = field(default_factory=list)
+  rtt_samples: list[float] = field(default_factory=list)
+  retransmissions: int = 0
+  duplicates: int = 0
+  corrupted: int = 0
+  bytes_sent: int = 0
+  bytes_received: int = 0
+
+  @property
+  def duration(self) -> float:
+    """Segundos entre el primer y el último datagrama de la conexión."""
+    return self.segments[-1].time if self.segments else 0.0
+
+  def throughput(self, interval: float) -> list[tuple[float, float, float]]:
+    """Calcula el throughput de datos de la conexión en intervalos de
+    interval segundos, sin contar retransmisiones ni duplicados.
+
+    Parameters:
+    -----------
+    interval (float): Duración de cada intervalo, en segundos.
+
+    Returns:
+    --------
+    (list[tuple[float, float, float]]): Inicio de cada intervalo (desde el
+        primer datagrama) y bytes por segundo enviados y recibidos en él.
+    """
+    buckets = [[0, 0] for _ in range(int(self.duration / interval) + 1)]
+    for segment in self.segments:
+      if segment.length and not segment.retransmission and segment.kind == "DATA":
+        buckets[int(segment.time / interval)][0 if segment.datagram.sent else 1] += segment.length
+    return [
+      (i * interval, sent / interval, received / interval)
+      for i, (sent, received) in enumerate(buckets)
+    ]
+
+
+def analyze_capture(datagrams: Iterable[CapturedDatagram]) -> list[ConnectionTimeline]:
+  """Reconstruye las conexiones de una captura: decodifica el header de
+  cada datagrama, y detecta retransmisiones, duplicados y segmentos
+  corruptos. Un segmento se considera retransmitido si ya se envió uno con
+  los mismos flags, stream y número de secuencia (los ACKs puros se
+  repiten normalmente, por lo que no se consideran).
+
+  Los RTTs se miden, como en SocketTCP, solo con segmentos enviados una vez
+  (algoritmo de Karn): desde un segmento de datos hasta el ACK de su fin, y
+  desde un SYN, SYN+ACK o FIN hasta la respuesta con su número de
+  secuencia más uno.
+
+  Parameters:
+  -----------
+  datagrams (Iterable[CapturedDatagram]): Datagramas de la captura (ver
+                                          read_capture).
+
+  Returns:
+  --------
+  (list[ConnectionTimeline]): Conexiones de la captura, vistas desde cada
+      socket que las capturó, por orden de inicio. Una misma dirección
+      local y remota con un nuevo SYN inicia una nueva conexión.
+  """
+  from socketTCP import SocketTCP
+
+  timelines = []
+  current: dict[tuple[tuple[str, int], tuple[str, int]], ConnectionTimeline] = {}
+  syn_seqs: dict[int, int] = {}
+  seen: dict[int, set[tuple]] = {}
+  awaiting_ack: dict[int, dict[tuple[int, int], float | None]] = {}
+
+  for datagram in datagrams:
+    try:
+      header, data = SocketTCP.parse_segment(datagram.data)
+    except (ValueError, IndexError, struct.error):
+      header, data = None, b""
+
+    # Un SYN con otro número de secuencia que el de la conexión en curso
+    # inicia una nueva
+    key = (datagram.local, datagram.remote)
+    timeline = current.get(key)
+    if timeline is None or (
+      header is not None and header.syn and not header.ack and
+      syn_seqs.get(id(timeline), header.seq) != header.seq
+    ):
+      timeline = current[key] = ConnectionTimeline(datagram.local, datagram.remote, datagram.time)
+      timelines.append(timeline)
+    connection = id(timeline)
+    if header is not None and header.syn and not header.ack:
+      syn_seqs.setdefault(connection, header.seq)
+
+    segment = SegmentRecord(datagram.time - timeline.start, datagram, header)
+    timeline.segments.append(segment)
+    if header is None:
+      continue
+
+    # Los datos pueden estar truncados en la captura, pero su largo se
+    # deduce del largo original del datagrama
+    segment.length = datagram.length - (len(datagram.data) - len(data))
+    if datagram.length == len(datagram.data) and not SocketTCP.verify_checksum(datagram.data):
+      segment.corrupted = True
+      timeline.corrupted += 1
+      continue
+    is_pure_ack = header.ack and not header.syn and not header.fin
+    if is_pure_ack:
+      segment.sack = parse_sack(data)
+
+    # Retransmisiones (o duplicados, si se recibió)
+    if not is_pure_ack:
+      identity = (datagram.sent, header.syn, header.ack, header.fin, header.stream_id, header.seq)
+      segments_seen = seen.setdefault(connection, set())
+      segment.retransmission = identity in segments_seen
+      segments_seen.add(identity)
+      if segment.retransmission:
+        if datagram.sent:
+          timeline.retransmissions += 1
+        else:
+          timeline.duplicates += 1
+      elif not (header.syn or header.fin):
+        if datagram.sent:
+          timeline.bytes_sent += segment.length
+        else:
+          timeline.bytes_received += segment.length
+
+    # RTT: un segmento enviado espera una respuesta con el número de
+    # secuencia que confirma su fin. Si se retransmite, no se mide.
+    pending = awaiting_ack.setdefault(connection, {})
+    if datagram.sent and not is_pure_ack:
+      expected = seq_add(header.seq, 1 if header.syn or header.fin else segment.length)
+      if expected != header.seq:
+        ack_key = (header.stream_id, expected)
+        pending[ack_key] = None if segment.retransmission or ack_key in pending else segment.time
+    elif not datagram.sent and header.ack:
+      sent_at = pending.pop((header.stream_id, header.seq), None)
+      if sent_at is not None:
+        segment.rtt = segment.time - sent_at
+        timeline.rtt_samples.append(segment.rtt)
+
+  timelines.sort(key=lambda timeline: timeline.start)
+  return timelines
+
+
+def replay_capture(
+  datagrams: list[CapturedDatagram], address: tuple[str, int], speed: float = 1.0,
+  handshake_timeout: float = 1.0
+) -> dict:
+  """Reenvía a un SocketTCP que escucha en address los datagramas que un
+  extremo de una conexión capturada envió al otro, para reproducir su
+  tráfico sobre un receptor (por ejemplo, para perfilarlo).
+
+  La reproducción es en lazo abierto: las respuestas del receptor se
+  descartan, y lo que este pierda no se retransmite más allá de las
+  retransmisiones capturadas. Solo el handshake espera al SYN+ACK, cuyo
+  identificador de conexión reemplaza al capturado en los segmentos
+  siguientes (recalculando su checksum). El receptor debe negociar las
+  mismas opciones que el original, y no se reproducen conexiones con fast
+  open, pues su cookie solo la acepta el servidor original.
+
+  Parameters:
+  -----------
+  datagrams (list[CapturedDatagram]): Datagramas a reenviar, completos
+                                      (capturados con snaplen suficiente).
+  address (tuple[str, int]): Dirección del receptor.
+  speed (float): Factor de velocidad respecto a los tiempos capturados; 0
+                 los reenvía sin esperas.
+  handshake_timeout (float): Tiempo máximo de espera del SYN+ACK, en
+                             segundos.
+
+  Returns:
+  --------
+  (dict): Datagramas reenviados, respuestas recibidas y duración de la
+          reproducción en segundos.
+
+  Raises:
+  -------
+  ValueError: Si algún datagrama está truncado.
+  """
+  from socketTCP import SocketTCP
+
+  if any(datagram.length != len(datagram.data) for datagram in datagrams):
+    raise ValueError("Truncated datagrams cannot be replayed")
+
+  result = {"datagrams": 0, "responses": 0}
+  conn_id = None
+  with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock, selectors.DefaultSelector() as selector:
+    sock.setblocking(False)
+    selector.register(sock, selectors.EVENT_READ)
+
+    # Las respuestas se descartan, pero el SYN+ACK indica el identificador
+    # de conexión, y su origen la dirección a la que enviar lo siguiente
+    # (distinta de address si el receptor usa un puerto por conexión)
+    def drain(timeout: float) -> bool:
+      nonlocal conn_id, address
+      syn_ack = False
+      while selector.select(timeout):
+        timeout = 0
+        try:
+          response, response_address = sock.recvfrom(0xFFFF)
+        except OSError:
+          continue
+        result["responses"] += 1
+        address = response_address
+        try:
+          header, _ = SocketTCP.parse_segment(response)
+        except (ValueError, IndexError, struct.error):
+          continue
+        if header.syn and header.ack:
+          conn_id = header.conn_id
+          syn_ack = True
+      return syn_ack
+
+    started_at = time.monotonic()
+    first_time = datagrams[0].time if datagrams else 0.0
+    for datagram in datagrams:
+      if speed > 0:
+        wait = started_at + (datagram.time - first_time) / speed - time.monotonic()
+        if wait > 0:
+          drain(wait)
+      drain(0)
+
+      segment = datagram.data
+      if conn_id is not None:
+        segment = _replace_conn_id(segment, conn_id)
+      sock.sendto(segment, address)
+      result["datagrams"] += 1
+
+      try:
+        header, _ = SocketTCP.parse_segment(segment)
+      except (ValueError, IndexError, struct.error):
+        continue
+      if header.syn and not header.ack:
+        deadline = time.monotonic() + handshake_timeout
+        while not drain(max(deadline - time.monotonic(), 0)) and time.monotonic() < deadline:
+          pass
+    drain(0)
+    result["elapsed"] = time.monotonic() - started_at
+  return result
+
+
+def _replace_conn_id(segment: bytes, conn_id: int) -> bytes:
+  """Reemplaza el identificador de conexión de un segmento en formato
+  binario, recalculando su checksum si lo trae y era correcto.
+  """
+  from socketTCP import SocketTCP
+
+  if len(segment) < BINARY_HEADER.size or segment[0] != BINARY_HEADER_VERSION:
+    return segment
+  if CONN_ID_FIELD.unpack_from(segment, CONN_ID_OFFSET)[0] in (0, conn_id):
+    return segment
+  valid = SocketTCP.verify_checksum(segment)
+  rewritten = bytearray(segment)
+  CONN_ID_FIELD.pack_into(rewritten, CONN_ID_OFFSET, conn_id)
+  data_start = BINARY_HEADER.size + CHECKSUM.size
+  if rewritten[1] & CHECKSUM_FLAG and valid and len(rewritten) >= data_start:
+    rewritten[BINARY_HEADER.size:data_start] = SocketTCP.checksum_segment(
+      bytes(rewritten[:BINARY_HEADER.size]), rewritten[data_start:]
+    )
+  return bytes(rewritten)
+
+
+if __name__ == "__main__":
+  from socketTCP import SocketTCP
+  from compression import CODECS
+
+  parser = argparse.ArgumentParser(
+    description="Analiza o reproduce capturas de SocketTCP escritas con PacketCapture."
+  )
+  subparsers = parser.add_subparsers(dest="command", required=True)
+  analyze_parser = subparsers.add_parser(
+    "analyze", help="reconstruye las conexiones de la captura, sus RTTs, retransmisiones y throughput"
+  )
+  analyze_parser.add_argument("file")
+  analyze_parser.add_argument(
+    "--interval", type=float, default=0.1, help="intervalo del throughput, en segundos"
+  )
+  analyze_parser.add_argument(
+    "--timeline", action="store_true", help="imprime cada segmento de cada conexión"
+  )
+  replay_parser = subparsers.add_parser(
+    "replay", help="reenvía el tráfico de una conexión capturada a un receptor"
+  )
+  replay_parser.add_argument("file")
+  replay_parser.add_argument(
+    "--connection", type=int, default=0, help="índice de la conexión, según analyze"
+  )
+  replay_parser.add_argument(
+    "--direction", choices=("sent", "received"), default=None,
+    help="datagramas a reenviar (por defecto, el sentido con más datos)"
+  )
+  replay_parser.add_argument(
+    "--address", default=None,
+    help="receptor host:puerto (por defecto, uno local creado con las opciones siguientes)"
+  )
+  replay_parser.add_argument("--speed", type=float, default=1.0, help="0 para no esperar")
+  replay_parser.add_argument("--window", type=int, default=16)
+  replay_parser.add_argument(
+    "--mode", choices=(SocketTCP.GO_BACK_N, SocketTCP.SELECTIVE_REPEAT),
+    default=SocketTCP.SELECTIVE_REPEAT
+  )
+  replay_parser.add_argument(
+    "--compression", default="none",
+    help=f"algoritmo de compresión del receptor (none, {', '.join(codec.name for codec in CODECS.values())})"
+  )
+  replay_parser.add_argument(
+    "--timeout", type=float, default=5.0, help="segundos sin datos tras los cuales el receptor termina"
+  )
+  replay_parser.add_argument(
+    "--profile", action="store_true", help="perfila el receptor con cProfile"
+  )
+  args = parser.parse_args()
+
+  timelines = analyze_capture(read_capture(args.file))
+
+  if args.command == "analyze":
+    for index, timeline in enumerate(timelines):
+      print(
+        f"[{index}] {timeline.local[0]}:{timeline.local[1]} <-> "
+        f"{timeline.remote[0]}:{timeline.remote[1]}  {timeline.duration:.3f} s, "
+        f"{len(timeline.segments)} segments, {timeline.bytes_sent} bytes sent, "
+        f"{timeline.bytes_received} bytes received"
+      )
+      rtts = timeline.rtt_samples
+      print(
+        f"    retransmissions {timeline.retransmissions}, duplicates {timeline.duplicates}, "
+        f"corrupted {timeline.corrupted}, rtt "
+        + (
+          f"min {min(rtts) * 1e3:.3f} ms, avg {sum(rtts) / len(rtts) * 1e3:.3f} ms, "
+          f"max {max(rtts) * 1e3:.3f} ms ({len(rtts)} samples)" if rtts else "-"
+        )
+      )
+      if args.timeline:
+        for segment in timeline.segments:
+          header = segment.header
+          details = "" if header is None else (
+            f" seq={header.seq} len={segment.length} win={header.window} stream={header.stream_id}"
+          )
+          notes = [note for note, is_set in (
+            ("retransmission" if segment.datagram.sent else "duplicate", segment.retransmission),
+            ("corrupted", segment.corrupted),
+          ) if is_set]
+          if segment.sack:
+            notes.append("sack " + " ".join(f"{start}-{end}" for start, end in segment.sack))
+          if segment.rtt is not None:
+            notes.append(f"rtt {segment.rtt * 1e3:.3f} ms")
+          print(
+            f"    {segment.time:10.6f} {'->' if segment.datagram.sent else '<-'} "
+            f"{segment.kind:<7}{details}{'  [' + ', '.join(notes) + ']' if notes else ''}"
+          )
+      for start, sent, received in timeline.throughput(args.interval):
+        if sent or received:
+          print(f"    {start:8.3f} s  sent {sent / 1e6:8.3f} MB/s  received {received / 1e6:8.3f} MB/s")
+
+  else:
+    if not 0 <= args.connection < len(timelines):
+      parser.error(f"the capture has {len(timelines)} connections")
+    timeline = timelines[args.connection]
+    sent = timeline.bytes_sent >= timeline.bytes_received
+    if args.direction is not None:
+      sent = args.direction == "sent"
+    datagrams = [segment.datagram for segment in timeline.segments if segment.datagram.sent == sent]
+
+    if args.address is not None:
+      host, _, port = args.address.rpartition(":")
+      print(replay_capture(datagrams, (host, int(port)), args.speed))
+    else:
+      # El receptor corre en el hilo principal, para poder perfilarlo, y la
+      # reproducción en otro. Como esta no respeta su ventana, su buffer de
+      # recepción debe caber todo lo reenviado.
+      codecs = [codec for codec in CODECS.values() if codec.name == args.compression]
+      receiver = SocketTCP(
+        args.window, args.mode, compression=codecs,
+        recv_buffer_size=max(SocketTCP.RECV_BUFFER_SIZE, sum(datagram.length for datagram in datagrams))
+      )
+      receiver.bind(("127.0.0.1", 0))
+      receiver.listen()
+      receiver.settimeout(args.timeout)
+      replay_result = {}
+      replay_thread = threading.Thread(
+        target=lambda: replay_result.update(replay_capture(datagrams, receiver.address, args.speed)),
+        daemon=True
+      )
+
+      profiler = cProfile.Profile() if args.profile else None
+      received = 0
+      started_at = time.perf_counter()
+      replay_thread.start()
+      with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if profiler is not None:
+          profiler.enable()
+        try:
+          connection, _ = receiver.accept()
+          connection.settimeout(args.timeout)
+          buffer = memoryview(bytearray(1 << 16))
+          while True:
+            nbytes = connection.recv_into(buffer)
+            if nbytes == 0:
+              break
+            received += nbytes
+        except socket.timeout:
+          pass
+        finally:
+          if profiler is not None:
+            profiler.disable()
+      elapsed = time.perf_counter() - started_at
+      replay_thread.join()
+      receiver.close()
+
+      print(
+        f"received {received} bytes in {elapsed:.3f} s "
+        f"({received / elapsed / 1e6:.3f} MB/s), replay {replay_result}"
+      )
+      if profiler is not None:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
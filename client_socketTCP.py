@@ -1,50 +1,46 @@
 import sys
-from socketTCP import SocketTCP
+from pool_socketTCP import SocketTCPPool
 from utilities import *
 
 if __name__ == "__main__":
 
-  # Primero que nada se instancia un socket tcp,
-  # se define un tamaño de buffer y una secuencia de fin de mensaje
-  socketTCP = SocketTCP()
-  end_of_message: str = "\r\n\r\n"
+  # Primero que nada se instancia un pool de conexiones y se define su
+  # timeout. Todos los archivos se envían reutilizando la misma conexión.
   timeout: float = 3
+  pool = SocketTCPPool(max_connections_per_host=1, timeout=timeout)
 
   try:
 
-    if len(sys.argv) == 4:
+    if len(sys.argv) >= 4:
       args: list = sys.argv[1:]
       addr: str = args[0]
       port: int = int(args[1])
-      file_name: str = args[2]
-    
+      file_names: list[str] = args[2:]
+
     else:
       raise ArgumentsParsingException('Error parsing arguments, script should be run as: \n \
-      python3 client.py [address] [port] [file_name].txt')
+      python3 client.py [address] [port] [file_name].txt [[file_name].txt ...]')
 
   except ArgumentsParsingException as err:
     print(err)
-  
-  else:
 
-    try:
-      # Leemos el contenido del archivo (el cual debe estar dentro del directorio
-      # donde se encuentra este archivo) y enviamos dicho contenido al servidor
-      f = open(file_name, "r")
-      file_content: str = f.read()
-      f.close()
-
-      socketTCP.settimeout(timeout)
+  else:
 
-      socketTCP.connect((addr, port))
-      print('====== CONNECTED =======')
+    for file_name in file_names:
+      try:
+        with pool.connection((addr, port)) as socketTCP:
 
-      socketTCP.send(file_content + end_of_message)
-      print(f"Sent content of file {file_name} to server running on ({addr}, {port})")
+          # Enviamos el contenido del archivo (el cual debe estar dentro del
+          # directorio donde se encuentra este archivo) al servidor, de a
+          # trozos y sin cargarlo completo en memoria
+          with open(file_name, "rb") as f:
+            file_size: int = socketTCP.sendfile(f)
+        print(f"Sent {file_size} bytes of file {file_name} to server running on ({addr}, {port})")
 
-      # Recibimos el cierre de conexión
-      socketTCP.recv(1024)
+      # Si surge algún error lo reportamos
+      except:
+        print(f"Error while trying to read file {file_name}")
 
-    # Si surge algún error lo reportamos
-    except:
-      print(f"Error while trying to read file {file_name}")
\ No newline at end of file
+  # Cerramos las conexiones del pool
+  finally:
+    pool.close()
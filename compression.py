@@ -0,0 +1,134 @@
+from __future__ import annotations
+import zlib
+
+try:
+  import lz4.block as lz4_block
+except ImportError:
+  lz4_block = None
+
+
+class Codec:
+  """Interfaz de los algoritmos de compresión que SocketTCP puede
+  negociar en el handshake. Los mensajes se comprimen en bloques
+  independientes, por lo que una instancia no guarda estado entre bloques
+  y puede compartirse entre los streams de una conexión.
+
+  SocketTCP recibe las clases ofrecidas, en orden de preferencia, y cada
+  extremo construye una instancia de la negociada.
+
+  Attributes:
+  -----------
+
+  name (str): Nombre del algoritmo.
+  codec_id (int): Identificador con que se anuncia en el handshake.
+  available (bool): Si el algoritmo puede usarse en este sistema (por
+                    ejemplo, si está instalada su librería).
+  """
+
+  name: str = ""
+  codec_id: int = 0
+  available: bool = True
+
+  def compress(self, data: bytes | memoryview) -> bytes:
+    """Comprime un bloque.
+
+    Parameters:
+    -----------
+    data (bytes | memoryview): Datos del bloque.
+
+    Returns:
+    --------
+    (bytes): Bloque comprimido.
+    """
+    raise NotImplementedError
+
+  def decompress(self, data: bytes | memoryview, size: int) -> bytes:
+    """Descomprime un bloque comprimido con compress.
+
+    Parameters:
+    -----------
+    data (bytes | memoryview): Bloque comprimido.
+    size (int): Tamaño original del bloque.
+
+    Returns:
+    --------
+    (bytes): Datos originales del bloque.
+
+    Raises:
+    -------
+    ValueError: Si el bloque está corrupto o no ocupa exactamente size
+                bytes descomprimido. Nunca se descomprimen más de size
+                bytes, para que un bloque malicioso no agote la memoria.
+    """
+    raise NotImplementedError
+
+
+class ZlibCodec(Codec):
+  """Compresión con zlib (deflate), disponible en cualquier instalación de
+  Python.
+  """
+
+  name = "zlib"
+  codec_id = 1
+
+  def __init__(self, level: int = 6):
+    """Constructor de ZlibCodec.
+
+    Parameters:
+    -----------
+    level (int): Nivel de compresión, de 1 (más rápido) a 9 (menor tamaño).
+    """
+    self.level: int = level
+
+  def compress(self, data: bytes | memoryview) -> bytes:
+    return zlib.compress(data, self.level)
+
+  def decompress(self, data: bytes | memoryview, size: int) -> bytes:
+    # Con max_length 0 no habría límite, por lo que un bloque vacío se
+    # descomprime con límite 1 y se rechaza si produce algún byte. Un bloque
+    # con datos tras el final del stream también se rechaza.
+    decompressor = zlib.decompressobj()
+    try:
+      block = decompressor.decompress(data, max(size, 1))
+    except zlib.error as err:
+      raise ValueError(f"Corrupted zlib block: {err}") from None
+    if (
+      decompressor.unconsumed_tail or decompressor.unused_data or not decompressor.eof or
+      len(block) != size
+    ):
+      raise ValueError("zlib block does not match its original size")
+    return block
+
+
+class Lz4Codec(Codec):
+  """Compresión con LZ4, mucho más rápida que zlib aunque comprime menos.
+  Requiere el paquete lz4; si no está instalado no se ofrece.
+  """
+
+  name = "lz4"
+  codec_id = 2
+  available = lz4_block is not None
+
+  def compress(self, data: bytes | memoryview) -> bytes:
+    return lz4_block.compress(data, store_size=False)
+
+  def decompress(self, data: bytes | memoryview, size: int) -> bytes:
+    # uncompressed_size es el tamaño del buffer de salida, por lo que un
+    # bloque que descomprime más falla en vez de crecer
+    try:
+      block = lz4_block.decompress(data, uncompressed_size=size)
+    except lz4_block.LZ4BlockError as err:
+      raise ValueError(f"Corrupted lz4 block: {err}") from None
+    if len(block) != size:
+      raise ValueError("lz4 block does not match its original size")
+    return block
+
+
+# Algoritmos disponibles en este sistema, indexados por su identificador, y
+# los ofrecidos por defecto al activar la compresión (el más rápido primero)
+CODECS: dict[int, type[Codec]] = {
+  codec.codec_id: codec for codec in (ZlibCodec, Lz4Codec) if codec.available
+}
+DEFAULT_CODECS: tuple[type[Codec], ...] = tuple(
+  codec for codec in (Lz4Codec, ZlibCodec) if codec.available
+)
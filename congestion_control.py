@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+
+class CongestionControl:
+  """Interfaz de los algoritmos de control de congestión usados por el
+  emisor de SocketTCP. La ventana de congestión (cwnd) se mide en
+  segmentos, y el emisor nunca mantiene en vuelo más de
+  min(cwnd, window_size) segmentos.
+
+  Cada conexión usa su propia instancia, por lo que SocketTCP recibe la
+  clase (o cualquier función sin argumentos que construya una instancia).
+
+  Attributes:
+  -----------
+
+  cwnd (float): Ventana de congestión actual, en segmentos.
+  """
+
+  def __init__(self):
+    self.cwnd: float = 1.0
+
+  def on_ack(self, acked_segments: int) -> None:
+    """Llamado cuando llega un ACK que confirma segmentos nuevos.
+
+    Parameters:
+    -----------
+    acked_segments (int): Cantidad de segmentos confirmados por el ACK.
+    """
+
+  def on_dup_ack(self, flight_size: int) -> bool:
+    """Llamado cuando llega un ACK duplicado, es decir, uno que indica que
+    el primer segmento en vuelo aún no llega al receptor pese a que
+    segmentos posteriores sí.
+
+    Parameters:
+    -----------
+    flight_size (int): Cantidad de segmentos en vuelo.
+
+    Returns:
+    --------
+    (bool): Si se debe retransmitir de inmediato el primer segmento en
+            vuelo (fast retransmit).
+    """
+    return False
+
+  def on_timeout(self, flight_size: int) -> None:
+    """Llamado cuando vence el timer de retransmisión.
+
+    Parameters:
+    -----------
+    flight_size (int): Cantidad de segmentos en vuelo.
+    """
+
+
+class FixedWindow(CongestionControl):
+  """Control de congestión nulo: la ventana de congestión no limita al
+  emisor, que queda acotado solo por su window_size.
+  """
+
+  def __init__(self):
+    super().__init__()
+    self.cwnd = float("inf")
+
+
+class RenoCongestionControl(CongestionControl):
+  """Control de congestión al estilo TCP Reno: slow start, congestion
+  avoidance (AIMD), y fast retransmit / fast recovery al recibir tres ACKs
+  duplicados.
+
+  Attributes:
+  -----------
+
+  cwnd (float): Ventana de congestión actual, en segmentos.
+  ssthresh (float): Umbral entre slow start y congestion avoidance.
+  """
+
+  # Cantidad de ACKs duplicados que gatillan un fast retransmit
+  DUP_ACK_THRESHOLD: int = 3
+
+  def __init__(self, initial_cwnd: float = 2.0, initial_ssthresh: float = 64.0):
+    super().__init__()
+    self.cwnd = initial_cwnd
+    self.ssthresh: float = initial_ssthresh
+    self.__dup_acks: int = 0
+    self.__in_fast_recovery: bool = False
+
+  def on_ack(self, acked_segments: int) -> None:
+    self.__dup_acks = 0
+
+    # Al confirmarse datos nuevos termina el fast recovery, y la ventana
+    # se desinfla al umbral
+    if self.__in_fast_recovery:
+      self.__in_fast_recovery = False
+      self.cwnd = self.ssthresh
+
+    # Slow start: la ventana crece en un segmento por segmento confirmado
+    elif self.cwnd < self.ssthresh:
+      self.cwnd += acked_segments
+
+    # Congestion avoidance: la ventana crece en un segmento por RTT
+    else:
+      self.cwnd += acked_segments / self.cwnd
+
+  def on_dup_ack(self, flight_size: int) -> bool:
+    # Durante fast recovery cada ACK duplicado indica que un segmento dejó
+    # la red, por lo que inflamos la ventana
+    if self.__in_fast_recovery:
+      self.cwnd += 1
+      return False
+
+    self.__dup_acks += 1
+    if self.__dup_acks < self.DUP_ACK_THRESHOLD:
+      return False
+
+    # Al tercer ACK duplicado reducimos la ventana a la mitad y entramos
+    # en fast recovery
+    self.ssthresh = max(flight_size / 2, 2.0)
+    self.cwnd = self.ssthresh + self.DUP_ACK_THRESHOLD
+    self.__in_fast_recovery = True
+    return True
+
+  def on_timeout(self, flight_size: int) -> None:
+    # Ante un timeout volvemos a slow start desde una ventana de un segmento
+    self.ssthresh = max(flight_size / 2, 2.0)
+    self.cwnd = 1.0
+    self.__dup_acks = 0
+    self.__in_fast_recovery = False
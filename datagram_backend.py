@@ -0,0 +1,167 @@
+from __future__ import annotations
+import io
+import queue
+import random
+import socket
+import sys
+import threading
+import time
+from typing import Callable
+from batch_io import BatchDatagramIO
+
+
+class DatagramBackend:
+  """Interfaz con que SocketTCP accede al sistema: sockets udp, reloj,
+  hilos, colas entre hilos y números aleatorios. SystemBackend usa los del
+  sistema operativo; simulation.SimulatedHost los reemplaza por una red
+  simulada con tiempo virtual.
+
+  Los sockets retornados por socket deben soportar, con la semántica de
+  socket.socket: bind, getsockname, sendto, recvfrom_into, settimeout,
+  setsockopt, getsockopt, fileno y close. Las colas deben soportar put, get
+  (con timeout, lanzando queue.Empty) y qsize.
+
+  Attributes:
+  -----------
+
+  batch_io (bool): Si los sockets soportan el envío y la recepción en lote
+                   de BatchDatagramIO.
+  """
+
+  batch_io: bool = False
+
+  def socket(self):
+    """Crea un socket udp IPv4."""
+    raise NotImplementedError
+
+  def monotonic(self) -> float:
+    """Retorna el tiempo actual en segundos, de un reloj que no retrocede."""
+    raise NotImplementedError
+
+  def queue(self):
+    """Crea una cola entre hilos."""
+    raise NotImplementedError
+
+  def start_thread(self, target: Callable[[], None]) -> None:
+    """Ejecuta target en un nuevo hilo, que no impide terminar al programa.
+
+    Parameters:
+    -----------
+    target (Callable[[], None]): Función a ejecutar.
+    """
+    raise NotImplementedError
+
+  def randint(self, a: int, b: int) -> int:
+    """Retorna un entero aleatorio entre a y b, ambos incluidos."""
+    raise NotImplementedError
+
+  def notifier(self) -> ReadinessNotifier:
+    """Crea un ReadinessNotifier, con el que un SocketTCP que no lee
+    directamente de su socket udp avisa a selectors que tiene algo que
+    atender.
+
+    Raises:
+    -------
+    io.UnsupportedOperation: Si el backend no usa descriptores del sistema.
+    """
+    raise io.UnsupportedOperation("This backend has no file descriptors to select on")
+
+  def path_mtu(self, address: tuple[str, int]) -> int | None:
+    """Retorna el MTU de la ruta hacia address, o None si no se conoce.
+
+    Parameters:
+    -----------
+    address (tuple[str, int]): Dirección de destino.
+
+    Returns:
+    --------
+    (int | None): MTU de la ruta, en bytes.
+    """
+    return None
+
+
+class SystemBackend(DatagramBackend):
+  """Backend de SocketTCP sobre los sockets, hilos y reloj del sistema."""
+
+  batch_io = BatchDatagramIO.available
+
+  def socket(self) -> socket.socket:
+    return socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+  def monotonic(self) -> float:
+    return time.monotonic()
+
+  def queue(self) -> queue.Queue:
+    return queue.Queue()
+
+  def start_thread(self, target: Callable[[], None]) -> None:
+    threading.Thread(target=target, daemon=True).start()
+
+  def randint(self, a: int, b: int) -> int:
+    return random.randint(a, b)
+
+  def notifier(self) -> ReadinessNotifier:
+    return ReadinessNotifier()
+
+  def path_mtu(self, address: tuple[str, int]) -> int | None:
+    # Un socket udp "conectado" no envía nada, pero permite consultar el
+    # MTU de la ruta hacia la dirección (IP_MTU, solo en Linux)
+    ip_mtu = getattr(socket, "IP_MTU", 14 if sys.platform.startswith("linux") else None)
+    if ip_mtu is None:
+      return None
+    try:
+      with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+        probe.connect(address)
+        return probe.getsockopt(socket.IPPROTO_IP, ip_mtu)
+    except OSError:
+      return None
+
+
+class ReadinessNotifier:
+  """Descriptor que se vuelve legible (para select, poll o selectors)
+  cuando se llama a notify, y deja de serlo con clear. Es un extremo de un
+  par de sockets conectados, en el otro de los cuales notify escribe un
+  byte, por lo que puede avisarse desde cualquier hilo.
+
+  Quien espera debe llamar a clear antes de revisar si tiene algo que
+  atender, y quien avisa a notify después de dejarlo, de modo que ningún
+  aviso se pierda.
+  """
+
+  def __init__(self):
+    """Constructor de ReadinessNotifier."""
+    self.__reader, self.__writer = socket.socketpair()
+    self.__reader.setblocking(False)
+    self.__writer.setblocking(False)
+
+  def fileno(self) -> int:
+    """Retorna el descriptor que se vuelve legible con notify."""
+    return self.__reader.fileno()
+
+  def notify(self) -> None:
+    """Vuelve legible el descriptor. Si ya tiene avisos pendientes de
+    sobra (el buffer del par se llenó) o se cerró, no hace nada.
+    """
+    try:
+      self.__writer.send(b"\0")
+    except OSError:
+      pass
+
+  def clear(self) -> None:
+    """Descarta los avisos pendientes, de modo que el descriptor deje de
+    ser legible.
+    """
+    try:
+      while self.__reader.recv(4096):
+        pass
+    except OSError:
+      pass
+
+  def close(self) -> None:
+    """Cierra ambos extremos del par."""
+    self.__reader.close()
+    self.__writer.close()
+
+
+# Backend usado por los SocketTCP que no indican otro
+SYSTEM_BACKEND: SystemBackend = SystemBackend()
@@ -0,0 +1,250 @@
+from __future__ import annotations
+import struct
+from typing import Generic, Iterator, TypeVar
+from socketTCP import SocketTCP
+
+Message = TypeVar("Message")
+
+
+class Framer:
+  """Interfaz de los delimitadores de mensajes (frames) usados sobre el
+  flujo de bytes de una conexión. El framer acumula los bytes recibidos
+  que aún no forman un frame completo, y entrega los frames completos sin
+  volver a revisar los bytes ya revisados.
+
+  Cada conexión usa su propia instancia, pues guarda el estado de la
+  recepción.
+  """
+
+  def __init__(self):
+    # Bytes recibidos y posición del inicio del próximo frame en ellos
+    self._buffer: bytearray = bytearray()
+    self._start: int = 0
+
+  def __len__(self) -> int:
+    """Cantidad de bytes recibidos que aún no forman un frame completo."""
+    return len(self._buffer) - self._start
+
+  def frame(self, payload: bytes | memoryview) -> bytes:
+    """Construye el frame que contiene a payload, listo para enviarse.
+
+    Parameters:
+    -----------
+    payload (bytes | memoryview): Contenido del frame.
+
+    Returns:
+    --------
+    (bytes): Frame a enviar.
+    """
+    raise NotImplementedError
+
+  def feed(self, data: bytes | memoryview) -> None:
+    """Agrega bytes recibidos de la conexión. Los bytes de frames ya
+    entregados se descartan cuando ocupan al menos la mitad del buffer, de
+    modo que cada byte se mueve en memoria un número constante de veces.
+
+    Parameters:
+    -----------
+    data (bytes | memoryview): Bytes recibidos.
+    """
+    if self._start and self._start >= len(self._buffer) // 2:
+      del self._buffer[:self._start]
+      self._start = 0
+    self._buffer += data
+
+  def next_frame(self) -> bytes | None:
+    """Retorna el contenido del próximo frame completo, o None si los
+    bytes recibidos aún no completan uno.
+    """
+    raise NotImplementedError
+
+  def _take(self, payload_end: int, frame_end: int) -> bytes:
+    """Retorna los bytes desde el inicio del frame actual hasta
+    payload_end, y avanza el inicio del próximo frame hasta frame_end.
+    """
+    payload = bytes(self._buffer[self._start:payload_end])
+    self._start = frame_end
+    return payload
+
+
+class LengthPrefixFramer(Framer):
+  """Frames precedidos por su largo en bytes, codificado con un formato
+  de struct de largo fijo (por defecto 4 bytes sin signo, en orden de red).
+  """
+
+  def __init__(self, length_format: str = "!I", max_frame_size: int | None = None):
+    """Constructor de LengthPrefixFramer.
+
+    Parameters:
+    -----------
+    length_format (str): Formato de struct del largo de cada frame.
+    max_frame_size (int | None): Largo máximo aceptado para un frame. Si es
+                                 None solo lo limita length_format.
+    """
+    super().__init__()
+    self.__header: struct.Struct = struct.Struct(length_format)
+    self.__max_frame_size: int | None = max_frame_size
+
+  def frame(self, payload: bytes | memoryview) -> bytes:
+    self.__check_size(len(payload))
+    return self.__header.pack(len(payload)) + payload
+
+  def next_frame(self) -> bytes | None:
+    header_end = self._start + self.__header.size
+    if len(self._buffer) < header_end:
+      return None
+    (length,) = self.__header.unpack_from(self._buffer, self._start)
+    self.__check_size(length)
+    if len(self._buffer) < header_end + length:
+      return None
+    self._start = header_end
+    return self._take(header_end + length, header_end + length)
+
+  def __check_size(self, length: int) -> None:
+    if self.__max_frame_size is not None and length > self.__max_frame_size:
+      raise ValueError(f"Frame of {length} bytes exceeds the maximum of {self.__max_frame_size}")
+
+
+class DelimiterFramer(Framer):
+  """Frames terminados por una secuencia delimitadora, que no puede
+  aparecer en su contenido. La búsqueda del delimitador es incremental:
+  cada byte recibido se revisa una sola vez, salvo los últimos
+  len(delimiter) - 1, que podrían ser el inicio de un delimitador dividido
+  entre dos recepciones.
+  """
+
+  def __init__(self, delimiter: bytes = b"\r\n\r\n", max_frame_size: int | None = None):
+    """Constructor de DelimiterFramer.
+
+    Parameters:
+    -----------
+    delimiter (bytes): Secuencia que termina cada frame.
+    max_frame_size (int | None): Largo máximo aceptado para un frame, sin
+                                 contar el delimitador. Si es None no hay
+                                 límite.
+    """
+    if not delimiter:
+      raise ValueError("delimiter must not be empty")
+    super().__init__()
+    self.__delimiter: bytes = delimiter
+    self.__max_frame_size: int | None = max_frame_size
+
+    # Bytes del frame actual ya revisados sin encontrar el delimitador
+    self.__scanned: int = 0
+
+  def frame(self, payload: bytes | memoryview) -> bytes:
+    # El delimitador no puede aparecer en el contenido, ni formarse entre
+    # el final del contenido y el delimitador que lo termina
+    frame = bytes(payload) + self.__delimiter
+    if frame.find(self.__delimiter) != len(payload):
+      raise ValueError("payload contains the frame delimiter")
+    return frame
+
+  def next_frame(self) -> bytes | None:
+    search_from = self._start + max(self.__scanned - len(self.__delimiter) + 1, 0)
+    payload_end = self._buffer.find(self.__delimiter, search_from)
+    if payload_end == -1:
+      self.__scanned = len(self)
+      if self.__max_frame_size is not None and self.__scanned > self.__max_frame_size + len(self.__delimiter):
+        raise ValueError(f"Frame exceeds the maximum of {self.__max_frame_size} bytes")
+      return None
+    self.__scanned = 0
+    return self._take(payload_end, payload_end + len(self.__delimiter))
+
+
+class BytesCodec:
+  """Codec nulo: los mensajes son los bytes de cada frame."""
+
+  def encode(self, message: bytes | memoryview) -> bytes | memoryview:
+    return message
+
+  def decode(self, payload: bytes) -> bytes:
+    return payload
+
+
+class StrCodec:
+  """Codec de texto: los mensajes son str codificados con encoding. Como
+  se decodifica cada frame completo, un caracter de varios bytes nunca
+  queda dividido entre dos recepciones.
+  """
+
+  def __init__(self, encoding: str = "utf-8", errors: str = "strict"):
+    self.encoding: str = encoding
+    self.errors: str = errors
+
+  def encode(self, message: str) -> bytes:
+    return message.encode(self.encoding, self.errors)
+
+  def decode(self, payload: bytes) -> str:
+    return payload.decode(self.encoding, self.errors)
+
+
+class FramedSocket(Generic[Message]):
+  """Capa de mensajes sobre una conexión SocketTCP: cada mensaje se
+  codifica con codec y viaja como un frame delimitado por framer, sin
+  importar cómo se divida el flujo en las llamadas a recv. Permite recibir
+  muchos mensajes completos por conexión, iterando sobre el objeto.
+  """
+
+  def __init__(
+    self, connection: SocketTCP, framer: Framer | None = None,
+    codec: BytesCodec | StrCodec | None = None, buff_size: int = 4096
+  ):
+    """Constructor de FramedSocket.
+
+    Parameters:
+    -----------
+    connection (SocketTCP): Conexión ya establecida.
+    framer (Framer | None): Delimitador de mensajes. Si es None se usa un
+                            LengthPrefixFramer.
+    codec (BytesCodec | StrCodec | None): Codec de los mensajes. Si es None
+                                          se usa BytesCodec.
+    buff_size (int): Cantidad máxima de bytes a pedir en cada recv.
+    """
+    self.connection: SocketTCP = connection
+    self.framer: Framer = framer if framer is not None else LengthPrefixFramer()
+    self.codec: BytesCodec | StrCodec = codec if codec is not None else BytesCodec()
+    self.__recv_buffer: bytearray = bytearray(buff_size)
+    self.__recv_view: memoryview = memoryview(self.__recv_buffer)
+
+  def send(self, message: Message) -> None:
+    """Envía message como un frame.
+
+    Parameters:
+    -----------
+    message (Message): Mensaje a enviar.
+    """
+    self.connection.send(self.framer.frame(self.codec.encode(message)))
+
+  def recv(self) -> Message | None:
+    """Retorna el próximo mensaje completo, recibiendo de la conexión
+    solo si los bytes ya recibidos no lo completan.
+
+    Returns:
+    --------
+    (Message | None): Mensaje recibido, o None si la conexión se cerró.
+
+    Raises:
+    -------
+    ConnectionError: Si la conexión se cierra a mitad de un frame.
+    """
+    while True:
+      payload = self.framer.next_frame()
+      if payload is not None:
+        return self.codec.decode(payload)
+
+      nbytes = self.connection.recv_into(self.__recv_view)
+      if not nbytes:
+        if len(self.framer):
+          raise ConnectionError(f"Connection closed with {len(self.framer)} bytes of an incomplete frame")
+        return None
+      self.framer.feed(self.__recv_view[:nbytes])
+
+  def __iter__(self) -> Iterator[Message]:
+    """Itera sobre los mensajes recibidos hasta que se cierre la conexión."""
+    while (message := self.recv()) is not None:
+      yield message
+
+  def close(self) -> None:
+    """Cierra la conexión subyacente."""
+    self.connection.close()
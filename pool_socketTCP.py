@@ -0,0 +1,269 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from dataclasses import dataclass
+import socket
+import threading
+import time
+from typing import Callable, Iterator
+from socketTCP import SocketTCP
+
+
+@dataclass
+class IdleConnection:
+  """Data Class usada para representar una conexión establecida que espera
+  en el pool a ser reutilizada.
+
+  Attributes:
+  -----------
+
+  connection (SocketTCP): Conexión establecida.
+  idle_since (float): Momento (time.monotonic) en que volvió al pool.
+  checked_at (float): Momento de la última actividad comprobada (su uso o
+                      la última sonda de keep-alive respondida).
+  """
+  connection: SocketTCP
+  idle_since: float
+  checked_at: float
+
+
+class SocketTCPPool:
+  """Pool de conexiones SocketTCP del lado del cliente, por dirección del
+  servidor. Las conexiones establecidas se reutilizan entre transferencias
+  sucesivas, ahorrando el handshake y el cierre de cada una.
+
+  Mientras esperan en el pool, un hilo revisa las conexiones con sondas de
+  keep-alive, y cierra las que llevan más de idle_timeout sin usarse o que
+  dejaron de responder. Una conexión también se revisa al entregarla si su
+  última actividad comprobada es anterior a keepalive_interval.
+
+  Ejemplo:
+
+    pool = SocketTCPPool(max_connections_per_host=2)
+    with pool.connection(("localhost", 5000)) as connection:
+      connection.sendfile(f)
+    pool.close()
+  """
+
+  def __init__(
+    self, max_connections_per_host: int = 4, idle_timeout: float = 60.0,
+    keepalive_interval: float = 15.0, timeout: float | None = None,
+    socket_factory: Callable[[], SocketTCP] = SocketTCP
+  ):
+    """Constructor de SocketTCPPool.
+
+    Parameters:
+    -----------
+    max_connections_per_host (int): Cantidad máxima de conexiones abiertas
+                                    (en uso o esperando en el pool) hacia
+                                    cada dirección.
+    idle_timeout (float): Segundos que una conexión puede esperar en el
+                          pool antes de cerrarse.
+    keepalive_interval (float): Segundos de inactividad tras los cuales se
+                                revisa una conexión con una sonda de
+                                keep-alive.
+    timeout (float | None): Timeout fijado en cada conexión nueva (ver
+                            SocketTCP.settimeout).
+    socket_factory (Callable[[], SocketTCP]): Función que construye cada
+                          conexión nueva, por ejemplo para fijar su modo de
+                          ventana deslizante.
+    """
+    if max_connections_per_host < 1:
+      raise ValueError("max_connections_per_host must be at least 1")
+    if keepalive_interval <= 0 or idle_timeout <= 0:
+      raise ValueError("idle_timeout and keepalive_interval must be positive")
+
+    self.max_connections_per_host: int = max_connections_per_host
+    self.idle_timeout: float = idle_timeout
+    self.keepalive_interval: float = keepalive_interval
+    self.timeout: float | None = timeout
+    self.__socket_factory: Callable[[], SocketTCP] = socket_factory
+
+    # Conexiones que esperan en el pool por dirección (la última en volver
+    # es la primera en reutilizarse), y conexiones abiertas por dirección.
+    # Una conexión que se está revisando no está en el pool, pero cuenta
+    # como abierta.
+    self.__idle: dict[tuple[str, int], list[IdleConnection]] = {}
+    self.__open: dict[tuple[str, int], int] = {}
+    self.__condition: threading.Condition = threading.Condition()
+    self.__closed: bool = False
+    self.__maintainer: threading.Thread | None = None
+
+  def acquire(self, address: tuple[str, int], timeout: float | None = None) -> SocketTCP:
+    """Método encargado de entregar una conexión establecida hacia address:
+    una que espera en el pool si hay alguna viva, o una nueva si no se
+    alcanzó max_connections_per_host. Si no, espera a que se devuelva una.
+
+    Parameters:
+    -----------
+    address (tuple[str, int]): Dirección del servidor.
+    timeout (float | None): Tiempo máximo de espera por una conexión libre,
+                            en segundos. None espera sin límite.
+
+    Returns:
+    --------
+    (SocketTCP): Conexión establecida, que debe devolverse con release.
+
+    Raises:
+    -------
+    socket.timeout: Si no se libera una conexión antes de timeout, o si el
+                    servidor no responde al handshake.
+    RuntimeError: Si el pool fue cerrado.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+      with self.__condition:
+        while True:
+          if self.__closed:
+            raise RuntimeError("Connection pool is closed")
+          idle = self.__idle.get(address)
+          if idle:
+            entry = idle.pop()
+            break
+          if self.__open.get(address, 0) < self.max_connections_per_host:
+            self.__open[address] = self.__open.get(address, 0) + 1
+            entry = None
+            break
+          remaining = None if deadline is None else deadline - time.monotonic()
+          if remaining is not None and remaining <= 0:
+            raise socket.timeout(f"No connection to {address} became available")
+          self.__condition.wait(remaining)
+
+      # Fuera del lock: abrimos una conexión nueva, o revisamos la del pool
+      # si lleva tiempo inactiva. Si esta murió, la descartamos y volvemos
+      # a buscar.
+      if entry is None:
+        return self.__connect(address)
+      if time.monotonic() - entry.checked_at < self.keepalive_interval or entry.connection.keepalive():
+        return entry.connection
+      self.__discard(address, entry.connection)
+
+  def release(self, address: tuple[str, int], connection: SocketTCP, reuse: bool = True) -> None:
+    """Método encargado de devolver al pool una conexión entregada por
+    acquire, para que otra transferencia la reutilice.
+
+    Parameters:
+    -----------
+    address (tuple[str, int]): Dirección con que se pidió la conexión.
+    connection (SocketTCP): Conexión a devolver.
+    reuse (bool): Si es False la conexión se cierra en lugar de volver al
+                  pool, por ejemplo si falló una transferencia y su estado
+                  es incierto.
+    """
+    with self.__condition:
+      if reuse and not self.__closed:
+        now = time.monotonic()
+        self.__idle.setdefault(address, []).append(IdleConnection(connection, now, now))
+        self.__condition.notify_all()
+        self.__start_maintainer()
+        return
+    self.__discard(address, connection)
+
+  @contextmanager
+  def connection(self, address: tuple[str, int], timeout: float | None = None) -> Iterator[SocketTCP]:
+    """Entrega una conexión hacia address (ver acquire) y la devuelve al
+    pool al salir del bloque with. Si el bloque lanza una excepción la
+    conexión se cierra en vez de reutilizarse.
+    """
+    connection = self.acquire(address, timeout)
+    try:
+      yield connection
+    except BaseException:
+      self.release(address, connection, reuse=False)
+      raise
+    self.release(address, connection)
+
+  def close(self) -> None:
+    """Método encargado de cerrar el pool y todas las conexiones que
+    esperan en él. Las conexiones en uso se cierran al devolverse.
+    """
+    with self.__condition:
+      self.__closed = True
+      idle = [(address, entry) for address, entries in self.__idle.items() for entry in entries]
+      self.__idle.clear()
+      self.__condition.notify_all()
+    for address, entry in idle:
+      self.__discard(address, entry.connection)
+
+  def __enter__(self) -> SocketTCPPool:
+    return self
+
+  def __exit__(self, *exc_info) -> None:
+    self.close()
+
+  def __connect(self, address: tuple[str, int]) -> SocketTCP:
+    """Abre una nueva conexión hacia address, cuyo cupo ya fue reservado."""
+    try:
+      connection = self.__socket_factory()
+      connection.settimeout(self.timeout)
+      connection.connect(address)
+    except BaseException:
+      self.__forget(address)
+      raise
+    return connection
+
+  def __discard(self, address: tuple[str, int], connection: SocketTCP) -> None:
+    """Cierra una conexión y libera su cupo. Un error al cerrarla no se
+    propaga, pues la conexión ya no se usará.
+    """
+    try:
+      connection.close()
+    except OSError:
+      pass
+    finally:
+      self.__forget(address)
+
+  def __forget(self, address: tuple[str, int]) -> None:
+    """Libera el cupo de una conexión hacia address."""
+    with self.__condition:
+      self.__open[address] -= 1
+      if not self.__open[address]:
+        del self.__open[address]
+      self.__condition.notify_all()
+
+  def __start_maintainer(self) -> None:
+    """Inicia, si aún no lo hace, el hilo que revisa las conexiones que
+    esperan en el pool. Debe llamarse con el lock tomado.
+    """
+    if self.__maintainer is None:
+      self.__maintainer = threading.Thread(target=self.__maintain, daemon=True)
+      self.__maintainer.start()
+
+  def __maintain(self) -> None:
+    """Revisa periódicamente las conexiones que esperan en el pool: cierra
+    las que llevan más de idle_timeout sin usarse, y envía una sonda de
+    keep-alive a las que llevan más de keepalive_interval sin actividad
+    comprobada, cerrando las que no responden. Termina al cerrarse el pool.
+    """
+    interval = min(self.keepalive_interval, self.idle_timeout) / 2
+    while True:
+      with self.__condition:
+        self.__condition.wait(interval)
+        if self.__closed:
+          return
+
+        # Sacamos del pool las conexiones a cerrar o revisar, para que
+        # nadie las reciba mientras tanto
+        now = time.monotonic()
+        expired, stale = [], []
+        for address, entries in self.__idle.items():
+          waiting = []
+          for entry in entries:
+            if now - entry.idle_since >= self.idle_timeout:
+              expired.append((address, entry))
+            elif now - entry.checked_at >= self.keepalive_interval:
+              stale.append((address, entry))
+            else:
+              waiting.append(entry)
+          entries[:] = waiting
+
+      for address, entry in expired:
+        self.__discard(address, entry.connection)
+      for address, entry in stale:
+        if entry.connection.keepalive():
+          with self.__condition:
+            if not self.__closed:
+              entry.checked_at = time.monotonic()
+              self.__idle[address].append(entry)
+              self.__condition.notify_all()
+              continue
+        self.__discard(address, entry.connection)
@@ -1,37 +1,182 @@
 from utilities import *
 from socketTCP import SocketTCP
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import fields
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+
+# Dirección donde escucha el servidor, segundos que una conexión puede
+# pasar sin recibir nada antes de cerrarse, cada cuánto revisa un worker si
+# debe terminar, y cuánto se espera a que los workers terminen sus
+# conexiones en curso antes de forzar su término
+ADDRESS: tuple[str, int] = ('localhost', 5000)
+CONNECTION_TIMEOUT: float = 10.0
+SHUTDOWN_POLL_INTERVAL: float = 0.5
+SHUTDOWN_GRACE_PERIOD: float = 30.0
+
+# Métricas de ConnectionStats que se suman entre conexiones
+SUMMED_STATS: list[str] = [
+  stat.name for stat in fields(ConnectionStats) if stat.type in ("int", "float")
+]
+
+
+def handle_connection(
+  connection: SocketTCP, address: tuple[str, int], totals: dict, totals_lock: threading.Lock
+) -> None:
+  # Recibimos archivos hasta que el cliente cierre la conexión, pues puede
+  # reutilizarla para varios. Cada archivo se escribe en disco a medida
+  # que llega, por lo que no se carga completo en memoria. La conexión se
+  # cierra siempre al terminar, aunque falle, para que no quede registrada
+  # en el socket que escucha.
+  connection.settimeout(CONNECTION_TIMEOUT)
+  file_count = 0
+  received_bytes = 0
+  try:
+    while True:
+      file_name = f"received_{address[0]}_{address[1]}_{file_count}.txt"
+      try:
+        with open(file_name, "wb") as f:
+          file_size = connection.recv_to_file(f)
+
+      # Si el cliente cerró la conexión, o esta pasó demasiado tiempo
+      # inactiva, descartamos el archivo incompleto
+      except (ConnectionError, ValueError, socket.timeout):
+        os.remove(file_name)
+        break
+
+      file_count += 1
+      received_bytes += file_size
+      print("\nReceived file: ")
+      print("=================\n")
+      print(f"{file_size} bytes saved in {file_name}\n\n")
+      print(address)
+  finally:
+    connection.close()
+
+  # Sumamos las métricas de la conexión a las del worker
+  with totals_lock:
+    totals["connections"] += 1
+    totals["files"] += file_count
+    totals["file_bytes"] += received_bytes
+    for stat in SUMMED_STATS:
+      totals[stat] += getattr(connection.stats, stat)
+
+
+def serve(
+  threads: int, reuse_port: bool, stop: threading.Event | None = None,
+  fast_open_key: bytes | None = None
+) -> dict:
+  # Cada worker tiene su propio socket escuchando en ADDRESS. Con
+  # reuse_port todos comparten el puerto, y el sistema reparte los clientes
+  # (y con ellos sus SYN) entre los workers, por lo que todos firman las
+  # cookies de fast open con la misma clave. Las conexiones se atienden en
+  # un pool de hilos.
+  socketTCP = SocketTCP(fast_open=True, fast_open_key=fast_open_key)
+  socketTCP.bind(ADDRESS, reuse_port=reuse_port)
+  socketTCP.listen()
+  socketTCP.settimeout(SHUTDOWN_POLL_INTERVAL)
+
+  totals = {"connections": 0, "files": 0, "file_bytes": 0, **{stat: 0 for stat in SUMMED_STATS}}
+  totals_lock = threading.Lock()
+  print(f'Worker {os.getpid()} listening for messages in {ADDRESS}...')
+  with ThreadPoolExecutor(max_workers=threads) as executor:
+    while stop is None or not stop.is_set():
+
+      # Aceptamos conexión, revisando periódicamente si debemos terminar
+      try:
+        connection, address = socketTCP.accept()
+      except socket.timeout:
+        continue
+      print('====== ACCEPTED CONNECTION =======')
+      executor.submit(handle_connection, connection, connection.conn_sock_addr, totals, totals_lock)
+
+    # Al terminar el bloque with se espera a que terminen las conexiones
+    # en curso, que usan el socket udp de socketTCP, antes de cerrarlo
+  socketTCP.close()
+  return totals
+
+
+def worker(
+  threads: int, stop: multiprocessing.Event, results: multiprocessing.Queue, fast_open_key: bytes
+) -> None:
+  # El proceso principal coordina el término, por lo que un Ctrl-C (que
+  # llega a todos los procesos) no debe interrumpir a los workers
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+  results.put((os.getpid(), serve(threads, reuse_port=True, stop=stop, fast_open_key=fast_open_key)))
+
 
 if __name__ == "__main__":
-  print('Creating server...')
 
-  # Primero que nada se instancia un socket tcp,
-  # se define un tamaño de buffer y una secuencia de fin de mensaje
-  socketTCP = SocketTCP()
-  # Con un buff_size no multiplo de 64 tarda mas pues se pierden ACKS
-  buff_size: int = 128
-  end_of_message: str = "\r\n\r\n"
+  # Opcionalmente se indica la cantidad de procesos worker y de hilos por
+  # worker que atienden conexiones
+  try:
+    args: list = sys.argv[1:]
+    if len(args) > 2:
+      raise ValueError
+    workers: int = int(args[0]) if len(args) > 0 else 1
+    threads: int = int(args[1]) if len(args) > 1 else 8
+    if workers < 1 or threads < 1:
+      raise ValueError
+  except ValueError:
+    print(ArgumentsParsingException('Error parsing arguments, script should be run as: \n \
+    python3 server.py [workers] [threads_per_worker]'))
+    sys.exit(1)
 
-  # Asociamos el socket a la dirección 127.0.0.1, puerto 5000
-  socketTCP.bind(('localhost', 5000))
+  print('Creating server...')
 
-  # Recibimos mensages indefinidamente, los imprimimos y los retornamos a la dirección
-  # de donde provienen
-  print('Listening for messages in (127.0.0.1, 5000)...')
-  while True:
+  # Con un solo worker el servidor corre en este proceso
+  if workers == 1:
+    try:
+      serve(threads, reuse_port=False)
+    except KeyboardInterrupt:
+      pass
+    sys.exit(0)
 
-    # Aceptamos conexión
-    connection, address = socketTCP.accept()
-    print('====== ACCEPTED CONNECTION =======')
+  # Con varios, cada worker es un proceso con su propio socket en el mismo
+  # puerto (SO_REUSEPORT). Al recibir SIGINT o SIGTERM les pedimos terminar,
+  # esperamos a que atiendan sus conexiones en curso y reportamos las
+  # métricas totales. Todos los workers reciben la misma clave de fast open.
+  stop = multiprocessing.Event()
+  results = multiprocessing.Queue()
+  fast_open_key = os.urandom(SocketTCP.FAST_OPEN_KEY_SIZE)
+  processes = [
+    multiprocessing.Process(target=worker, args=(threads, stop, results, fast_open_key))
+    for _ in range(workers)
+  ]
+  for process in processes:
+    process.start()
 
-    # Recibimos el mensaje completo junto con su dirección de origen
-    msg = receive_full_mesage(connection, buff_size, end_of_message)
+  # SIGTERM se maneja igual que Ctrl-C. Pedimos el término fuera del
+  # manejador de la señal, pues este puede interrumpir al proceso mientras
+  # tiene tomado un lock de stop.
+  signal.signal(signal.SIGTERM, signal.default_int_handler)
+  try:
+    for process in processes:
+      process.join()
+  except KeyboardInterrupt:
+    pass
+  stop.set()
+  print('Shutting down workers...')
 
-    # Cerramos conexión
-    connection.close()
+  worker_totals = []
+  for _ in processes:
+    try:
+      worker_totals.append(results.get(timeout=SHUTDOWN_GRACE_PERIOD))
+    except queue.Empty:
+      break
+  for process in processes:
+    process.join(timeout=1.0)
+    if process.is_alive():
+      process.terminate()
 
-    # Imprimimos el mensaje decodificado 
-    # message = buffer
-    print("\nReceived message: ")
-    print("=================\n")
-    print(msg + '\n\n')
-    print(address)
+  print(f"Stats of {len(worker_totals)} of {workers} workers:")
+  for pid, totals in worker_totals:
+    print(f"  worker {pid}: {totals['connections']} connections")
+  if worker_totals:
+    for key in worker_totals[0][1]:
+      print(f"  {key}: {sum(totals[key] for _, totals in worker_totals)}")
@@ -0,0 +1,718 @@
+from __future__ import annotations
+import argparse
+import errno
+import heapq
+import io
+import queue
+import random
+import socket
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable
+from datagram_backend import DatagramBackend
+
+
+@dataclass
+class LinkConditions:
+  """Data Class usada para representar las condiciones de un enlace
+  simulado, en una dirección.
+
+  Attributes:
+  -----------
+
+  loss (float): Probabilidad de descartar un datagrama.
+  delay (float): Retardo de propagación de cada datagrama, en segundos.
+  jitter (float): Variación máxima (uniforme) del retardo, en segundos.
+  duplicate (float): Probabilidad de entregar un datagrama dos veces.
+  reorder (float): Probabilidad de retrasar un datagrama reorder_delay
+                   segundos extra, de modo que lo adelanten los siguientes.
+  reorder_delay (float): Retardo extra de un datagrama reordenado.
+  corrupt (float): Probabilidad de invertir un bit al azar de un datagrama.
+  bandwidth (float | None): Capacidad del enlace en bytes por segundo. Los
+                            datagramas se transmiten de a uno, esperando en
+                            cola a que el enlace se desocupe. None es
+                            capacidad ilimitada.
+  queue_limit (int | None): Bytes que pueden esperar en la cola del enlace;
+                            los datagramas que no caben se descartan. None
+                            es una cola ilimitada.
+  """
+  loss: float = 0.0
+  delay: float = 0.0
+  jitter: float = 0.0
+  duplicate: float = 0.0
+  reorder: float = 0.0
+  reorder_delay: float = 0.01
+  corrupt: float = 0.0
+  bandwidth: float | None = None
+  queue_limit: int | None = None
+
+
+@dataclass
+class PacketEvent:
+  """Data Class usada para representar un evento de la traza de una red
+  simulada.
+
+  Attributes:
+  -----------
+
+  time (float): Tiempo virtual del evento, en segundos.
+  event (str): "sent", "dropped" (perdido en el enlace), "queue_drop" (no
+               cupo en la cola del enlace), "corrupted", "duplicated",
+               "delivered" o "unreachable" (nadie escucha en el destino).
+  source (tuple[str, int]): Dirección de origen del datagrama.
+  destination (tuple[str, int]): Dirección de destino del datagrama.
+  data (bytes): Contenido del datagrama (ya alterado, si se corrompió).
+  """
+  time: float
+  event: str
+  source: tuple[str, int]
+  destination: tuple[str, int]
+  data: bytes
+
+
+class _SimulationFinished(BaseException):
+  """Termina los hilos simulados que siguen bloqueados al cerrar la red.
+  Hereda de BaseException para que el código simulado no la capture.
+  """
+
+
+class _SimulatedThread:
+  """Hilo simulado: un hilo real que solo corre cuando el planificador de
+  la red le da el turno, y que lo devuelve al bloquearse o terminar.
+  """
+
+  def __init__(self, target: Callable[[], Any]):
+    self.target: Callable[[], Any] = target
+    self.turn: threading.Semaphore = threading.Semaphore(0)
+    self.started: bool = False
+    self.done: bool = False
+    self.ready: Callable[[], bool] | None = None
+    self.deadline: float | None = None
+    self.timed_out: bool = False
+    self.result: Any = None
+    self.error: BaseException | None = None
+
+
+class SimulatedNetwork:
+  """Red simulada en memoria, con tiempo virtual, sobre la cual corren
+  SocketTCP cuyo backend es uno de sus hosts (ver host). Todo es
+  determinista dada la semilla: las alteraciones de los enlaces, los
+  números aleatorios de los sockets y el orden en que corren los hilos.
+
+  Los hilos simulados (los de run y los que inician los SocketTCP) corren
+  de a uno: cada uno corre hasta bloquearse esperando un datagrama o un
+  elemento de una cola, y entonces corre el siguiente que pueda continuar,
+  en orden de creación. Si ninguno puede, el reloj avanza de inmediato al
+  próximo evento (la entrega de un datagrama o el vencimiento de un
+  timeout), por lo que los timeouts y retardos no toman tiempo real.
+
+  Attributes:
+  -----------
+
+  conditions (LinkConditions): Condiciones de los enlaces sin condiciones
+                               propias (ver set_link).
+  mtu (int): MTU de todas las rutas, en bytes.
+  trace (list[PacketEvent]): Eventos de todos los datagramas, en orden.
+  trace_hook (Callable[[PacketEvent], None] | None): Función llamada con
+                               cada evento al registrarlo.
+  """
+
+  # Primer puerto asignado a los sockets que no indican uno
+  EPHEMERAL_PORT: int = 49152
+
+  def __init__(self, conditions: LinkConditions | None = None, seed: int = 0, mtu: int = 1500):
+    """Constructor de SimulatedNetwork.
+
+    Parameters:
+    -----------
+    conditions (LinkConditions | None): Condiciones de los enlaces. Si es
+                                        None los enlaces son perfectos.
+    seed (int): Semilla de la simulación.
+    mtu (int): MTU de todas las rutas, en bytes.
+    """
+    self.conditions: LinkConditions = conditions or LinkConditions()
+    self.mtu: int = mtu
+    self.trace: list[PacketEvent] = []
+    self.trace_hook: Callable[[PacketEvent], None] | None = None
+
+    # Las alteraciones de los enlaces y los números aleatorios de los
+    # hosts usan generadores distintos, para que cambiar uno no altere el
+    # otro
+    self.__link_random: random.Random = random.Random(seed)
+    self.__host_random: random.Random = random.Random(f"{seed}/hosts")
+    self.__links: dict[tuple[str, str], LinkConditions] = {}
+    self.__busy_until: dict[tuple[str, str], float] = {}
+
+    # Reloj virtual, sockets asociados a cada dirección, y datagramas en
+    # vuelo: (momento de entrega, orden, datos, origen, destino)
+    self.__now: float = 0.0
+    self.__sockets: dict[tuple[str, int], list[SimulatedSocket]] = {}
+    self.__next_port: int = self.EPHEMERAL_PORT
+    self.__in_flight: list[tuple[float, int, bytes, tuple[str, int], tuple[str, int]]] = []
+    self.__sent: int = 0
+
+    # Hilos simulados, el que tiene el turno, y el turno del planificador
+    self.__threads: list[_SimulatedThread] = []
+    self.__local: threading.local = threading.local()
+    self.__scheduler_turn: threading.Semaphore = threading.Semaphore(0)
+    self.__closed: bool = False
+
+  def __enter__(self) -> SimulatedNetwork:
+    return self
+
+  def __exit__(self, *exc_info) -> None:
+    self.close()
+
+  @property
+  def now(self) -> float:
+    """Tiempo virtual actual, en segundos."""
+    return self.__now
+
+  def host(self, ip: str) -> SimulatedHost:
+    """Retorna un host de la red, para usarlo como backend de SocketTCP.
+
+    Parameters:
+    -----------
+    ip (str): IP del host. Sus sockets se asocian a ella.
+
+    Returns:
+    --------
+    (SimulatedHost): Host con IP ip.
+    """
+    return SimulatedHost(self, ip)
+
+  def set_link(self, source_ip: str, destination_ip: str, conditions: LinkConditions) -> None:
+    """Fija las condiciones del enlace desde source_ip hacia destination_ip
+    (solo en esa dirección).
+
+    Parameters:
+    -----------
+    source_ip (str): IP de origen.
+    destination_ip (str): IP de destino.
+    conditions (LinkConditions): Condiciones del enlace.
+    """
+    self.__links[(source_ip, destination_ip)] = conditions
+
+  def run(self, *targets: Callable[[], Any], time_limit: float | None = 3600.0) -> list:
+    """Corre cada target en un hilo simulado, junto a los hilos que ya
+    existían, hasta que todos los targets terminen. Los hilos que siguen
+    bloqueados (por ejemplo, el de un socket que escucha) continúan en la
+    próxima llamada, o terminan con close.
+
+    Parameters:
+    -----------
+    targets (Callable[[], Any]): Funciones a correr.
+    time_limit (float | None): Tiempo virtual máximo de la simulación, en
+                               segundos. None no la limita.
+
+    Returns:
+    --------
+    (list): Resultado de cada target.
+
+    Raises:
+    -------
+    RuntimeError: Si todos los hilos quedan bloqueados sin timeout, de modo
+                  que ningún target puede terminar.
+    TimeoutError: Si se alcanza time_limit antes de que terminen.
+    Exception: La primera excepción lanzada por un target.
+    """
+    if self.__closed:
+      raise RuntimeError("The simulated network is closed")
+    threads = [self._start_thread(target) for target in targets]
+    started_at = self.__now
+    try:
+      while not all(thread.done for thread in threads):
+        self.__deliver_due()
+        thread = self.__next_runnable()
+        if thread is not None:
+          self.__switch_to(thread)
+          continue
+
+        next_time = self.__next_event_time()
+        if next_time is None:
+          raise RuntimeError("Simulation deadlocked: every thread is blocked without a timeout")
+        if time_limit is not None and next_time > started_at + time_limit:
+          raise TimeoutError(f"Simulation did not finish within {time_limit} virtual seconds")
+        self.__now = next_time
+    except (RuntimeError, TimeoutError):
+      self.__raise_first_error(threads)
+      raise
+    self.__threads = [thread for thread in self.__threads if not thread.done]
+    self.__raise_first_error(threads)
+    return [thread.result for thread in threads]
+
+  def close(self) -> None:
+    """Termina los hilos simulados que siguen bloqueados, y cierra la red."""
+    if self.__closed:
+      return
+    self.__closed = True
+    for thread in self.__threads:
+      if not thread.done:
+        self.__switch_to(thread)
+    self.__threads = []
+
+  @staticmethod
+  def __raise_first_error(threads: list[_SimulatedThread]) -> None:
+    """Lanza la primera excepción lanzada por alguno de threads."""
+    for thread in threads:
+      if thread.error is not None:
+        raise thread.error
+
+  def __switch_to(self, thread: _SimulatedThread) -> None:
+    """Le da el turno a thread, y espera a que lo devuelva."""
+    thread.turn.release()
+    self.__scheduler_turn.acquire()
+
+  def __next_runnable(self) -> _SimulatedThread | None:
+    """Retorna el primer hilo (en orden de creación) que puede continuar:
+    uno que no ha partido, o cuya espera terminó o venció.
+    """
+    for thread in self.__threads:
+      if thread.done:
+        continue
+      if not thread.started or thread.ready():
+        thread.timed_out = False
+        return thread
+      if thread.deadline is not None and thread.deadline <= self.__now:
+        thread.timed_out = True
+        return thread
+    return None
+
+  def __next_event_time(self) -> float | None:
+    """Retorna el momento del próximo evento: la entrega de un datagrama o
+    el vencimiento de la espera de un hilo.
+    """
+    times = [
+      thread.deadline for thread in self.__threads
+      if not thread.done and thread.deadline is not None
+    ]
+    if self.__in_flight:
+      times.append(self.__in_flight[0][0])
+    return min(times, default=None)
+
+  def __deliver_due(self) -> None:
+    """Entrega los datagramas en vuelo cuyo momento llegó. Si varios
+    sockets comparten el destino (SO_REUSEPORT), cada origen se asigna
+    siempre al mismo.
+    """
+    while self.__in_flight and self.__in_flight[0][0] <= self.__now:
+      _, _, datagram, source, destination = heapq.heappop(self.__in_flight)
+      sockets = self.__sockets.get(destination)
+      if not sockets:
+        self.__record("unreachable", source, destination, datagram)
+        continue
+      sock = sockets[zlib.crc32(repr(source).encode()) % len(sockets)]
+      sock._deliver(datagram, source)
+      self.__record("delivered", source, destination, datagram)
+
+  def __record(self, event: str, source: tuple[str, int], destination: tuple[str, int], datagram: bytes) -> None:
+    """Registra un evento en la traza."""
+    packet_event = PacketEvent(self.__now, event, source, destination, datagram)
+    self.trace.append(packet_event)
+    if self.trace_hook is not None:
+      self.trace_hook(packet_event)
+
+  def __thread_main(self, thread: _SimulatedThread) -> None:
+    """Cuerpo del hilo real de un hilo simulado: espera su primer turno,
+    corre su función, y devuelve el turno al terminar.
+    """
+    thread.turn.acquire()
+    self.__local.thread = thread
+    thread.started = True
+    try:
+      if not self.__closed:
+        thread.result = thread.target()
+    except _SimulationFinished:
+      pass
+    except BaseException as err:
+      thread.error = err
+    finally:
+      thread.done = True
+      self.__scheduler_turn.release()
+
+  def _start_thread(self, target: Callable[[], Any]) -> _SimulatedThread:
+    """Crea un hilo simulado que corre target cuando le toque."""
+    thread = _SimulatedThread(target)
+    self.__threads.append(thread)
+    threading.Thread(target=self.__thread_main, args=(thread,), daemon=True).start()
+    return thread
+
+  def _block(self, ready: Callable[[], bool], timeout: float | None) -> bool:
+    """Bloquea al hilo simulado actual hasta que ready retorne True, o
+    hasta que pasen timeout segundos virtuales.
+
+    Parameters:
+    -----------
+    ready (Callable[[], bool]): Condición a esperar.
+    timeout (float | None): Tiempo máximo de espera. None espera sin límite.
+
+    Returns:
+    --------
+    (bool): True si la condición se cumplió, False si venció el timeout.
+    """
+    thread = getattr(self.__local, "thread", None)
+    if thread is None:
+      raise RuntimeError("Blocking simulated operations must run inside SimulatedNetwork.run")
+    if self.__closed:
+      raise _SimulationFinished
+    if ready():
+      return True
+    if timeout is not None and timeout <= 0:
+      return False
+
+    thread.ready = ready
+    thread.deadline = None if timeout is None else self.__now + timeout
+    self.__scheduler_turn.release()
+    thread.turn.acquire()
+    thread.deadline = None
+    if self.__closed:
+      raise _SimulationFinished
+    return not thread.timed_out
+
+  def _randint(self, a: int, b: int) -> int:
+    """Retorna un entero aleatorio entre a y b para un host."""
+    return self.__host_random.randint(a, b)
+
+  def _bind(self, sock: SimulatedSocket, ip: str, address: tuple[str, int]) -> tuple[str, int]:
+    """Asocia sock a address en el host con IP ip, y retorna la dirección
+    asociada. El puerto 0 asigna uno libre.
+    """
+    host, port = address
+    if host not in ("", "0.0.0.0", ip):
+      raise OSError(errno.EADDRNOTAVAIL, "Cannot assign requested address")
+    if port == 0:
+      while (ip, self.__next_port) in self.__sockets:
+        self.__next_port += 1
+      port = self.__next_port
+      self.__next_port += 1
+
+    bound = (ip, port)
+    sockets = self.__sockets.setdefault(bound, [])
+    if sockets and not (sock._reuse_port and all(other._reuse_port for other in sockets)):
+      raise OSError(errno.EADDRINUSE, "Address already in use")
+    sockets.append(sock)
+    return bound
+
+  def _unbind(self, sock: SimulatedSocket, address: tuple[str, int]) -> None:
+    """Desasocia sock de address."""
+    sockets = self.__sockets.get(address, [])
+    if sock in sockets:
+      sockets.remove(sock)
+    if not sockets:
+      self.__sockets.pop(address, None)
+
+  def _send(self, source: tuple[str, int], datagram: bytes, destination: tuple[str, int]) -> None:
+    """Envía un datagrama por el enlace entre source y destination,
+    aplicando sus condiciones.
+    """
+    self.__record("sent", source, destination, datagram)
+    link = (source[0], destination[0])
+    conditions = self.__links.get(link, self.conditions)
+    if self.__link_random.random() < conditions.loss:
+      self.__record("dropped", source, destination, datagram)
+      return
+    if datagram and self.__link_random.random() < conditions.corrupt:
+      corrupted = bytearray(datagram)
+      bit = self.__link_random.randrange(len(corrupted) * 8)
+      corrupted[bit // 8] ^= 1 << (bit % 8)
+      datagram = bytes(corrupted)
+      self.__record("corrupted", source, destination, datagram)
+    copies = 1
+    if self.__link_random.random() < conditions.duplicate:
+      copies = 2
+      self.__record("duplicated", source, destination, datagram)
+
+    # Con capacidad limitada el datagrama espera en cola a que se
+    # transmitan los anteriores, y luego ocupa el enlace su tiempo de
+    # transmisión
+    departure = self.__now
+    if conditions.bandwidth:
+      busy_until = max(self.__busy_until.get(link, 0.0), self.__now)
+      queued = (busy_until - self.__now) * conditions.bandwidth
+      if conditions.queue_limit is not None and queued + len(datagram) > conditions.queue_limit:
+        self.__record("queue_drop", source, destination, datagram)
+        return
+      departure = busy_until + len(datagram) / conditions.bandwidth
+      self.__busy_until[link] = departure
+
+    for _ in range(copies):
+      delay = conditions.delay + self.__link_random.uniform(0, conditions.jitter)
+      if self.__link_random.random() < conditions.reorder:
+        delay += conditions.reorder_delay
+      self.__sent += 1
+      heapq.heappush(self.__in_flight, (departure + delay, self.__sent, datagram, source, destination))
+
+
+class SimulatedSocket:
+  """Socket udp de un host de una SimulatedNetwork, con la interfaz de
+  socket.socket que usa SocketTCP. Sus esperas transcurren en el tiempo
+  virtual de la red.
+  """
+
+  # Tamaño máximo de los datos de un datagrama udp
+  MAX_DATAGRAM_SIZE: int = 65507
+
+  def __init__(self, network: SimulatedNetwork, ip: str):
+    self.__network: SimulatedNetwork = network
+    self.__ip: str = ip
+    self.__address: tuple[str, int] | None = None
+    self.__timeout: float | None = None
+    self.__closed: bool = False
+    self.__inbox: deque[tuple[bytes, tuple[str, int]]] = deque()
+    self.__options: dict[tuple[int, int], int] = {}
+
+  def __enter__(self) -> SimulatedSocket:
+    return self
+
+  def __exit__(self, *exc_info) -> None:
+    self.close()
+
+  @property
+  def _reuse_port(self) -> bool:
+    return bool(self.__options.get((socket.SOL_SOCKET, getattr(socket, "SO_REUSEPORT", -1))))
+
+  def bind(self, address: tuple[str, int]) -> None:
+    if self.__closed:
+      raise OSError(errno.EBADF, "Bad file descriptor")
+    if self.__address is not None:
+      raise OSError(errno.EINVAL, "Socket is already bound")
+    self.__address = self.__network._bind(self, self.__ip, address)
+
+  def getsockname(self) -> tuple[str, int]:
+    return self.__address or ("0.0.0.0", 0)
+
+  def settimeout(self, timeout: float | None) -> None:
+    self.__timeout = timeout
+
+  def gettimeout(self) -> float | None:
+    return self.__timeout
+
+  def setsockopt(self, level: int, option: int, value: int) -> None:
+    self.__options[(level, option)] = value
+
+  def getsockopt(self, level: int, option: int) -> int:
+    return self.__options.get((level, option), 0)
+
+  def fileno(self) -> int:
+    raise io.UnsupportedOperation("Simulated sockets have no file descriptor")
+
+  def sendto(self, data: bytes | memoryview, address: tuple[str, int]) -> int:
+    if self.__closed:
+      raise OSError(errno.EBADF, "Bad file descriptor")
+    if len(data) > self.MAX_DATAGRAM_SIZE:
+      raise OSError(errno.EMSGSIZE, "Message too long")
+    if self.__address is None:
+      self.bind(("", 0))
+    self.__network._send(self.__address, bytes(data), (address[0], address[1]))
+    return len(data)
+
+  def recvfrom_into(self, buffer: bytearray | memoryview, nbytes: int = 0) -> tuple[int, tuple[str, int]]:
+    if not self.__closed and not self.__inbox:
+      if self.__timeout == 0.0:
+        raise BlockingIOError(errno.EAGAIN, "Resource temporarily unavailable")
+      if not self.__network._block(lambda: bool(self.__inbox) or self.__closed, self.__timeout):
+        raise socket.timeout("timed out")
+    if self.__closed:
+      raise OSError(errno.EBADF, "Bad file descriptor")
+    datagram, address = self.__inbox.popleft()
+    nbytes = min(len(datagram), nbytes or len(buffer))
+    buffer[:nbytes] = datagram[:nbytes]
+    return nbytes, address
+
+  def close(self) -> None:
+    if self.__closed:
+      return
+    self.__closed = True
+    if self.__address is not None:
+      self.__network._unbind(self, self.__address)
+
+  def _deliver(self, datagram: bytes, source: tuple[str, int]) -> None:
+    """Deja un datagrama recibido en la cola del socket."""
+    if not self.__closed:
+      self.__inbox.append((datagram, source))
+
+
+class SimulatedQueue:
+  """Cola entre hilos simulados, con la interfaz de queue.Queue que usa
+  SocketTCP. Sus esperas transcurren en el tiempo virtual de la red.
+  """
+
+  def __init__(self, network: SimulatedNetwork):
+    self.__network: SimulatedNetwork = network
+    self.__items: deque = deque()
+
+  def put(self, item: Any) -> None:
+    self.__items.append(item)
+
+  def get(self, block: bool = True, timeout: float | None = None) -> Any:
+    if not self.__items:
+      if not block or not self.__network._block(lambda: bool(self.__items), timeout):
+        raise queue.Empty
+    return self.__items.popleft()
+
+  def qsize(self) -> int:
+    return len(self.__items)
+
+  def empty(self) -> bool:
+    return not self.__items
+
+
+class SimulatedHost(DatagramBackend):
+  """Host de una SimulatedNetwork, usado como backend de SocketTCP: sus
+  sockets, colas, hilos, reloj y números aleatorios son los de la red.
+
+  Attributes:
+  -----------
+
+  network (SimulatedNetwork): Red a la que pertenece el host.
+  ip (str): IP del host.
+  """
+
+  batch_io = False
+
+  def __init__(self, network: SimulatedNetwork, ip: str):
+    self.network: SimulatedNetwork = network
+    self.ip: str = ip
+
+  def socket(self) -> SimulatedSocket:
+    return SimulatedSocket(self.network, self.ip)
+
+  def monotonic(self) -> float:
+    return self.network.now
+
+  def queue(self) -> SimulatedQueue:
+    return SimulatedQueue(self.network)
+
+  def start_thread(self, target: Callable[[], None]) -> None:
+    self.network._start_thread(target)
+
+  def randint(self, a: int, b: int) -> int:
+    return self.network._randint(a, b)
+
+  def path_mtu(self, address: tuple[str, int]) -> int | None:
+    return self.network.mtu
+
+
+def run_scenario(
+  seed: int, conditions: LinkConditions, size: int, window_size: int, mode: str,
+  timeout: float = 60.0
+) -> tuple[bool, SimulatedNetwork]:
+  """Simula un escenario completo entre un cliente y un servidor SocketTCP:
+  handshake, transferencia de size bytes aleatorios, y cierre de la
+  conexión.
+
+  Parameters:
+  -----------
+  seed (int): Semilla del escenario (de la red y del payload).
+  conditions (LinkConditions): Condiciones de los enlaces.
+  size (int): Tamaño del payload en bytes.
+  window_size (int): Tamaño de ventana de ambos extremos.
+  mode (str): Variante de ventana deslizante de ambos extremos.
+  timeout (float): Timeout (virtual) de las operaciones de ambos extremos.
+
+  Returns:
+  --------
+  (tuple[bool, SimulatedNetwork]): Si el payload llegó completo y ambos
+      extremos cerraron sin errores, y la red (ya cerrada), con su traza.
+  """
+  from socketTCP import SocketTCP
+
+  server_address = ("10.0.0.1", 5000)
+  payload = random.Random(seed).randbytes(size)
+  with SimulatedNetwork(conditions, seed) as network:
+    server_socketTCP = SocketTCP(window_size, mode, backend=network.host(server_address[0]))
+    server_socketTCP.bind(server_address)
+    server_socketTCP.listen()
+    server_socketTCP.settimeout(timeout)
+
+    # El servidor recibe el payload y espera el cierre del cliente
+    def serve() -> bool:
+      connection, _ = server_socketTCP.accept()
+      connection.settimeout(timeout)
+      received = bytearray()
+      while len(received) < size:
+        data = connection.recv(size - len(received))
+        if not data:
+          break
+        received += data
+      closed = connection.recv(1) == b""
+      server_socketTCP.close()
+      return received == payload and closed
+
+    def client() -> None:
+      client_socketTCP = SocketTCP(window_size, mode, backend=network.host("10.0.0.2"))
+      client_socketTCP.settimeout(timeout)
+      client_socketTCP.connect(server_address)
+      client_socketTCP.send(payload)
+      client_socketTCP.close()
+
+    try:
+      complete, _ = network.run(serve, client)
+    except (OSError, RuntimeError, ValueError):
+      complete = False
+  return complete, network
+
+
+if __name__ == "__main__":
+  from socketTCP import SocketTCP
+
+  parser = argparse.ArgumentParser(
+    description="Simula escenarios de handshake, transferencia y cierre de SocketTCP sobre una "
+                "red en memoria con tiempo virtual, y reporta los que fallan."
+  )
+  parser.add_argument("--scenarios", type=int, default=1000)
+  parser.add_argument("--seed", type=int, default=0, help="semilla del primer escenario")
+  parser.add_argument("--loss", type=float, default=0.05)
+  parser.add_argument("--delay", type=float, default=0.02, help="segundos")
+  parser.add_argument("--jitter", type=float, default=0.005, help="segundos")
+  parser.add_argument("--duplicate", type=float, default=0.01)
+  parser.add_argument("--reorder", type=float, default=0.02)
+  parser.add_argument("--corrupt", type=float, default=0.0)
+  parser.add_argument("--bandwidth", type=float, default=None, help="bytes por segundo")
+  parser.add_argument("--queue-limit", type=int, default=None, help="bytes")
+  parser.add_argument("--size", type=int, default=4096, help="tamaño del payload en bytes")
+  parser.add_argument("--window", type=int, default=8)
+  parser.add_argument(
+    "--mode", choices=(SocketTCP.GO_BACK_N, SocketTCP.SELECTIVE_REPEAT),
+    default=SocketTCP.SELECTIVE_REPEAT
+  )
+  parser.add_argument(
+    "--trace", action="store_true",
+    help="imprime la traza de datagramas del primer escenario que falla"
+  )
+  args = parser.parse_args()
+
+  conditions = LinkConditions(
+    args.loss, args.delay, args.jitter, args.duplicate, args.reorder,
+    corrupt=args.corrupt, bandwidth=args.bandwidth, queue_limit=args.queue_limit
+  )
+
+  # Cada escenario es reproducible con su semilla: volver a correrlo con
+  # --seed S --scenarios 1 genera exactamente la misma traza
+  started_at = time.perf_counter()
+  failed = []
+  virtual_time = 0.0
+  for seed in range(args.seed, args.seed + args.scenarios):
+    complete, network = run_scenario(seed, conditions, args.size, args.window, args.mode)
+    virtual_time += network.now
+    if not complete:
+      failed.append(seed)
+      if args.trace and len(failed) == 1:
+        for packet_event in network.trace:
+          print(
+            f"{packet_event.time:10.6f} {packet_event.event:<11} "
+            f"{packet_event.source[0]}:{packet_event.source[1]} -> "
+            f"{packet_event.destination[0]}:{packet_event.destination[1]} "
+            f"{len(packet_event.data):5d} {packet_event.data[:24].hex()}"
+          )
+
+  elapsed = time.perf_counter() - started_at
+  print(
+    f"{args.scenarios} scenarios, {len(failed)} failed, {virtual_time:.1f} virtual seconds "
+    f"in {elapsed:.2f} real seconds"
+  )
+  if failed:
+    print(f"Failed seeds: {failed[:20]}{' ...' if len(failed) > 20 else ''}")
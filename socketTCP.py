@@ -1,18 +1,398 @@
 from __future__ import annotations
-from ast import Bytes
-from pickle import bytes_types
-import time
-from utilities import HeaderTCP, wrongResponseReceiverException
-from random import randint
+from utilities import (
+  HeaderTCP, RTOEstimator, ConnectionStats, BINARY_HEADER, SEQ_MODULO,
+  BINARY_HEADER_VERSION, SYN_FLAG, ACK_FLAG, FIN_FLAG, CHECKSUM_FLAG, CHECKSUM, BINARY_NEGOTIATION_FLAG,
+  MSS_OPTION, MSS_VALUE, SACK_PERMITTED_OPTION, STREAMS_OPTION, FAST_OPEN_OPTION,
+  FAST_OPEN_DATA_OPTION, FAST_OPEN_DATA_SEPARATOR, COMPRESSION_OPTION, COMPRESSED_LENGTH_PREFIX,
+  COMPRESSION_BLOCK_SIZE, COMPRESSED_BLOCK, COMPRESSED_BLOCK_FLAG, RAW_BLOCK, CHECKSUM_OPTION, HALF_CLOSE_FLAG, PendingHandshake,
+  PendingTeardown, FastOpenCache, FileMessage, RingBuffer, encode_options, parse_options, encode_sack, parse_sack,
+  seq_add, seq_diff, split_chunks
+)
+from congestion_control import CongestionControl, RenoCongestionControl
+from compression import Codec
+from batch_io import BatchDatagramIO
+from datagram_backend import DatagramBackend, ReadinessNotifier, SYSTEM_BACKEND
+from capture import PacketCapture
+from collections import deque
+from typing import BinaryIO, Callable, Generator, Iterable, NoReturn, Sequence
+import errno
+import hashlib
+import heapq
+import hmac
+import io
+import itertools
+import logging
+import mmap
+import os
+import queue
 import socket
+import struct
+import threading
+import weakref
+import zlib
+
+logger = logging.getLogger(__name__)
 
 
 class SocketTCP:
 
-  def __init__(self):
-    self.__socket: socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+  # Modos de ventana deslizante soportados
+  GO_BACK_N: str = "go_back_n"
+  SELECTIVE_REPEAT: str = "selective_repeat"
+
+  # Estados de una conexión (ver state). FIN_WAIT abarca FIN_WAIT_1 y
+  # FIN_WAIT_2 de TCP: se envió el FIN, esté o no confirmado.
+  CLOSED: str = "closed"
+  LISTEN: str = "listen"
+  ESTABLISHED: str = "established"
+  FIN_WAIT: str = "fin_wait"
+  CLOSE_WAIT: str = "close_wait"
+  LAST_ACK: str = "last_ack"
+  TIME_WAIT: str = "time_wait"
+
+  # Cantidad máxima de retransmisiones seguidas de un segmento antes de
+  # dar la conexión por perdida, y su equivalente para el cierre
+  MAX_RETRANSMISSIONS: int = 10
+  MAX_FIN_RETRANSMISSIONS: int = 4
+
+  # Duración de TIME_WAIT: TIME_WAIT_RTOS veces el RTO de la conexión (lo
+  # que tarda el otro extremo en retransmitir su FIN+ACK un par de veces),
+  # entre MIN_TIME_WAIT (pues el RTO del otro extremo puede ser mayor) y
+  # MAX_TIME_WAIT segundos. Un socket que escucha revisa los timers de los
+  # cierres de sus conexiones al menos cada DEMUX_TIMER_INTERVAL segundos.
+  TIME_WAIT_RTOS: int = 4
+  MIN_TIME_WAIT: float = 2.0
+  MAX_TIME_WAIT: float = 5.0
+  DEMUX_TIMER_INTERVAL: float = 0.2
+
+  # Cantidad máxima de sondas de keep-alive sin respuesta antes de dar por
+  # perdida una conexión inactiva (ver keepalive)
+  MAX_KEEPALIVE_PROBES: int = 3
+
+  # Cantidad de SYN recientes que recuerda un socket que escucha, para
+  # ignorar sus retransmisiones
+  MAX_RECENT_SYNS: int = 64
+
+  # Tamaño máximo de segmento (MSS): el usado con el header en texto, el
+  # usado si no se puede consultar el MTU de la ruta, y el máximo que cabe
+  # en un datagrama UDP. IP_UDP_OVERHEAD son los bytes de headers IP y UDP,
+  # y SEGMENT_OVERHEAD los del header binario con su checksum, pues el MSS se
+  # anuncia antes de saber si se negociará.
+  LEGACY_MSS: int = 64
+  DEFAULT_MSS: int = 1400
+  SEGMENT_OVERHEAD: int = BINARY_HEADER.size + CHECKSUM.size
+  MAX_MSS: int = 65507 - SEGMENT_OVERHEAD
+  IP_UDP_OVERHEAD: int = 28
+
+  # Con ACKs retrasados el receptor confirma cada ACK_EVERY segmentos en
+  # orden, o tras DELAYED_ACK_TIMEOUT segundos (menor que el RTO mínimo).
+  # Cada ACK lleva a lo más MAX_SACK_BLOCKS bloques SACK.
+  ACK_EVERY: int = 2
+  DELAYED_ACK_TIMEOUT: float = 0.04
+  MAX_SACK_BLOCKS: int = 4
+
+  # Tamaño por defecto del buffer de recepción de cada conexión, cuyo
+  # espacio libre se anuncia como ventana en cada segmento
+  RECV_BUFFER_SIZE: int = 1 << 18
+
+  # Bytes de mensajes aún no confirmados que send acepta encolar en modo no
+  # bloqueante (ver setblocking) antes de lanzar BlockingIOError
+  SEND_BUFFER_SIZE: int = 1 << 18
+
+  # Tiempo mínimo que el emisor espera a que el receptor amplíe una ventana
+  # que no alcanza para un segmento, antes de enviarle una sonda
+  PERSIST_TIMEOUT: float = 1.0
+
+  # Tamaño de los trozos en que recv_to_file escribe un archivo (y sendfile
+  # lee uno que no tiene descriptor)
+  FILE_CHUNK_SIZE: int = 1 << 20
+
+  # Cantidad máxima de datagramas que se reciben o envían en una sola
+  # llamada al sistema, donde se soporta (ver BatchDatagramIO). Con 1 se
+  # recibe y envía de a un datagrama.
+  IO_BATCH_SIZE: int = 16
+
+  # Fast open: largo de las cookies y de la clave con que un servidor las
+  # firma, largo máximo del primer mensaje que puede viajar en el SYN (con
+  # su largo, de modo que quepa en el buffer de datagramas de cualquier
+  # socket), y caché de cookies compartida por los clientes que no usan
+  # una propia.
+  FAST_OPEN_KEY_SIZE: int = 16
+  FAST_OPEN_COOKIE_SIZE: int = 8
+  MAX_FAST_OPEN_DATA: int = 1024
+  FAST_OPEN_CACHE: FastOpenCache = FastOpenCache()
+
+  # Compresión: largo mínimo de un mensaje para comprimirlo, razón (tamaño
+  # comprimido / original) sobre la cual un bloque se envía sin comprimir,
+  # y cantidad de bloques seguidos que no se logran comprimir tras la cual
+  # se dejan de comprimir los siguientes COMPRESSION_BACKOFF bytes enviados
+  COMPRESSION_THRESHOLD: int = 512
+  COMPRESSION_MAX_RATIO: float = 0.9
+  COMPRESSION_MAX_FAILURES: int = 4
+  COMPRESSION_BACKOFF: int = 1 << 22
+
+  def __init__(
+    self, window_size: int = 1, mode: str = GO_BACK_N, binary_header: bool = True,
+    congestion_control: Callable[[], CongestionControl] = RenoCongestionControl,
+    mss: int | None = None, sack: bool = True, recv_buffer_size: int | None = None,
+    streams: bool = False, event_hook: Callable[..., None] | None = None,
+    fast_open: bool = False, fast_open_cache: FastOpenCache | None = None,
+    fast_open_key: bytes | None = None, compression: Sequence[type[Codec]] = (), checksum: bool = True,
+    backend: DatagramBackend | None = None, capture: PacketCapture | None = None
+  ):
+    """Constructor de SocketTCP.
+
+    Parameters:
+    -----------
+    window_size (int): Cantidad máxima de segmentos en vuelo sin confirmar.
+                       Con tamaño 1 el socket se comporta como Stop & Wait.
+    mode (str): Variante de ventana deslizante a usar, SocketTCP.GO_BACK_N
+                o SocketTCP.SELECTIVE_REPEAT. Ambos extremos de la conexión
+                deben usar el mismo modo.
+    binary_header (bool): Si es True se ofrece (o acepta) el header binario
+                          durante el handshake. Si el otro extremo no lo
+                          soporta se usa el header en texto.
+    congestion_control (Callable[[], CongestionControl]): Clase (o función)
+                          que construye el control de congestión de cada
+                          conexión. Con FixedWindow el emisor queda acotado
+                          solo por window_size.
+    mss (int | None): Tamaño máximo de los datos de un segmento que este
+                      extremo anuncia en el handshake. Si es None se deriva
+                      del MTU de la ruta hacia el otro extremo. La conexión
+                      usa el menor entre el propio y el del otro extremo.
+    sack (bool): Si es True se ofrece (o acepta) en el handshake usar ACKs
+                 acumulativos retrasados con bloques SACK, en lugar de un
+                 ACK por segmento. Requiere el header binario.
+    recv_buffer_size (int | None): Tamaño en bytes del buffer de recepción
+                 de la conexión, independiente del tamaño pedido en cada
+                 recv. Su espacio libre se anuncia al emisor como ventana.
+                 Si es None se usa RECV_BUFFER_SIZE. Nunca es menor al MSS.
+    streams (bool): Si es True se ofrece (o acepta) en el handshake abrir
+                 varios streams independientes sobre la conexión (ver
+                 open_stream y accept_stream). Requiere el header binario.
+    event_hook (Callable[..., None] | None): Función llamada con el nombre y
+                 los detalles (como argumentos con nombre) de cada evento
+                 de la conexión: "datagram_sent", "datagram_received",
+                 "retransmission", "timeout", "duplicate", "out_of_order",
+                 "corrupted", "rtt_sample" y "handshake". Se llama desde el hilo que
+                 atiende la conexión, por lo que debe ser rápida. Las
+                 conexiones aceptadas y los streams heredan la de su socket.
+    fast_open (bool): Si es True un cliente pide al servidor una cookie de
+                 fast open, y con ella envía en el SYN el primer mensaje de
+                 las conexiones siguientes (ver connect); un servidor emite
+                 cookies y acepta dicho mensaje, entregándolo en accept.
+                 Requiere el header binario.
+    fast_open_cache (FastOpenCache | None): Caché donde un cliente guarda
+                 las cookies de cada servidor. Si es None se usa
+                 FAST_OPEN_CACHE, compartida por todo el proceso.
+    fast_open_key (bytes | None): Clave con que un servidor firma las
+                 cookies que emite, heredada por sus conexiones. Varios
+                 sockets que escuchan en el mismo puerto (por ejemplo, los
+                 procesos de un servidor con SO_REUSEPORT) deben usar la
+                 misma, para que las cookies de uno valgan en los demás. Si
+                 es None se genera una al azar de FAST_OPEN_KEY_SIZE bytes.
+    compression (Sequence[type[Codec]]): Algoritmos de compresión que se
+                 ofrecen (o aceptan) en el handshake, en orden de
+                 preferencia (por ejemplo compression.DEFAULT_CODECS). Con
+                 uno negociado, los mensajes de al menos
+                 COMPRESSION_THRESHOLD bytes se envían comprimidos por
+                 bloques. Requiere el header binario.
+    checksum (bool): Si es True se ofrece (o acepta) en el handshake que
+                 cada segmento lleve el CRC32 de su header y sus datos, y
+                 se descartan los que no coinciden con él. Requiere el
+                 header binario.
+    backend (DatagramBackend | None): Sockets, reloj e hilos que usa el
+                 socket (por ejemplo, un host de simulation.SimulatedNetwork).
+                 Si es None se usan los del sistema. Las conexiones
+                 aceptadas y los streams heredan el de su socket.
+    capture (PacketCapture | None): Captura donde se escribe cada datagrama
+                 enviado y recibido, para analizarla o reproducirla con
+                 capture.py. Los recibidos por un socket compartido se
+                 escriben una vez, al leerlos del socket udp. Las
+                 conexiones aceptadas y los streams heredan la de su socket.
+    """
+    if window_size < 1:
+      raise ValueError("window_size must be at least 1")
+    if mode not in (self.GO_BACK_N, self.SELECTIVE_REPEAT):
+      raise ValueError(f"Unknown sliding window mode: {mode}")
+    if mss is not None and not 1 <= mss <= self.MAX_MSS:
+      raise ValueError(f"mss must be between 1 and {self.MAX_MSS}")
+    if recv_buffer_size is not None and recv_buffer_size < 1:
+      raise ValueError("recv_buffer_size must be at least 1")
+
+    self.__backend: DatagramBackend = backend or SYSTEM_BACKEND
+    self.__socket: socket = self.__backend.socket()
     self.__buff_size: int = 4096
     self.__bytes_left_to_recv: int = 0
+    self.__window_size: int = window_size
+    self.__mode: str = mode
+
+    # MSS configurado por el usuario, y el negociado para la conexión
+    self.__configured_mss: int | None = mss
+    self.__mss: int = self.LEGACY_MSS
+
+    # Control de congestión de la conexión
+    self.__congestion_control_factory = congestion_control
+    self.__congestion: CongestionControl = congestion_control()
+
+    # Si se soporta el header binario, y si fue negociado en la conexión
+    self.__binary_supported: bool = binary_header
+    self.__binary_header: bool = False
+
+    # Si se soportan los ACKs acumulativos con SACK, y si fueron negociados
+    self.__sack_supported: bool = sack
+    self.__sack: bool = False
+
+    # Si se soporta el checksum de los segmentos, y si fue negociado
+    self.__checksum_supported: bool = checksum
+    self.__checksum: bool = False
+
+    # Estado del receptor: si lo próximo a recibir es el largo de un
+    # mensaje, el buffer de recepción con los datos recibidos en orden aún
+    # no leídos, los bytes sin leer de cada mensaje presente en él (el
+    # primero es el que está leyendo la aplicación), los segmentos
+    # recibidos fuera de orden indexados por su número de secuencia y la
+    # última ventana anunciada.
+    self.__expecting_length: bool = True
+    self.__recv_buffer_size: int | None = recv_buffer_size
+    self.__recv_ring: RingBuffer = RingBuffer(recv_buffer_size or self.RECV_BUFFER_SIZE)
+    self.__message_lengths: deque[int] = deque()
+    self.__out_of_order: dict[int, bytes] = {}
+    self.__advertised_window: int = self.__recv_ring.capacity
+
+    # Estado de la conexión (ver state), número de secuencia del FIN
+    # recibido del otro extremo, y si este solo dejó de enviar (shutdown)
+    self.__state: str = self.CLOSED
+    self.__peer_fin_seq: int | None = None
+    self.__peer_half_closed: bool = False
+
+    # Si la conexión entregó su cierre a quien atiende su socket udp sin la
+    # aplicación (ver __hand_off), tras lo cual ya no lo lee
+    self.__detached: bool = False
+
+    # Ventana anunciada por el otro extremo en su último segmento, None si
+    # se desconoce (por ejemplo, con el header en texto)
+    self.__peer_window: int | None = None
+
+    # ACK retrasado pendiente: segmentos en orden aún sin confirmar, el
+    # momento en que vence su timer y la dirección a la cual confirmarlos
+    self.__unacked_segments: int = 0
+    self.__ack_deadline: float | None = None
+    self.__ack_address: tuple[str, int] | None = None
+    self.__gap_seen: bool = False
+
+    # Timeout de las operaciones bloqueantes fijado por el usuario, el
+    # actualmente fijado en el socket udp, y el estimador del RTO
+    self.__timeout: float | None = None
+    self.__socket_timeout: float | None = None
+    self.__rto: RTOEstimator = RTOEstimator()
+
+    # ACK del handshake (para reenviarlo si se retransmite el SYN+ACK) y
+    # SYN recibidos recientemente por un socket que escucha
+    self.__handshake_ack: bytes | None = None
+    self.__recent_syns: dict[tuple[tuple[str, int], int], None] = {}
+
+    # Identificador de la conexión (asignado por el servidor en el SYN+ACK)
+    self.__conn_id: int = 0
+
+    # Estado de un socket que escucha con listen: backlog, conexiones por
+    # (dirección, identificador), handshakes en curso, cierres en curso de
+    # conexiones que ya liberaron su lugar (con un heap de sus timers, cuyas
+    # entradas obsoletas se descartan al salir), y cola de conexiones
+    # establecidas. Una conexión creada por él comparte su socket udp y
+    # recibe sus datagramas a través de inbox.
+    self.__backlog: int = 0
+    self.__connections: dict[tuple[tuple[str, int], int], SocketTCP] | None = None
+    self.__handshakes: dict[tuple[tuple[str, int], int], PendingHandshake] = {}
+    self.__teardowns: dict[tuple[tuple[str, int], int], PendingTeardown] = {}
+    self.__teardown_timers: list[tuple[float, tuple[tuple[str, int], int]]] = []
+    self.__accept_queue: queue.Queue[SocketTCP] | None = None
+    self.__demux_lock: threading.Lock | None = None
+    self.__next_conn_id: int = 0
+    self.__listener: SocketTCP | None = None
+    self.__demux_key: tuple[tuple[str, int], int] | None = None
+    self.__inbox: queue.Queue[tuple[bytes, tuple[str, int]]] | None = None
+
+    # Streams de la conexión, si fueron negociados: los abiertos por
+    # identificador, los abiertos por el otro extremo que esperan a
+    # accept_stream, el próximo identificador propio (impares en el cliente
+    # y pares en el servidor) y los identificadores ya cerrados. Un
+    # stream es un SocketTCP que comparte el socket udp de su conexión
+    # (parent) y recibe sus datagramas a través de inbox; la conexión misma
+    # es el stream 0.
+    self.__streams_supported: bool = streams
+    self.__streams: dict[int, SocketTCP] | None = None
+    self.__stream_queue: queue.Queue[SocketTCP] | None = None
+    self.__streams_lock: threading.Lock | None = None
+    self.__next_stream_id: int = 0
+    self.__closed_stream_ids: set[int] = set()
+    self.__stream_id: int = 0
+    self.__parent: SocketTCP | None = None
+
+    # Si se soporta fast open, la caché de cookies del cliente y la clave
+    # con que el servidor las firma
+    self.__fast_open_supported: bool = fast_open
+    self.__fast_open_cache: FastOpenCache | None = fast_open_cache
+    self.__fast_open_key: bytes = (
+      os.urandom(self.FAST_OPEN_KEY_SIZE) if fast_open_key is None else fast_open_key
+    )
+
+    # Compresión: algoritmos soportados y el negociado. El emisor cuenta los
+    # bloques seguidos que no logró comprimir y los bytes que aún enviará
+    # sin intentarlo. El receptor guarda si el mensaje actual viene
+    # comprimido, los datos recibidos del bloque en curso, y los datos ya
+    # descomprimidos que no caben en el buffer de recepción.
+    self.__compression_supported: tuple[type[Codec], ...] = tuple(
+      codec for codec in compression if codec.available
+    )
+    self.__codec: Codec | None = None
+    self.__compression_failures: int = 0
+    self.__compression_skip: int = 0
+    self.__compressed_message: bool = False
+    self.__block_buffer: bytearray = bytearray()
+    self.__recv_backlog: bytearray = bytearray()
+
+    # Métricas de la conexión y función que recibe sus eventos (ver
+    # ConnectionStats y el parámetro event_hook)
+    self.stats: ConnectionStats = ConnectionStats()
+    self.event_hook: Callable[..., None] | None = event_hook
+
+    # Captura de los datagramas (ver el parámetro capture), y dirección
+    # local con que se escriben, conocida tras el primer envío
+    self.capture: PacketCapture | None = capture
+    self.__capture_address: tuple[str, int] | None = None
+
+    # Buffer reutilizable donde se recibe cada datagrama
+    self.__datagram_buffer: bytearray = bytearray(self.__buff_size)
+    self.__datagram_view: memoryview = memoryview(self.__datagram_buffer)
+
+    # Envío y recepción en lote (creado al primer uso, si se soporta), los
+    # datagramas recibidos en el último lote que aún no se procesan, y los
+    # datagramas por enviar juntos, o None si se envían de inmediato
+    self.__batch_io: BatchDatagramIO | None = None
+    self.__pending_datagrams: deque[tuple[memoryview, tuple[str, int]]] = deque()
+    self.__send_queue: list[tuple[tuple[str, int], tuple[bytes | memoryview, ...]]] | None = None
+
+    # Envío de mensajes (ver send): mensajes aún no confirmados (el primero
+    # es el que se está enviando), el total de sus bytes, el envío en curso
+    # y el momento en que vence su próximo timer, y si close espera a que
+    # terminen para enviar el FIN
+    self.__outgoing: deque[memoryview | FileMessage] = deque()
+    self.__outgoing_bytes: int = 0
+    self.__transmission: Generator[float, tuple[memoryview, tuple[str, int]] | None, None] | None = None
+    self.__transmission_deadline: float = 0.0
+    self.__close_pending: bool = False
+
+    # Modo no bloqueante (ver setblocking): descriptor que avisa que hay
+    # algo que atender cuando no se lee directamente del socket udp (ver
+    # fileno), error de la conexión aún no informado a la aplicación y
+    # próximo timer informado al socket que escucha. Un socket que escucha
+    # guarda en un heap los timers de sus conexiones, cuyas entradas
+    # obsoletas se descartan al salir (ver process_events).
+    self.__notifier: ReadinessNotifier | None = None
+    self.__pending_error: OSError | None = None
+    self.__timer_deadline: float | None = None
+    self.__connection_timers: list[tuple[float, tuple[tuple[str, int], int]]] = []
 
   @staticmethod
   def partition_msg(num_bytes: int, msg: str) -> list[str]:
@@ -31,14 +411,18 @@ class SocketTCP:
     """
     sub_msgs = []
     curr_submsg = ""
+    curr_submsg_bytes = 0
     i = 0
     # Mientras queden caracteres
     while i < len(msg):
 
       # Si al agregar el caracter actual al substring actual, seguimos
-      # teniendo menos de num_bytes, agregamos el caracter
-      if len(curr_submsg.encode()) + len(msg[i].encode()) <= num_bytes:
+      # teniendo menos de num_bytes, agregamos el caracter. Llevamos la
+      # cuenta de bytes del substring para no codificarlo nuevamente.
+      char_bytes = len(msg[i].encode())
+      if curr_submsg_bytes + char_bytes <= num_bytes:
         curr_submsg += msg[i]
+        curr_submsg_bytes += char_bytes
         i += 1
 
       # De lo contrario agregamos el substring a la lista de substrings,
@@ -46,6 +430,7 @@ class SocketTCP:
       else:
         sub_msgs.append(curr_submsg)
         curr_submsg = ""
+        curr_submsg_bytes = 0
 
     # Agregamos el ultimo substring
     sub_msgs.append(curr_submsg)
@@ -65,7 +450,9 @@ class SocketTCP:
     --------
     (str): Sección de datos del mensaje TCP.
     """
-    data = tcp_msg.split("|||")[-1]
+    # Separamos solo los 4 campos del header, de modo que los datos puedan
+    # contener la secuencia "|||"
+    data = tcp_msg.split("|||", 4)[-1]
     return data
 
   @staticmethod
@@ -134,180 +521,2103 @@ class SocketTCP:
     # Generamos el header y lo retornamos
     return f"{syn}|||{ack}|||{fin}|||{seq}|||"
 
-  def bind(self, address: tuple[str, int]) -> None:
+  @staticmethod
+  def generate_binary_header(
+    header: HeaderTCP, length: int, window: int = 0, checksum: bool = False
+  ) -> bytes:
+    """Método estático usado para construir el header binario de un
+    segmento TCP con length bytes de datos.
+
+    Parameters:
+    -----------
+
+    header (HeaderTCP): Header TCP del segmento.
+    length (int): Largo en bytes de los datos del segmento.
+    window (int): Ventana a anunciar en el header.
+    checksum (bool): Si el header irá seguido de un checksum (ver
+                     checksum_segment), lo que se indica en sus flags.
+
+    Returns:
+    --------
+
+    (bytes): Header de la forma [VERSION][FLAGS][CONN_ID][STREAM_ID][SEQ][WINDOW][LEN].
+    """
+    flags = (
+      (SYN_FLAG if header.syn else 0) |
+      (ACK_FLAG if header.ack else 0) |
+      (FIN_FLAG if header.fin else 0) |
+      (CHECKSUM_FLAG if checksum else 0)
+    )
+    return BINARY_HEADER.pack(
+      BINARY_HEADER_VERSION, flags, header.conn_id, header.stream_id, header.seq % SEQ_MODULO, window, length
+    )
+
+  @staticmethod
+  def generate_binary_segment(header: HeaderTCP, data: bytes = b"") -> bytes:
+    """Método estático usado para construir un segmento TCP en formato
+    binario, a partir de su header y sus datos.
+
+    Parameters:
+    -----------
+
+    header (HeaderTCP): Header TCP del segmento.
+    data (bytes): Datos del segmento.
+
+    Returns:
+    --------
+
+    (bytes): Segmento de la forma [VERSION][FLAGS][CONN_ID][STREAM_ID][SEQ][WINDOW][LEN][DATOS].
+    """
+    return SocketTCP.generate_binary_header(header, len(data), header.window) + data
+
+  @staticmethod
+  def checksum_segment(header: bytes, data: bytes | memoryview = b"") -> bytes:
+    """Método estático usado para calcular el checksum que sigue a un
+    header binario con CHECKSUM_FLAG: el CRC32 del header y de los datos,
+    calculado directamente sobre sus buffers, sin concatenarlos.
+
+    Parameters:
+    -----------
+
+    header (bytes): Header binario del segmento.
+    data (bytes | memoryview): Datos del segmento.
+
+    Returns:
+    --------
+
+    (bytes): Checksum del segmento.
+    """
+    return CHECKSUM.pack(zlib.crc32(data, zlib.crc32(header)))
+
+  @staticmethod
+  def verify_checksum(segment: bytes | memoryview, required: bool = False) -> bool:
+    """Método estático usado para revisar la integridad de un segmento
+    recibido. Un segmento binario con CHECKSUM_FLAG es íntegro si su
+    checksum coincide con su header y sus datos; uno sin checksum (binario
+    sin el flag, o en texto) lo es si no se exige checksum.
+
+    Parameters:
+    -----------
+
+    segment (bytes | memoryview): Segmento TCP recibido.
+    required (bool): Si los segmentos binarios deben llevar checksum.
+
+    Returns:
+    --------
+
+    (bool): Si el segmento es íntegro.
+    """
+    if len(segment) < BINARY_HEADER.size or segment[0] != BINARY_HEADER_VERSION:
+      return True
+    if not segment[1] & CHECKSUM_FLAG:
+      return not required
+    data_start = BINARY_HEADER.size + CHECKSUM.size
+    if len(segment) < data_start:
+      return False
+    return SocketTCP.checksum_segment(
+      segment[:BINARY_HEADER.size], segment[data_start:]
+    ) == segment[BINARY_HEADER.size:data_start]
+
+  @staticmethod
+  def parse_segment(segment: bytes | memoryview) -> tuple[HeaderTCP, bytes | memoryview]:
+    """Método estático usado para parsear un segmento TCP recibido,
+    directamente desde sus bytes, en cualquiera de los dos formatos
+    (binario o texto).
+
+    Parameters:
+    -----------
+
+    segment (bytes | memoryview): Segmento TCP recibido.
+
+    Returns:
+    --------
+
+    (tuple[HeaderTCP, bytes | memoryview]): Header parseado y datos del
+        segmento. En formato binario los datos son un corte de segment,
+        sin copiarlos.
+    """
+    # Segmento en formato binario. Su checksum, si lo trae, se revisa en
+    # verify_checksum.
+    if segment[0] == BINARY_HEADER_VERSION:
+      _, flags, conn_id, stream_id, seq, window, length = BINARY_HEADER.unpack_from(segment)
+      data_start = BINARY_HEADER.size + (CHECKSUM.size if flags & CHECKSUM_FLAG else 0)
+      data = segment[data_start:data_start + length]
+      header = HeaderTCP(
+        bool(flags & SYN_FLAG), bool(flags & ACK_FLAG), bool(flags & FIN_FLAG),
+        seq, window, conn_id, stream_id
+      )
+      return header, data
+
+    # Segmento en formato de texto: separamos solo los 4 campos del header
+    fields = bytes(segment).split(b"|||", 4)
+    header = HeaderTCP(
+      fields[0] != b"0", fields[1] != b"0", fields[2] != b"0", int(fields[3])
+    )
+    return header, fields[4]
+
+  def __build_header(self, header: HeaderTCP, data: bytes | memoryview = b"") -> bytes:
+    """Construye el header de un segmento con los datos data, en el
+    formato negociado para la conexión. Si se negoció checksum, este va
+    al final del header.
+
+    Parameters:
+    -----------
+
+    header (HeaderTCP): Header TCP del segmento.
+    data (bytes | memoryview): Datos del segmento.
+
+    Returns:
+    --------
+
+    (bytes): Header del segmento.
+    """
+    if self.__binary_header:
+      header.conn_id = self.__conn_id
+      header.stream_id = self.__stream_id
+      self.__advertised_window = self.__recv_window()
+      binary_header = self.generate_binary_header(
+        header, len(data), self.__advertised_window, self.__checksum
+      )
+      if self.__checksum:
+        binary_header += self.checksum_segment(binary_header, data)
+      return binary_header
+    return self.generate_header(header).encode()
+
+  def __build_segment(self, header: HeaderTCP, data: bytes = b"") -> bytes:
+    """Construye un segmento en el formato negociado para la conexión.
+
+    Parameters:
+    -----------
+
+    header (HeaderTCP): Header TCP del segmento.
+    data (bytes): Datos del segmento.
+
+    Returns:
+    --------
+
+    (bytes): Segmento listo para ser enviado.
+    """
+    return self.__build_header(header, data) + data
+
+  def bind(self, address: tuple[str, int], reuse_port: bool = False) -> None:
     """Método encargado de *escuchar* en una dirección dada.
     Asigna el atributo address de la intancia a la dirección dada, y
-    asocia el socket udp subyacente a dicha dirección.
+    asocia el socket udp subyacente a dicha dirección. Con el puerto 0 el
+    sistema elige un puerto libre, que queda en address.
+
+    Con reuse_port varios sockets (por ejemplo, uno por proceso) pueden
+    asociarse a la misma dirección, y el sistema reparte entre ellos los
+    datagramas según la dirección de origen, por lo que todos los de una
+    misma conexión llegan al mismo socket.
 
     Parameters:
     -----------
     address (tuple[str, int]): Par IP - puerto al cual asociar el socket.
+    reuse_port (bool): Si es True se activa SO_REUSEPORT antes de asociar
+                       el socket. Todos los sockets que comparten la
+                       dirección deben activarlo.
+
+    Raises:
+    -------
+    OSError: Si reuse_port es True y el sistema no soporta SO_REUSEPORT.
     """
+    if reuse_port:
+      if not hasattr(socket, "SO_REUSEPORT"):
+        raise OSError("SO_REUSEPORT is not supported on this platform")
+      self.__socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
     self.__socket.bind(address)
-    self.address = address
+    self.address = self.__socket.getsockname()
 
-  def connect(self, address: tuple[str, int]) -> None:
+  def connect(self, address: tuple[str, int], data: str | bytes | memoryview | None = None) -> None:
     """Método encargado de inciar la conexión desde esta instancia a otro
     SocketTCP que se encuentra escuchando en la dirección address. Implemente
-    el lado del cliente del 3-way handshake.
+    el lado del cliente del 3-way handshake. El SYN se retransmite cada vez
+    que vence el RTO de la conexión.
+
+    Con fast open, si ya tenemos una cookie del servidor y data es corto
+    (ver MAX_FAST_OPEN_DATA), data viaja en el SYN junto a su largo, y el
+    servidor lo recibe sin esperar a que termine el handshake. Si no, o si
+    el servidor no lo acepta, se envía con send una vez establecida la
+    conexión.
 
     Parameters:
     -----------
     address (tuple[str, int]): Dirección en la cual se encuentra escuchando el
                                SocketTCP al cual se quiere conectar.
+    data (str | bytes | memoryview | None): Primer mensaje de la conexión,
+                               o None si no se envía ninguno.
+
+    Raises:
+    -------
+    socket.timeout: Si el servidor no responde tras MAX_RETRANSMISSIONS
+                    retransmisiones del SYN.
     """
     # Generamos un numero de secuencia aleatorio entre 0 y 100
-    seq = randint(0, 100)
-
-    # Enviamos un Header TCP con el campo syn y el codigo de secuencia generado
+    seq = self.__backend.randint(0, 100)
+
+    # Enviamos un Header TCP con el campo syn y el codigo de secuencia generado.
+    # El SYN siempre va en texto para que un servidor antiguo lo entienda, y
+    # si soportamos el header binario lo ofrecemos en sus datos.
+    # Junto a la marca del header binario anunciamos nuestro MSS; las opciones
+    # van en hexadecimal pues un servidor antiguo decodifica el SYN como texto.
+    local_mss = self.__local_mss(address)
     fst_msg = HeaderTCP(syn=True, ack=False, fin=False, seq=seq)
-    fst_msg = self.generate_header(fst_msg)
-    self.__socket.sendto(fst_msg.encode(), address)
-
-    # Recibimos y parseamos la respuesta, y vemos si el servidor aceptó la conexión
-    server_response, transmitter_addr = self.__socket.recvfrom(self.__buff_size)
-    server_response = self.parse_header(server_response.decode())
-
-    if server_response == HeaderTCP(True, True, False, seq + 1):
-
-      # Si el mensaje correspondía a un SYN+ACK, respondemos ACK a
-      # la dirección correspondiente
-      snd_msg = HeaderTCP(syn=False, ack=True, fin=False, seq=seq+2)
-
-      # fijamos el numero de secuencia
-      self.seq = snd_msg.seq
-
-      snd_msg = self.generate_header(snd_msg)
+    fst_msg = self.generate_header(fst_msg).encode()
+    fast_open = self.__binary_supported and self.__fast_open_supported
+    fast_open_cache = self.__fast_open_cache or self.FAST_OPEN_CACHE
+    fast_open_data = None
+    if isinstance(data, str):
+      data = data.encode()
+    if self.__binary_supported:
+      syn_options = {MSS_OPTION: MSS_VALUE.pack(local_mss)}
+      if self.__sack_supported:
+        syn_options[SACK_PERMITTED_OPTION] = b""
+      if self.__checksum_supported:
+        syn_options[CHECKSUM_OPTION] = b""
+      if self.__streams_supported:
+        syn_options[STREAMS_OPTION] = b""
+      if self.__compression_supported:
+        syn_options[COMPRESSION_OPTION] = bytes(codec.codec_id for codec in self.__compression_supported)
+
+      # Con fast open presentamos la cookie del servidor, si la tenemos, y
+      # si no la pedimos. Solo un servidor que emite cookies entiende los
+      # datos que siguen a las opciones, por lo que sin cookie no van.
+      if fast_open:
+        cached = fast_open_cache.get(address)
+        syn_options[FAST_OPEN_OPTION] = cached[0] if cached is not None else b""
+        if cached is not None and data is not None:
+          length = str(len(data)).encode()
+          if len(length) + len(data) <= min(cached[1], local_mss, self.MAX_FAST_OPEN_DATA):
+            fast_open_data = length + FAST_OPEN_DATA_SEPARATOR + bytes(data)
+      fst_msg += BINARY_NEGOTIATION_FLAG + encode_options(syn_options).hex().encode()
+      if fast_open_data is not None:
+        fst_msg += FAST_OPEN_DATA_SEPARATOR + fast_open_data
+
+    # Enviamos el SYN hasta recibir la respuesta del servidor aceptando la conexión
+    started_at = self.__backend.monotonic()
+    response = self.__send_and_wait(
+      fst_msg, address,
+      lambda header, response_data, _: header == HeaderTCP(True, True, False, seq_add(seq, 1))
+    )
+    if response is None:
+      raise socket.timeout("Connection timed out while waiting for SYN+ACK")
+    server_response, server_response_header, transmitter_addr = response
+
+    # Si el servidor respondió en formato binario, aceptó el header binario, y
+    # en los datos del SYN+ACK viene su MSS. Usamos el menor de ambos.
+    # El servidor además nos asigna el identificador de la conexión.
+    self.__binary_header = server_response[0] == BINARY_HEADER_VERSION
+    fast_open_accepted = False
+    if self.__binary_header:
+      _, server_response_data = self.parse_segment(server_response)
+      server_options = parse_options(server_response_data)
+      self.__set_mss(min(local_mss, self.peer_mss(server_response_data)))
+      self.__conn_id = server_response_header.conn_id
+      self.__peer_window = server_response_header.window
+      self.__sack = self.__sack_supported and SACK_PERMITTED_OPTION in server_options
+      self.__checksum = self.__checksum_supported and CHECKSUM_OPTION in server_options
+      if self.__streams_supported and STREAMS_OPTION in server_options:
+        self.__enable_streams(first_stream_id=1)
+      self.__codec = self.__negotiated_codec(server_options.get(COMPRESSION_OPTION, b"")[:1])
+
+      # Guardamos la cookie que nos emitió el servidor para las próximas
+      # conexiones, u olvidamos la que teníamos si ya no emite cookies
+      if fast_open:
+        cookie = server_options.get(FAST_OPEN_OPTION)
+        if cookie:
+          fast_open_cache.put(address, cookie, self.peer_mss(server_response_data))
+        else:
+          fast_open_cache.discard(address)
+        fast_open_accepted = fast_open_data is not None and FAST_OPEN_DATA_OPTION in server_options
+
+    # Como el mensaje correspondía a un SYN+ACK, respondemos ACK a
+    # la dirección correspondiente
+    snd_msg = HeaderTCP(syn=False, ack=True, fin=False, seq=seq_add(seq, 2))
+
+    # fijamos el numero de secuencia. Si el servidor aceptó los datos del
+    # SYN, este sigue al largo y al mensaje que llevaban (sin el separador),
+    # como si se hubieran enviado con send.
+    self.seq = snd_msg.seq
+    if fast_open_accepted:
+      self.seq = seq_add(self.seq, len(fast_open_data) - len(FAST_OPEN_DATA_SEPARATOR))
+
+    # Guardamos el ACK por si el servidor retransmite su SYN+ACK
+    snd_msg = self.__build_segment(snd_msg)
+    self.__handshake_ack = snd_msg
+
+    # Asignamos la dirección asociada al socket y respondemos
+    self.conn_sock_addr = transmitter_addr
+    self.__state = self.ESTABLISHED
+
+    self.__sendto(transmitter_addr, snd_msg)
+    self.__handshake_done(self.__backend.monotonic() - started_at)
+
+    # Con streams, un hilo reparte los datagramas recibidos entre ellos
+    if self.__streams is not None:
+      self.__start_stream_demultiplexer()
+
+    # Si el primer mensaje no viajó en el SYN lo enviamos ahora
+    if data is not None and not fast_open_accepted:
+      self.send(data)
+
+  def listen(self, backlog: int = 16) -> None:
+    """Método encargado de poner al socket a escuchar conexiones de forma
+    concurrente, sobre un único socket udp. Un hilo lee todos los datagramas
+    que llegan al socket y los reparte según (dirección de origen,
+    identificador de conexión) a la conexión correspondiente, y atiende los
+    handshakes de todos los clientes a la vez. Las conexiones establecidas
+    quedan en una cola de la cual las retira accept.
 
-      # Asignamos la dirección asociada al socket y respondemos
-      self.conn_sock_addr = transmitter_addr
+    Parameters:
+    -----------
+    backlog (int): Cantidad máxima de conexiones en handshake o esperando
+                   ser aceptadas. Los SYN que llegan con la cola llena se
+                   descartan (el cliente los retransmitirá).
+    """
+    if backlog < 1:
+      raise ValueError("backlog must be at least 1")
+    if self.__connections is not None:
+      return
+
+    # Todas las conexiones reciben a través del socket udp de este socket,
+    # por lo que su buffer de datagramas debe admitir cualquier MSS
+    self.__set_mss(self.MAX_MSS)
+    self.__backlog = backlog
+    self.__connections = {}
+    self.__handshakes = {}
+    self.__accept_queue = self.__backend.queue()
+    self.__demux_lock = threading.Lock()
+    self.__next_conn_id = self.__backend.randint(1, 0xFFFF)
+    self.__state = self.LISTEN
+    self.__backend.start_thread(self.__demultiplex)
 
-      self.__socket.sendto(snd_msg.encode(), transmitter_addr)
-    
   def accept(self) -> tuple[SocketTCP, tuple[str, int]]:
     """Método encargado de implementar el lado del servidor del 3-way
     handshake. Si el handshake termina de forma exitosa, se retorna
     un nuevo objeto del tipo SocketTCP y la dirección donde se encuentra
-    escuchando dicho objeto.
+    escuchando dicho objeto. El SYN+ACK se retransmite cada vez que vence
+    el RTO, y si el cliente deja de responder se descarta la conexión y se
+    espera un nuevo SYN.
+
+    Si se llamó a listen, en cambio, solo se retira la próxima conexión ya
+    establecida, la cual comparte el socket udp de este socket. Las
+    conexiones aceptadas son bloqueantes, aunque este socket no lo sea.
 
     Returns:
     --------
     (tuple[SocketTCP, tuple[str, int]]): Par SocketTCP, dirección donde a la
                                          cual está asociado dicho objeto.
-    """
 
-    # Recibimos el primer mensaje y lo parseamos
-    fst_msg, address = self.__socket.recvfrom(self.__buff_size)
-    fst_msg = self.parse_header(fst_msg.decode())
+    Raises:
+    -------
+    BlockingIOError: Si se llamó a listen, en modo no bloqueante (ver
+                     setblocking), si no hay conexiones por aceptar.
+    """
+    if self.__connections is not None:
+      if self.__timeout != 0.0:
+        try:
+          new_socketTCP = self.__accept_queue.get(timeout=self.__timeout)
+        except queue.Empty:
+          raise socket.timeout("timed out") from None
+        return new_socketTCP, new_socketTCP.address
+
+      # En modo no bloqueante limpiamos el aviso de fileno antes de revisar
+      # la cola, y avisamos de nuevo si quedan más conexiones
+      if self.__notifier is not None:
+        self.__notifier.clear()
+      try:
+        new_socketTCP = self.__accept_queue.get(timeout=0.0)
+      except queue.Empty:
+        raise BlockingIOError(errno.EAGAIN, "No connections to accept") from None
+      if self.__accept_queue.qsize() > 0:
+        self.__notify()
+      return new_socketTCP, new_socketTCP.address
 
-    # Creamos un nuevo socket binded a ('localhost', puerto+1) o al primer
-    # puerto disponible
-    i = 1
     while True:
+
+      # Recibimos el primer mensaje y lo parseamos, ignorando todo lo que
+      # no sea un SYN
+      fst_msg, address = self.__recvfrom(self.__timeout)
       try:
-        new_socketTCP = SocketTCP()
-        new_socketTCP.bind((self.address[0], self.address[1] + i))
-      except:
-        i += 1
-      else:
-        break
+        fst_msg, fst_msg_data = self.parse_segment(fst_msg)
+      except (struct.error, ValueError, IndexError):
+        continue
+      if not fst_msg.syn or fst_msg.ack or fst_msg.fin or not self.__valid_syn_data(fst_msg_data):
+        continue
+
+      # Si es la retransmisión de un SYN ya recibido, la ignoramos pues el
+      # socket de esa conexión se encarga de retransmitir su SYN+ACK.
+      if not self.__remember_syn(address, fst_msg.seq):
+        continue
+      fst_msg_data = bytes(fst_msg_data)
+
+      # Creamos un nuevo socket binded a ('localhost', puerto+1) o al primer
+      # puerto disponible. Cualquier otro error de bind se propaga.
+      i = 1
+      while True:
+        new_socketTCP = self.__new_connection()
+        try:
+          new_socketTCP.bind((self.address[0], self.address[1] + i))
+        except OSError as err:
+          new_socketTCP.__socket.close()
+          if err.errno != errno.EADDRINUSE:
+            raise
+          i += 1
+        else:
+          break
+
+      # Respondemos SYN + ACK, seq=x+1 desde el nuevo socket hasta recibir
+      # el ACK, seq=x+2. Si el ACK se perdió y el cliente ya comenzó a enviar
+      # datos, su primer segmento (seq=x+2, o tras los datos del SYN si se
+      # aceptaron con fast open) también confirma la conexión.
+      syn_seq = fst_msg.seq
+      started_at = self.__backend.monotonic()
+      server_response, fast_open_length = new_socketTCP.__syn_ack_for(syn_seq, fst_msg_data, address)
+      response = new_socketTCP.__send_and_wait(
+        server_response, address,
+        lambda header, data, _: new_socketTCP.__completes_handshake(header, syn_seq, fast_open_length)
+      )
 
-    # Si el mensaje recibido es de tipo SYN, respondemos SYN + ACK, seq=x+1
-    # desde el nuevo socket
-    if fst_msg.syn and not fst_msg.ack and not fst_msg.fin:
-      
-      server_response = HeaderTCP(True, True, False, fst_msg.seq + 1)
-      server_response = self.generate_header(server_response)
-      new_socketTCP.__socket.sendto(server_response.encode(), address)
-
-    # Recibimos el segundo mensaje y lo parseamos
-    snd_msg, address = new_socketTCP.__socket.recvfrom(self.__buff_size)
-    snd_msg = self.parse_header(snd_msg.decode())
-
-    # Si el mensaje es ACK, seq=x+2, aceptamos la conexión y retornamos
-    # un nuevo objeto de tipo SocketTCP mas la conexión donde se encuentra
-    # escuchando dicho objeto.
-    if snd_msg == HeaderTCP(False, True, False, fst_msg.seq+2):
-
-      # Fijamos el número de secuencia y la dirección de conexión
-      new_socketTCP.seq = snd_msg.seq
+      # Si el cliente dejó de responder descartamos la conexión
+      if response is None:
+        new_socketTCP.__socket.close()
+        continue
+
+      # Aceptamos la conexión y retornamos un nuevo objeto de tipo SocketTCP
+      # mas la conexión donde se encuentra escuchando dicho objeto.
+      # Fijamos la dirección de conexión (el número de secuencia ya se fijó
+      # al procesar el SYN)
+      _, response_header, address = response
+      if new_socketTCP.__binary_header:
+        new_socketTCP.__peer_window = response_header.window
       new_socketTCP.conn_sock_addr = address
-      
+      new_socketTCP.__handshake_done(self.__backend.monotonic() - started_at)
+      if new_socketTCP.__streams is not None:
+        new_socketTCP.__start_stream_demultiplexer()
+
       return new_socketTCP, new_socketTCP.address
 
-  def settimeout(self, timeout_in_seconds: float) -> None:
-    """Método encargado de setear un timeout al socket. Usa la función
-    settimeout de sockets para setear el timeout del socket udp
-    subyacente.
+  def __new_connection(self) -> SocketTCP:
+    """Crea un SocketTCP para una conexión entrante, con la misma
+    configuración que este socket.
+    """
+    return SocketTCP(
+      self.__window_size, self.__mode, self.__binary_supported,
+      self.__congestion_control_factory, self.__configured_mss, self.__sack_supported,
+      self.__recv_buffer_size, self.__streams_supported, self.event_hook,
+      self.__fast_open_supported, self.__fast_open_cache, self.__fast_open_key,
+      self.__compression_supported,
+      self.__checksum_supported, self.__backend, self.capture
+    )
+
+  def __remember_syn(self, address: tuple[str, int], syn_seq: int) -> bool:
+    """Registra un SYN recibido por un socket que escucha.
 
     Parameters:
     -----------
-    timeout_in_seconds (float): Tiempo de timeout a fijar en el socket
-                                en segundos.
+    address (tuple[str, int]): Dirección de origen del SYN.
+    syn_seq (int): Número de secuencia del SYN.
+
+    Returns:
+    --------
+    (bool): False si el SYN ya se había recibido (es una retransmisión).
     """
-    # seteamos el timeout al socket udp subyacente
-    self.__socket.settimeout(timeout_in_seconds)
+    if (address, syn_seq) in self.__recent_syns:
+      return False
+    self.__recent_syns[(address, syn_seq)] = None
+    if len(self.__recent_syns) > self.MAX_RECENT_SYNS:
+      del self.__recent_syns[next(iter(self.__recent_syns))]
+    return True
+
+  def __valid_syn_data(self, syn_data: bytes | memoryview) -> bool:
+    """Indica si los datos de un SYN recibido están bien formados. El SYN
+    viaja en texto y sin checksum, por lo que un bit invertido puede dejar
+    ilegible la oferta del header binario, o convertirla en datos que un
+    cliente antiguo nunca envía. Esos SYN se descartan, y el cliente los
+    retransmitirá.
 
-  def send(self, msg: str) -> None:
-    """Método encargado de enviar un mensaje a un socket; implementa el
-    lado del emisor de Stop & Wait.
+    Parameters:
+    -----------
+    syn_data (bytes | memoryview): Datos del SYN.
+
+    Returns:
+    --------
+    (bool): False si el SYN debe descartarse.
+    """
+    syn_data = bytes(syn_data)
+    if not syn_data or not self.__binary_supported:
+      return True
+    if not syn_data.startswith(BINARY_NEGOTIATION_FLAG):
+      return False
+    syn_options = syn_data[len(BINARY_NEGOTIATION_FLAG):].partition(FAST_OPEN_DATA_SEPARATOR)[0]
+    try:
+      syn_options = bytes.fromhex(syn_options.decode())
+    except (UnicodeDecodeError, ValueError):
+      return False
+    return len(parse_options(syn_options).get(MSS_OPTION, b"")) == MSS_VALUE.size
+
+  def __syn_ack_for(self, syn_seq: int, syn_data: bytes, address: tuple[str, int]) -> tuple[bytes, int]:
+    """Configura esta conexión entrante según el SYN recibido y construye
+    el SYN+ACK a responder. Si el cliente ofreció el header binario (y lo
+    soportamos) se usa desde el SYN+ACK en adelante, y en él anunciamos
+    nuestro MSS, usando el menor entre el nuestro y el del cliente, y si
+    aceptamos los ACKs acumulativos con SACK, el checksum y los streams que
+    el cliente ofreció.
+
+    Con fast open se emite una cookie al cliente que la pide o presenta, y
+    si presentó una válida se entrega a la conexión el mensaje que trae el
+    SYN (si cabe en el buffer de recepción).
 
     Parameters:
     -----------
-    msg (str): Mensaje a enviar al socket desde donde se llama el método.
+    syn_seq (int): Número de secuencia del SYN.
+    syn_data (bytes): Datos del SYN.
+    address (tuple[str, int]): Dirección del cliente.
+
+    Returns:
+    --------
+    (tuple[bytes, int]): Segmento SYN+ACK, y cantidad de bytes de datos del
+                         SYN entregados a la conexión (0 si no se aceptaron).
     """
-    # Comenzamos particionando el mensaje a enviar en substrings de máximo
-    # 64 bytes.
-    msgs_to_send = self.partition_msg(64, msg)
+    self.__binary_header = (
+      self.__binary_supported and syn_data.startswith(BINARY_NEGOTIATION_FLAG)
+    )
+    self.seq = seq_add(syn_seq, 2)
+
+    # La aplicación recibe la conexión recién al terminar el handshake (o
+    # antes, con fast open), por lo que para ella ya está establecida
+    self.__state = self.ESTABLISHED
+
+    syn_ack_data = b""
+    fast_open_length = 0
+    if self.__binary_header:
+      local_mss = self.__local_mss(address)
+      syn_options, _, fast_open_data = syn_data[len(BINARY_NEGOTIATION_FLAG):].partition(
+        FAST_OPEN_DATA_SEPARATOR
+      )
+      try:
+        syn_options = bytes.fromhex(syn_options.decode())
+      except (UnicodeDecodeError, ValueError):
+        syn_options = b""
+      self.__set_mss(min(local_mss, self.peer_mss(syn_options)))
+      syn_ack_options = {MSS_OPTION: MSS_VALUE.pack(local_mss)}
+      client_options = parse_options(syn_options)
+      self.__sack = self.__sack_supported and SACK_PERMITTED_OPTION in client_options
+      if self.__sack:
+        syn_ack_options[SACK_PERMITTED_OPTION] = b""
+      self.__checksum = self.__checksum_supported and CHECKSUM_OPTION in client_options
+      if self.__checksum:
+        syn_ack_options[CHECKSUM_OPTION] = b""
+      if self.__streams_supported and STREAMS_OPTION in client_options:
+        syn_ack_options[STREAMS_OPTION] = b""
+        self.__enable_streams(first_stream_id=2)
+      self.__codec = self.__negotiated_codec(client_options.get(COMPRESSION_OPTION, b""))
+      if self.__codec is not None:
+        syn_ack_options[COMPRESSION_OPTION] = bytes([self.__codec.codec_id])
+      if self.__fast_open_supported and FAST_OPEN_OPTION in client_options:
+        cookie = self.__fast_open_cookie(address[0])
+        syn_ack_options[FAST_OPEN_OPTION] = cookie
+        if fast_open_data and hmac.compare_digest(client_options[FAST_OPEN_OPTION], cookie):
+          fast_open_length = self.__deliver_fast_open_data(fast_open_data)
+          if fast_open_length:
+            syn_ack_options[FAST_OPEN_DATA_OPTION] = b""
+      syn_ack_data = encode_options(syn_ack_options)
+
+    syn_ack = self.__build_segment(HeaderTCP(True, True, False, seq_add(syn_seq, 1)), syn_ack_data)
+    return syn_ack, fast_open_length
+
+  def __negotiated_codec(self, offered: bytes) -> Codec | None:
+    """Retorna una instancia del primero de los algoritmos de compresión
+    ofrecidos por el otro extremo que este soporta, o None si no hay.
 
-    # Como lo primero a comunicar es el largo total en bytes del mensaje, 
-    # agregamos dicha información a la lista de mensajes por enviar.
-    msgs_to_send.insert(0, len(msg.encode()))
+    Parameters:
+    -----------
+    offered (bytes): Identificadores ofrecidos, en orden de preferencia.
 
-    # Se comienza el Stop & Wait
-    i = 0
-    bytes_sent = 0
-    while i < len(msgs_to_send):
+    Returns:
+    --------
+    (Codec | None): Algoritmo negociado.
+    """
+    supported = {codec.codec_id: codec for codec in self.__compression_supported}
+    for codec_id in offered:
+      if codec_id in supported:
+        return supported[codec_id]()
+    return None
+
+  def __deliver_fast_open_data(self, fast_open_data: bytes) -> int:
+    """Entrega a esta conexión entrante el mensaje recibido en su SYN, de
+    la forma [LARGO][FAST_OPEN_DATA_SEPARATOR][MENSAJE], como si hubiera
+    llegado en segmentos de datos.
+
+    Parameters:
+    -----------
+    fast_open_data (bytes): Datos del SYN que siguen a las opciones.
+
+    Returns:
+    --------
+    (int): Cantidad de bytes entregados (los del largo y del mensaje), o 0
+           si el mensaje está malformado o no cabe en el buffer de recepción.
+    """
+    length, _, msg = fast_open_data.partition(FAST_OPEN_DATA_SEPARATOR)
+    if not length.isdigit() or int(length) != len(msg) or len(msg) > self.__recv_ring.free:
+      return 0
+    self.__deliver(length)
+    if msg:
+      self.__deliver(msg)
+    return len(length) + len(msg)
+
+  def __fast_open_cookie(self, ip: str) -> bytes:
+    """Retorna la cookie de fast open que este servidor emite al cliente
+    con dirección IP ip, firmada con su clave (ver fast_open_key). No
+    depende del puerto, pues el cliente usa uno distinto en cada conexión.
+
+    Parameters:
+    -----------
+    ip (str): Dirección IP del cliente.
 
+    Returns:
+    --------
+    (bytes): Cookie de FAST_OPEN_COOKIE_SIZE bytes.
+    """
+    return hmac.new(self.__fast_open_key, ip.encode(), hashlib.sha256).digest()[:self.FAST_OPEN_COOKIE_SIZE]
+
+  @staticmethod
+  def __completes_handshake(header: HeaderTCP, syn_seq: int, fast_open_length: int = 0) -> bool:
+    """Retorna si un segmento recibido completa el handshake iniciado por
+    un SYN con número de secuencia syn_seq: el ACK, seq=x+2, o el primer
+    segmento de datos de la conexión (stream 0) si dicho ACK se perdió, que
+    sigue a los fast_open_length bytes de datos aceptados en el SYN.
+    """
+    return header.stream_id == 0 and (
+      header == HeaderTCP(False, True, False, seq_add(syn_seq, 2)) or
+      header == HeaderTCP(False, False, False, seq_add(syn_seq, 2 + fast_open_length))
+    )
+
+  def __demultiplex(self) -> None:
+    """Hilo de un socket que escucha (ver listen): recibe todos los
+    datagramas del socket udp y los reparte a sus conexiones, atiende los
+    SYN nuevos, retransmite los SYN+ACK cuyo timer venció y atiende los
+    cierres que le entregan sus conexiones (ver __hand_off). Termina cuando
+    se cierra el socket.
+    """
+    while True:
+
+      # Esperamos a lo más hasta que venza el próximo timer de handshake o
+      # de cierre. Como las conexiones entregan sus cierres desde otros
+      # hilos, no esperamos más de DEMUX_TIMER_INTERVAL.
+      with self.__demux_lock:
+        deadline = min((h.deadline for h in self.__handshakes.values()), default=None)
+        if self.__teardown_timers:
+          timer = self.__teardown_timers[0][0]
+          deadline = timer if deadline is None else min(deadline, timer)
+      timeout = self.DEMUX_TIMER_INTERVAL
+      if deadline is not None:
+        timeout = min(timeout, self.__time_until(deadline))
+      try:
+        datagram, address = self.__recvfrom(timeout)
+        header, data = self.parse_segment(datagram)
+      except socket.timeout:
+        header = None
+      except (struct.error, ValueError, IndexError):
+        continue
+      except OSError:
+        return
+
+      # Si el socket se cierra desde otro hilo mientras respondemos, el
+      # envío falla y el hilo termina igual que al recibir
       try:
-        # Construimos el header
-        tcp_msg_to_send = self.generate_header(
-          HeaderTCP(
-            False, False, False, self.seq
-          )
+        if header is not None:
+          with self.__demux_lock:
+            if header.syn and not header.ack and not header.fin:
+              self.__handle_syn(header.seq, bytes(data), address)
+            else:
+              self.__route(header, bytes(datagram), address)
+        self.__retransmit_syn_acks()
+        self.__expire_teardowns()
+      except OSError:
+        if self.__state == self.CLOSED:
+          return
+        raise
+
+  def __handle_syn(self, syn_seq: int, syn_data: bytes, address: tuple[str, int]) -> None:
+    """Atiende un SYN recibido por un socket que escucha: si hay espacio
+    en el backlog crea la conexión, le asigna un identificador y responde
+    SYN+ACK. Debe llamarse con el lock del demultiplexor tomado.
+    """
+    if self.__accept_queue.qsize() + len(self.__handshakes) >= self.__backlog:
+      return
+    if not self.__valid_syn_data(syn_data) or not self.__remember_syn(address, syn_seq):
+      return
+
+    # Buscamos un identificador libre para la dirección del cliente,
+    # evitando también los de conexiones que aún se están cerrando. Los
+    # clientes con header en texto no pueden indicarlo, por lo que usan el
+    # 0; si su conexión anterior se está cerrando, la nueva la reemplaza.
+    conn_id = 0
+    if self.__binary_supported and syn_data.startswith(BINARY_NEGOTIATION_FLAG):
+      conn_id = self.__next_conn_id
+      while (
+        conn_id == 0 or (address, conn_id) in self.__connections or
+        (address, conn_id) in self.__teardowns
+      ):
+        conn_id = (conn_id + 1) & 0xFFFF
+      self.__next_conn_id = (conn_id + 1) & 0xFFFF
+    elif (address, 0) in self.__connections:
+      return
+    self.__teardowns.pop((address, conn_id), None)
+
+    new_socketTCP = self.__new_connection()
+    new_socketTCP.__conn_id = conn_id
+    syn_ack, fast_open_length = new_socketTCP.__syn_ack_for(syn_seq, syn_data, address)
+
+    # La conexión comparte el socket udp de este socket, y recibe sus
+    # datagramas a través de una cola
+    new_socketTCP.__socket.close()
+    new_socketTCP.__socket = self.__socket
+    new_socketTCP.__inbox = self.__backend.queue()
+    new_socketTCP.__listener = self
+    new_socketTCP.__demux_key = (address, conn_id)
+    new_socketTCP.address = self.address
+    new_socketTCP.conn_sock_addr = address
+
+    now = self.__backend.monotonic()
+    self.__connections[(address, conn_id)] = new_socketTCP
+    self.__handshakes[(address, conn_id)] = PendingHandshake(
+      syn_seq, syn_ack, now, now + new_socketTCP.__rto.rto, fast_open_length=fast_open_length
+    )
+    self.__sendto(address, syn_ack)
+
+    # Si el SYN traía datos aceptados con fast open, la conexión puede
+    # aceptarse sin esperar el ACK, de modo que la aplicación los lea y
+    # responda de inmediato. El handshake termina igualmente con el ACK.
+    if fast_open_length:
+      self.__accept_queue.put(new_socketTCP)
+      self.__notify()
+
+  def __route(self, header: HeaderTCP, datagram: bytes, address: tuple[str, int]) -> None:
+    """Entrega un datagrama a la conexión a la que corresponde. Si esta
+    aún está en handshake y el datagrama lo completa, la conexión pasa a
+    la cola de conexiones por aceptar. Debe llamarse con el lock del
+    demultiplexor tomado.
+    """
+    key = (address, header.conn_id)
+    new_socketTCP = self.__connections.get(key)
+    if new_socketTCP is None:
+      teardown = self.__teardowns.get(key)
+      if teardown is None or not self.verify_checksum(datagram, teardown.checksum):
+        return
+      deadline = teardown.deadline
+      if self.__advance_teardown(teardown, header, self.parse_segment(datagram)[1], address):
+        del self.__teardowns[key]
+      elif teardown.deadline != deadline:
+        heapq.heappush(self.__teardown_timers, (teardown.deadline, key))
+      return
+
+    # Una conexión aceptada con fast open usa el header binario, y el
+    # identificador de conexión solo viaja en el SYN+ACK, por lo que
+    # cualquier segmento suyo completa el handshake aunque el ACK se pierda.
+    # Un segmento corrupto no lo completa, y la conexión lo descarta.
+    handshake = self.__handshakes.get(key)
+    if handshake is not None and self.verify_checksum(datagram, new_socketTCP.__checksum):
+      if not handshake.fast_open_length and not self.__completes_handshake(
+        header, handshake.syn_seq
+      ):
+        return
+      del self.__handshakes[key]
+      now = self.__backend.monotonic()
+      if handshake.retransmissions == 0:
+        new_socketTCP.__add_rtt_sample(now - handshake.sent_at)
+      new_socketTCP.__handshake_done(now - handshake.sent_at)
+
+      # Una conexión aceptada con fast open ya está en uso, y aprende la
+      # ventana del cliente de los segmentos que recibe
+      if not handshake.fast_open_length:
+        if new_socketTCP.__binary_header:
+          new_socketTCP.__peer_window = header.window
+        self.__accept_queue.put(new_socketTCP)
+        self.__notify()
+
+      # El ACK solo completa el handshake; cualquier otro segmento además
+      # se entrega a la conexión
+      if header == HeaderTCP(False, True, False, seq_add(handshake.syn_seq, 2)):
+        return
+
+    new_socketTCP.__route_stream(header, datagram, address)
+
+  def __retransmit_syn_acks(self) -> None:
+    """Retransmite los SYN+ACK cuyo timer venció, duplicando el RTO de su
+    conexión, y descarta los handshakes que agotaron sus retransmisiones.
+    Una conexión aceptada con fast open ya es de la aplicación, por lo que
+    solo deja de esperar el ACK y sigue establecida: si el cliente no
+    responde, sus propios timers lo detectan.
+    """
+    now = self.__backend.monotonic()
+    with self.__demux_lock:
+      for key, handshake in list(self.__handshakes.items()):
+        if handshake.deadline > now:
+          continue
+        new_socketTCP = self.__connections[key]
+        if handshake.retransmissions == self.MAX_RETRANSMISSIONS:
+          del self.__handshakes[key]
+          if not handshake.fast_open_length:
+            del self.__connections[key]
+          continue
+        handshake.retransmissions += 1
+        new_socketTCP.stats.retransmissions += 1
+        new_socketTCP.__rto.backoff()
+        handshake.deadline = now + new_socketTCP.__rto.rto
+        self.__sendto(key[0], handshake.syn_ack)
+
+  def __unregister(self, key: tuple[tuple[str, int], int]) -> None:
+    """Elimina una conexión cerrada del demultiplexor de este socket."""
+    with self.__demux_lock:
+      self.__connections.pop(key, None)
+      self.__handshakes.pop(key, None)
+
+  def __add_teardown(self, key: tuple[tuple[str, int], int], teardown: PendingTeardown) -> None:
+    """Recibe el cierre en curso de una conexión de este socket (ver
+    __hand_off), la cual libera de inmediato su lugar entre las conexiones.
+    """
+    with self.__demux_lock:
+      self.__connections.pop(key, None)
+      self.__handshakes.pop(key, None)
+      self.__teardowns[key] = teardown
+      heapq.heappush(self.__teardown_timers, (teardown.deadline, key))
+
+  def __expire_teardowns(self) -> None:
+    """Atiende los timers vencidos de los cierres en curso de las
+    conexiones de este socket, y descarta los que terminaron.
+    """
+    now = self.__backend.monotonic()
+    with self.__demux_lock:
+      while self.__teardown_timers and self.__teardown_timers[0][0] <= now:
+        deadline, key = heapq.heappop(self.__teardown_timers)
+        teardown = self.__teardowns.get(key)
+        if teardown is None or teardown.deadline != deadline:
+          continue
+        if self.__teardown_timeout(teardown, key[0]):
+          del self.__teardowns[key]
+        else:
+          heapq.heappush(self.__teardown_timers, (teardown.deadline, key))
+
+  def __schedule_timer(self, key: tuple[tuple[str, int], int], deadline: float) -> None:
+    """Registra el próximo timer de una conexión no bloqueante de este
+    socket (ver process_events).
+    """
+    with self.__demux_lock:
+      heapq.heappush(self.__connection_timers, (deadline, key))
+
+  def __expire_connection_timers(self) -> float | None:
+    """Atiende las conexiones no bloqueantes de este socket cuyo timer
+    venció (ver process_events). Un error de una conexión no interrumpe a
+    las demás: queda pendiente hasta su próxima llamada, y se avisa a su
+    fileno.
+
+    Returns:
+    --------
+    (float | None): Segundos hasta el próximo timer, o None si no hay.
+    """
+    now = self.__backend.monotonic()
+    due = []
+    with self.__demux_lock:
+      while self.__connection_timers and self.__connection_timers[0][0] <= now:
+        deadline, key = heapq.heappop(self.__connection_timers)
+        new_socketTCP = self.__connections.get(key)
+        if new_socketTCP is not None and new_socketTCP.__timer_deadline == deadline:
+          due.append(new_socketTCP)
+
+    for new_socketTCP in due:
+      new_socketTCP.__timer_deadline = None
+      try:
+        new_socketTCP.process_events()
+      except (OSError, ValueError) as error:
+        new_socketTCP.__pending_error = error
+        new_socketTCP.__notify()
+
+    with self.__demux_lock:
+      if not self.__connection_timers:
+        return None
+      return max(self.__connection_timers[0][0] - self.__backend.monotonic(), 0.0)
+
+  def __notify(self) -> None:
+    """Avisa a quien espera sobre fileno que el socket tiene algo que
+    atender, si alguien lo pidió.
+    """
+    notifier = self.__notifier
+    if notifier is not None:
+      notifier.notify()
+
+  def __close_notifier(self) -> None:
+    """Cierra el descriptor de fileno, si se creó."""
+    if self.__notifier is not None:
+      self.__notifier.close()
+
+  def __release(self) -> None:
+    """Libera el socket udp de la conexión: lo cierra si es propio, o se
+    desregistra del socket que escucha (o de su conexión, si es un stream)
+    si es compartido.
+    """
+    self.__close_notifier()
+    if self.__parent is not None:
+      self.__parent.__unregister_stream(self.__stream_id)
+    elif self.__listener is not None:
+      self.__listener.__unregister(self.__demux_key)
+    else:
+      self.__socket.close()
+
+  def __abort(self, reason: str) -> NoReturn:
+    """Cierra la conexión sin intercambiar FIN ante un error de protocolo
+    del otro extremo (por ejemplo, un mensaje imposible de decodificar):
+    pasa a CLOSED y libera su socket udp, tras lo cual recv retorna b"" y
+    send falla.
+
+    Parameters:
+    -----------
+    reason (str): Descripción del error.
+
+    Raises:
+    -------
+    ConnectionError: Siempre, con la descripción del error.
+    """
+    self.__flush_batch()
+    self.__state = self.CLOSED
+    self.__detached = True
+    self.__release()
+    raise ConnectionError(reason)
+
+  def __hand_off(self, state: str, seq: int, segment: bytes, deadline: float) -> None:
+    """Pasa la conexión a FIN_WAIT (solo en un close no bloqueante), LAST_ACK
+    o TIME_WAIT, recién enviado su FIN, su FIN+ACK o su ACK final, y entrega
+    el resto del cierre a quien atiende su socket udp sin la aplicación: al
+    socket que escucha que la creó, cuyo hilo lo atiende junto a los
+    handshakes y libera de inmediato el lugar de la conexión, o a un hilo
+    propio, que al terminar libera el socket udp.
+
+    Parameters:
+    -----------
+    state (str): Nuevo estado de la conexión.
+    seq (int): Número de secuencia del FIN o FIN+ACK (ver PendingTeardown).
+    segment (bytes): Segmento recién enviado.
+    deadline (float): Momento en que vence el timer del nuevo estado.
+    """
+    # Los datagramas encolados para enviarse en lote salen antes, pues el
+    # socket udp pasa a ser atendido por otro hilo
+    self.__flush_batch()
+    self.__close_notifier()
+    self.__state = state
+    self.__detached = True
+    teardown = PendingTeardown(
+      state, seq, segment, deadline, self.__rto, self.__checksum,
+      (lambda: self) if state == self.FIN_WAIT else weakref.ref(self)
+    )
+    if self.__parent is None and self.__listener is not None:
+      self.__listener.__add_teardown(self.__demux_key, teardown)
+    else:
+      self.__backend.start_thread(lambda: self.__linger(teardown))
+
+  def __linger(self, teardown: PendingTeardown) -> None:
+    """Hilo que atiende el cierre en curso de una conexión con socket udp
+    propio, o de un stream (ver __hand_off), y al terminar libera su socket
+    udp.
+    """
+    while True:
+      if self.__backend.monotonic() >= teardown.deadline:
+        if self.__teardown_timeout(teardown, self.conn_sock_addr):
+          break
+        continue
+      try:
+        datagram, address = self.__recvfrom(self.__time_until(teardown.deadline))
+        header, data = self.parse_segment(datagram)
+      except socket.timeout:
+        continue
+      except (struct.error, ValueError, IndexError):
+        continue
+      except OSError:
+        break
+      if self.__advance_teardown(teardown, header, data, address):
+        break
+    self.__state = self.CLOSED
+    self.__release()
+
+  def __advance_teardown(
+    self, teardown: PendingTeardown, header: HeaderTCP, data: bytes | memoryview,
+    address: tuple[str, int]
+  ) -> bool:
+    """Procesa un segmento recibido para un cierre en curso: en FIN_WAIT
+    el FIN+ACK se confirma con el ACK final y pasa a TIME_WAIT, como en
+    close; en LAST_ACK el ACK final lo termina, y un FIN retransmitido
+    indica que nuestro FIN+ACK se perdió; en TIME_WAIT un FIN+ACK
+    retransmitido indica que nuestro ACK final se perdió. En ambos casos
+    se reenvía lo perdido.
+
+    Returns:
+    --------
+    (bool): True si el cierre terminó.
+    """
+    if teardown.state == self.FIN_WAIT:
+      connection = teardown.connection()
+
+      # Reconfirmamos los segmentos de datos duplicados, y respondemos el FIN
+      # simultáneo del otro extremo como si hubiera llegado primero
+      if not header.syn and not header.ack and not header.fin and seq_diff(header.seq, teardown.seq) < 0:
+        connection.__process_data_segment(header.seq, data, address)
+      elif header == HeaderTCP(False, False, True, teardown.seq):
+        self.__sendto(
+          address, connection.__build_segment(HeaderTCP(False, True, True, seq_add(teardown.seq, 1)))
+        )
+      elif header == HeaderTCP(False, True, True, seq_add(teardown.seq, 1)):
+        teardown.segment = connection.__build_segment(HeaderTCP(False, True, False, seq_add(teardown.seq, 2)))
+        self.__sendto(address, teardown.segment)
+        teardown.state = connection.__state = self.TIME_WAIT
+        teardown.seq = seq_add(teardown.seq, 1)
+        teardown.deadline = self.__time_wait_deadline(teardown.rto)
+    elif teardown.state == self.LAST_ACK:
+      if header == HeaderTCP(False, True, False, seq_add(teardown.seq, 1)):
+        self.__finish_teardown(teardown)
+        return True
+      if header.fin and not header.ack and not header.syn and seq_diff(header.seq, teardown.seq) < 0:
+        self.__sendto(address, teardown.segment)
+    elif header == HeaderTCP(False, True, True, teardown.seq):
+      self.__sendto(address, teardown.segment)
+    return False
+
+  def __teardown_timeout(self, teardown: PendingTeardown, address: tuple[str, int]) -> bool:
+    """Atiende el timer vencido de un cierre en curso: en FIN_WAIT y
+    LAST_ACK retransmite el FIN o FIN+ACK (duplicando el RTO) hasta agotar
+    sus retransmisiones, y en TIME_WAIT lo termina.
+
+    Returns:
+    --------
+    (bool): True si el cierre terminó.
+    """
+    if teardown.state != self.TIME_WAIT and teardown.retransmissions < self.MAX_FIN_RETRANSMISSIONS:
+      teardown.retransmissions += 1
+      teardown.rto.backoff()
+      teardown.deadline = self.__backend.monotonic() + teardown.rto.rto
+      self.__sendto(address, teardown.segment)
+      return False
+    self.__finish_teardown(teardown)
+    return True
+
+  @staticmethod
+  def __finish_teardown(teardown: PendingTeardown) -> None:
+    """Marca cerrada la conexión de un cierre que terminó, si aún existe."""
+    connection = teardown.connection()
+    if connection is not None:
+      connection.__state = SocketTCP.CLOSED
+
+  def open_stream(self) -> SocketTCP:
+    """Método encargado de abrir un nuevo stream sobre esta conexión, sin
+    un nuevo handshake. Cada stream tiene su propio espacio de números de
+    secuencia, su propia ventana deslizante y su propio buffer de recepción,
+    por lo que una pérdida en un stream no detiene a los demás. Se usa como
+    cualquier SocketTCP conectado, y se cierra con close.
+
+    El otro extremo conoce el stream al recibir su primer segmento, por lo
+    que quien lo abre debe ser el primero en enviar. Los streams deben
+    cerrarse antes que su conexión, pues esta libera el socket udp.
+
+    Returns:
+    --------
+    (SocketTCP): Stream abierto.
+
+    Raises:
+    -------
+    RuntimeError: Si no se negociaron streams en la conexión, o si se
+                  agotaron los identificadores de stream.
+    """
+    if self.__streams is None:
+      raise RuntimeError("Streams were not negotiated on this connection")
+    with self.__streams_lock:
+      stream_id = self.__next_stream_id
+      if stream_id > 0xFFFF:
+        raise RuntimeError("No stream identifiers left on this connection")
+      self.__next_stream_id += 2
+      return self.__new_stream(stream_id)
+
+  def accept_stream(self) -> SocketTCP:
+    """Método encargado de retirar el próximo stream abierto por el otro
+    extremo de esta conexión. Espera a lo más el timeout del socket, y en
+    modo no bloqueante (ver setblocking) no espera.
+
+    Returns:
+    --------
+    (SocketTCP): Stream abierto por el otro extremo.
+
+    Raises:
+    -------
+    RuntimeError: Si no se negociaron streams en la conexión.
+    socket.timeout: Si no se abre ningún stream antes del timeout.
+    BlockingIOError: En modo no bloqueante, si no hay streams por aceptar.
+    """
+    if self.__streams is None:
+      raise RuntimeError("Streams were not negotiated on this connection")
+    try:
+      return self.__stream_queue.get(timeout=self.__timeout)
+    except queue.Empty:
+      if self.__timeout == 0.0:
+        raise BlockingIOError(errno.EAGAIN, "No streams to accept") from None
+      raise socket.timeout("timed out") from None
+
+  @property
+  def stream_id(self) -> int:
+    """Identificador del stream dentro de su conexión (0 para la conexión misma)."""
+    return self.__stream_id
+
+  def __enable_streams(self, first_stream_id: int) -> None:
+    """Habilita los streams en esta conexión, una vez negociados.
+
+    Parameters:
+    -----------
+    first_stream_id (int): Primer identificador de los streams abiertos por
+                           este extremo (1 en el cliente y 2 en el servidor).
+    """
+    self.__streams = {}
+    self.__stream_queue = self.__backend.queue()
+    self.__streams_lock = threading.Lock()
+    self.__next_stream_id = first_stream_id
+
+  def __start_stream_demultiplexer(self) -> None:
+    """Si esta conexión tiene su propio socket udp, pasa a recibir sus
+    datagramas a través de inbox y lanza el hilo que los reparte entre sus
+    streams. Una conexión creada por un socket que escucha no lo necesita,
+    pues su hilo ya reparte los datagramas.
+    """
+    if self.__listener is not None:
+      return
+    self.__inbox = self.__backend.queue()
+    self.__backend.start_thread(self.__demultiplex_streams)
+
+  def __demultiplex_streams(self) -> None:
+    """Hilo de una conexión con streams y socket udp propio: recibe todos
+    los datagramas y los reparte a sus streams. Termina cuando se cierra el
+    socket; para notarlo, revisa el socket al menos una vez por segundo.
+    """
+    while True:
+      try:
+        datagram, address = self.__recvfrom_socket(1.0)
+        header, _ = self.parse_segment(datagram)
+      except socket.timeout:
+        continue
+      except (struct.error, ValueError, IndexError):
+        continue
+      except OSError:
+        return
+      self.__route_stream(header, bytes(datagram), address)
+
+  def __route_stream(self, header: HeaderTCP, datagram: bytes, address: tuple[str, int]) -> None:
+    """Entrega un datagrama de esta conexión al stream al que corresponde.
+    El primer segmento de datos de un stream nuevo del otro extremo lo
+    abre, y lo deja en la cola de accept_stream. Los datagramas de streams
+    ya cerrados se descartan.
+    """
+    if header.stream_id == 0 or self.__streams is None:
+      self.__inbox.put((datagram, address))
+      self.__notify()
+      return
+
+    with self.__streams_lock:
+      stream = self.__streams.get(header.stream_id)
+      if stream is None:
+        opened_by_peer = header.stream_id % 2 != self.__next_stream_id % 2
+        if (
+          not opened_by_peer or header.stream_id in self.__closed_stream_ids or
+          header.syn or header.ack or header.fin or header.seq != 0
+        ):
+          return
+        stream = self.__new_stream(header.stream_id)
+        self.__stream_queue.put(stream)
+    stream.__inbox.put((datagram, address))
+    stream.__notify()
+
+  def __new_stream(self, stream_id: int) -> SocketTCP:
+    """Crea y registra un stream de esta conexión, con su configuración y
+    la negociada en el handshake. Los números de secuencia de un stream
+    comienzan en 0. Debe llamarse con el lock de los streams tomado.
+    """
+    stream = self.__new_connection()
+    stream.__socket.close()
+    stream.__socket = self.__socket
+    stream.__binary_header = True
+    stream.__sack = self.__sack
+    stream.__checksum = self.__checksum
+    stream.__codec = self.__codec
+    stream.__set_mss(self.__mss)
+    stream.__conn_id = self.__conn_id
+    stream.__stream_id = stream_id
+    stream.__parent = self
+    stream.__inbox = self.__backend.queue()
+    stream.address = self.__socket.getsockname()
+    stream.conn_sock_addr = self.conn_sock_addr
+    stream.seq = 0
+    stream.__state = self.ESTABLISHED
+
+    # El RTT de la conexión es un buen punto de partida para el del stream
+    if self.__rto.srtt is not None:
+      stream.__rto.add_sample(self.__rto.srtt)
+
+    self.__streams[stream_id] = stream
+    return stream
+
+  def __unregister_stream(self, stream_id: int) -> None:
+    """Elimina un stream cerrado de esta conexión."""
+    with self.__streams_lock:
+      self.__streams.pop(stream_id, None)
+      self.__closed_stream_ids.add(stream_id)
+
+  def settimeout(self, timeout_in_seconds: float | None) -> None:
+    """Método encargado de setear un timeout al socket. El timeout limita
+    cuánto se bloquean accept y recv esperando a que llegue algo; las
+    retransmisiones, en cambio, se rigen por el RTO de la conexión.
+
+    Parameters:
+    -----------
+    timeout_in_seconds (float | None): Tiempo de timeout a fijar en el socket
+                                       en segundos. None bloquea sin límite,
+                                       y 0 deja al socket en modo no
+                                       bloqueante (ver setblocking).
+    """
+    self.__timeout = timeout_in_seconds
+
+  def setblocking(self, flag: bool) -> None:
+    """Método encargado de fijar si el socket es bloqueante: equivale a
+    settimeout(None) si flag es True, y a settimeout(0) si es False.
+
+    En modo no bloqueante ni send, ni recv, ni recv_into, ni accept (tras
+    listen), ni close esperan a que llegue algo. send encola el mensaje y
+    lanza BlockingIOError si no hay espacio; recv y recv_into retornan lo
+    que ya llegó del mensaje actual, o lanzan BlockingIOError si no llegó
+    nada; accept lanza BlockingIOError si no hay conexiones por aceptar.
+    La conexión solo avanza dentro de esas llamadas y de process_events,
+    que debe llamarse cuando fileno avisa y cuando vence el próximo timer,
+    de modo que un único hilo puede atender muchas conexiones con
+    selectors. connect, shutdown y keepalive bloquean igualmente, y
+    sendfile y recv_to_file requieren el modo bloqueante (lanzan
+    ValueError).
+
+    Parameters:
+    -----------
+    flag (bool): Si el socket debe ser bloqueante.
+    """
+    self.settimeout(None if flag else 0.0)
+
+  def getblocking(self) -> bool:
+    """Retorna si el socket es bloqueante (ver setblocking)."""
+    return self.__timeout != 0.0
+
+  def fileno(self) -> int:
+    """Método encargado de retornar un descriptor con el cual esperar al
+    socket con select, poll o selectors: se vuelve legible cuando el socket
+    tiene algo que atender (datagramas recibidos o, tras listen, conexiones
+    por aceptar). Es el del socket udp, salvo que este se comparta (tras
+    listen, en sus conexiones o con streams), en cuyo caso es uno al que
+    avisa el hilo que reparte los datagramas.
+
+    Los timers no lo vuelven legible: el tiempo hasta el próximo lo retorna
+    process_events. Tampoco los datos que ya quedaron en el buffer de
+    recepción si es el del socket udp (ver pending).
+
+    Returns:
+    --------
+    (int): Descriptor del socket.
+
+    Raises:
+    -------
+    io.UnsupportedOperation: Si el backend del socket no usa descriptores
+                             del sistema (como los de simulation).
+    """
+    if self.__inbox is None and self.__connections is None:
+      return self.__socket.fileno()
+    if self.__notifier is None:
+      # Lo que llegó antes de crear el aviso también debe atenderse
+      self.__notifier = self.__backend.notifier()
+      self.__notifier.notify()
+    return self.__notifier.fileno()
+
+  def pending(self) -> int:
+    """Método encargado de retornar cuántos bytes recibidos esperan en el
+    buffer de recepción, que recv retorna sin esperar. Como en
+    ssl.SSLSocket, si fileno es el del socket udp estos no lo vuelven
+    legible, por lo que tras recv o process_events la aplicación debe
+    revisar pending antes de volver a esperar.
+
+    Returns:
+    --------
+    (int): Cantidad de bytes en el buffer de recepción.
+    """
+    return len(self.__recv_ring)
+
+  def process_events(self) -> float | None:
+    """Método encargado de atender sin bloquear una conexión en modo no
+    bloqueante (ver setblocking): procesa los datagramas que ya llegaron,
+    atiende sus timers vencidos (retransmisiones y ACK retrasado), envía lo
+    que la ventana permite de los mensajes encolados y, si close espera a
+    que se confirmen, envía el FIN.
+
+    En un socket que escucha (ver listen), atiende las conexiones aceptadas
+    en modo no bloqueante cuyo timer venció, guardados en un heap, de modo
+    que basta una llamada por iteración para todas ellas. Sus datagramas se
+    atienden en cada una cuando avisa su fileno.
+
+    Returns:
+    --------
+    (float | None): Segundos hasta el próximo timer (para usarlo como
+                    timeout de select), o None si no hay ninguno.
+
+    Raises:
+    -------
+    socket.timeout: Si el otro extremo dejó de confirmar un mensaje enviado.
+    """
+    if self.__connections is not None:
+      return self.__expire_connection_timers()
+    if self.__pending_error is not None:
+      error, self.__pending_error = self.__pending_error, None
+      raise error
+    if self.__detached:
+      return None
+
+    self.__start_transmission()
+    self.__drain_socket()
+    now = self.__backend.monotonic()
+    if self.__transmission is not None and self.__transmission_deadline <= now:
+      self.__advance_transmission(None)
+    if self.__ack_deadline is not None and self.__ack_deadline <= now:
+      self.__flush_ack()
+    if self.__close_pending and not self.__outgoing:
+      self.close()
+      return None
+
+    deadline = self.__ack_deadline
+    if self.__transmission is not None and (deadline is None or self.__transmission_deadline < deadline):
+      deadline = self.__transmission_deadline
+
+    # Una conexión de un socket que escucha le informa su próximo timer
+    if self.__listener is not None and self.__parent is None and deadline != self.__timer_deadline:
+      self.__timer_deadline = deadline
+      if deadline is not None:
+        self.__listener.__schedule_timer(self.__demux_key, deadline)
+    return None if deadline is None else max(deadline - now, 0.0)
+
+  @property
+  def rto(self) -> float:
+    """Tiempo de retransmisión (RTO) actual de la conexión, en segundos."""
+    return self.__rto.rto
+
+  @property
+  def srtt(self) -> float | None:
+    """RTT suavizado de la conexión en segundos, None si aún no hay muestras."""
+    return self.__rto.srtt
+
+  @property
+  def rtt_samples(self) -> list[float]:
+    """Últimas muestras de RTT de la conexión, en segundos."""
+    return list(self.__rto.samples)
+
+  @property
+  def mss(self) -> int:
+    """Tamaño máximo de los datos de un segmento usado en la conexión."""
+    return self.__mss
+
+  def __local_mss(self, address: tuple[str, int]) -> int:
+    """Retorna el MSS que este extremo anuncia para una conexión con
+    address: el configurado, o el derivado del MTU de la ruta.
+
+    Parameters:
+    -----------
+    address (tuple[str, int]): Dirección del otro extremo.
+
+    Returns:
+    --------
+    (int): MSS a anunciar.
+    """
+    if self.__configured_mss is not None:
+      return self.__configured_mss
+    return self.route_mss(address, self.__backend)
+
+  @staticmethod
+  def route_mss(address: tuple[str, int], backend: DatagramBackend | None = None) -> int:
+    """Método estático que retorna el MSS derivado del MTU de la ruta hacia
+    address si el backend permite consultarlo (el del sistema, con IP_MTU
+    en Linux), o DEFAULT_MSS si no.
+
+    Parameters:
+    -----------
+    address (tuple[str, int]): Dirección del otro extremo.
+    backend (DatagramBackend | None): Backend a consultar. Si es None se
+                                      usa el del sistema.
+
+    Returns:
+    --------
+    (int): MSS de la ruta.
+    """
+    mtu = (backend or SYSTEM_BACKEND).path_mtu(address)
+    if mtu is None:
+      return SocketTCP.DEFAULT_MSS
+    return max(
+      min(mtu - SocketTCP.IP_UDP_OVERHEAD - SocketTCP.SEGMENT_OVERHEAD, SocketTCP.MAX_MSS),
+      SocketTCP.LEGACY_MSS
+    )
+
+  @staticmethod
+  def peer_mss(options_data: bytes | memoryview) -> int:
+    """Método estático que retorna el MSS anunciado por el otro extremo en
+    las opciones de su SYN o SYN+ACK, o LEGACY_MSS si no lo anunció.
+
+    Parameters:
+    -----------
+    options_data (bytes | memoryview): Opciones recibidas.
+
+    Returns:
+    --------
+    (int): MSS del otro extremo.
+    """
+    value = parse_options(options_data).get(MSS_OPTION)
+    if value is None or len(value) != MSS_VALUE.size:
+      return SocketTCP.LEGACY_MSS
+    return MSS_VALUE.unpack(value)[0]
+
+  def __set_mss(self, mss: int) -> None:
+    """Fija el MSS de la conexión, dimensionando el buffer de recepción
+    de datagramas para que quepa un segmento completo, el buffer de
+    recepción de la conexión para que quepa al menos un segmento, y el
+    buffer del socket udp subyacente para que quepa una ventana completa.
+
+    Parameters:
+    -----------
+    mss (int): MSS negociado.
+    """
+    self.__mss = mss
+    self.__buff_size = max(4096, mss + self.SEGMENT_OVERHEAD)
+    self.__datagram_buffer = bytearray(self.__buff_size)
+    self.__datagram_view = memoryview(self.__datagram_buffer)
+    if self.__recv_ring.capacity < mss:
+      self.__recv_ring = RingBuffer(mss)
+      self.__advertised_window = mss
+    try:
+      rcvbuf = self.__socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+      if rcvbuf < self.__window_size * self.__buff_size:
+        self.__socket.setsockopt(
+          socket.SOL_SOCKET, socket.SO_RCVBUF, self.__window_size * self.__buff_size
         )
+    except OSError:
+      pass
+
+  @property
+  def cwnd(self) -> float:
+    """Ventana de congestión actual de la conexión, en segmentos."""
+    return self.__congestion.cwnd
+
+  @property
+  def compression(self) -> str | None:
+    """Algoritmo de compresión negociado para la conexión, None si no se
+    comprime.
+    """
+    return self.__codec.name if self.__codec is not None else None
 
-        # Agregamos los datos
-        tcp_msg_to_send += str(msgs_to_send[i])
+  @property
+  def state(self) -> str:
+    """Estado de la conexión: CLOSED, LISTEN, ESTABLISHED, FIN_WAIT,
+    CLOSE_WAIT, LAST_ACK o TIME_WAIT. LAST_ACK y TIME_WAIT se atienden sin
+    la aplicación, y al terminar la conexión pasa a CLOSED.
+    """
+    return self.__state
 
-        # Actualizamos el numero de secuencia
-        self.seq += len(str(msgs_to_send[i]).encode())
+  def send(self, msg: str | bytes | memoryview) -> None:
+    """Método encargado de enviar un mensaje a un socket; implementa el
+    lado del emisor de ventana deslizante, ya sea Go-Back-N o Selective
+    Repeat según el modo del socket. Con una ventana de tamaño 1 ambos
+    modos se reducen a Stop & Wait.
 
-        # Enviamos el mensaje
-        self.__socket.sendto(tcp_msg_to_send.encode(), self.conn_sock_addr)
+    Los segmentos se toman como vistas (memoryview) del mensaje, por lo
+    que sus datos no se copian ni se re-codifican al enviarlos, salvo que
+    el mensaje se envíe comprimido (ver __encode_message).
 
-        # Recibimos y parseamos la respuesta
-        recvd_msg, _ = self.__socket.recvfrom(self.__buff_size)
-        recvd_msg_header = self.parse_header(recvd_msg.decode())
+    Además de la ventana del socket y la de congestión, se respeta la
+    ventana anunciada por el receptor (el espacio libre de su buffer de
+    recepción). Si esta no alcanza para nada y no hay segmentos en vuelo,
+    tras PERSIST_TIMEOUT (o un RTO, si es mayor) sin que el receptor la
+    amplíe se envía igualmente el primer segmento pendiente como sonda.
 
-        # Si la respuesta recibida no tiene un header 0|||1|||0|||seq+bytes_sent|||,
-        # arrojamos un error generico.
-        if recvd_msg_header != HeaderTCP(False, True, False, self.seq):
-          raise Exception()
+    En modo no bloqueante (ver setblocking) el mensaje se copia (salvo que
+    sea bytes, que es inmutable) y se encola sin esperar, y process_events
+    lo envía. Los mensajes encolados se envían de a uno, en orden. Un
+    mensaje vacío no se envía.
 
-      # Si se arroja un error disminuimos los bytes enviados al valor anterior y
-      # no actualizamos el substring a enviar.
-      except:
-        self.seq -= len(str(msgs_to_send[i]).encode())
+    Parameters:
+    -----------
+    msg (str | bytes | memoryview): Mensaje a enviar al socket desde donde
+                                    se llama el método. Si es un str se
+                                    codifica una única vez en UTF-8.
+
+    Raises:
+    -------
+    BrokenPipeError: Si la conexión no admite más envíos: se cerró, se
+                     hizo shutdown, o el otro extremo la cerró con close.
+    BlockingIOError: En modo no bloqueante, si encolar el mensaje excede
+                     SEND_BUFFER_SIZE bytes sin confirmar. Un mensaje
+                     mayor se acepta solo si no hay otros encolados.
+    socket.timeout: Si el otro extremo deja de confirmar los segmentos (en
+                    modo no bloqueante, un envío anterior).
+    """
+    self.__check_sendable()
+    if isinstance(msg, str):
+      msg = msg.encode()
+    msg_view = memoryview(msg).cast("B")
+
+    # Un mensaje vacío no se envía: el otro extremo no podría distinguirlo
+    # del fin de la conexión
+    if not msg_view:
+      return
+
+    if self.__timeout != 0.0:
+      self.__send_message(msg_view)
+      return
+
+    if self.__outgoing and self.__outgoing_bytes + len(msg_view) > self.SEND_BUFFER_SIZE:
+      raise BlockingIOError(errno.EAGAIN, "Send buffer is full")
+    if not isinstance(msg, bytes):
+      msg_view = memoryview(bytes(msg_view))
+    self.__outgoing.append(msg_view)
+    self.__outgoing_bytes += len(msg_view)
+    self.process_events()
+
+  def __check_sendable(self) -> None:
+    """Lanza BrokenPipeError si la conexión no admite más envíos (ver send)."""
+    if self.__close_pending or self.__state != self.ESTABLISHED and not (
+      self.__state == self.CLOSE_WAIT and self.__peer_half_closed
+    ):
+      raise BrokenPipeError(errno.EPIPE, f"Cannot send on a connection in state {self.__state}")
+
+  def __send_message(self, msg: memoryview | FileMessage) -> None:
+    """Envía un mensaje en modo bloqueante, tras los encolados, y espera a
+    que se confirme.
+
+    Parameters:
+    -----------
+    msg (memoryview | FileMessage): Mensaje a enviar, que puede ser vacío.
+    """
+    self.__outgoing.append(msg)
+    self.__outgoing_bytes += len(msg)
+    self.__finish_transmissions()
+
+  def __transmit(self, msg: memoryview | FileMessage) -> Generator[float, tuple[memoryview, tuple[str, int]] | None, None]:
+    """Generador que envía un mensaje: implementa el lado del emisor de
+    ventana deslizante (ver send). Cada vez que espera respuesta entrega
+    el momento en que vence su próximo timer, y recibe el datagrama que
+    llegó junto a su dirección de origen, o None si el timer venció (ver
+    __advance_transmission). Termina cuando se confirma todo el mensaje.
+
+    Los segmentos se generan a medida que caben en la ventana, y solo se
+    guarda el estado de los que están en vuelo, de modo que la memoria
+    usada no depende del largo del mensaje.
 
-      # De lo contrario, si se recibió la respuesta esperada, actualizamos el indice 
-      # del substring a enviar a continuación.
+    Parameters:
+    -----------
+    msg (memoryview | FileMessage): Mensaje a enviar.
+
+    Raises:
+    -------
+    socket.timeout: Si se agotan las retransmisiones de un segmento.
+    """
+    # Como lo primero a comunicar es el largo total en bytes del mensaje,
+    # este va en el primer segmento, seguido por trozos del mensaje (o de su
+    # versión comprimida) de a lo más MSS bytes.
+    length_segment, payload = self.__encode_message(msg)
+    pending_segments = itertools.chain((memoryview(length_segment),), split_chunks(payload, self.__mss))
+
+    # Datos, número de secuencia y número de secuencia del ACK que lo
+    # confirma de cada segmento generado que no ha sido confirmado, junto a
+    # diccionarios que mapean el número de secuencia de un ACK al índice del
+    # segmento que confirma, y (para los ACKs acumulativos) el del inicio de
+    # cada segmento, y del siguiente a generar, a su índice.
+    segments: dict[int, memoryview] = {}
+    seqs: dict[int, int] = {}
+    ack_seqs: dict[int, int] = {}
+    acks_to_index: dict[int, int] = {}
+    boundaries: dict[int, int] = {}
+    produced = 0
+    seq = self.seq
+    boundaries[seq] = 0
+
+    def produce() -> bool:
+      # Genera el siguiente segmento del mensaje, si queda alguno
+      nonlocal produced, seq
+      segment = next(pending_segments, None)
+      if segment is None:
+        return False
+      segments[produced] = segment
+      seqs[produced] = seq
+      seq = seq_add(seq, len(segment))
+      ack_seqs[produced] = seq
+      acks_to_index[seq] = produced
+      produced += 1
+      boundaries[seq] = produced
+      return True
+
+    # Se comienza la ventana deslizante: base es el primer segmento sin
+    # confirmar, next_to_send el siguiente segmento a enviar y sent la
+    # cantidad de segmentos enviados alguna vez (en Go-Back-N next_to_send
+    # retrocede tras un timeout, pero los ACKs de lo ya enviado siguen
+    # siendo válidos).
+    base = 0
+    next_to_send = 0
+    sent = 0
+    acked: set[int] = set()
+
+    # Para medir el RTT guardamos cuándo se envió por primera vez cada
+    # segmento y si fue retransmitido (algoritmo de Karn). En Go-Back-N hay
+    # un único timer de retransmisión, y en Selective Repeat uno por segmento.
+    sent_at: dict[int, float] = {}
+    retransmitted: set[int] = set()
+    deadlines: dict[int, float] = {}
+    overdue: set[int] = set()
+    timer = None
+    retransmissions = 0
+
+    # Si la ventana del receptor no alcanza para el primer segmento pendiente
+    # y no hay nada en vuelo, esperamos hasta persist_deadline a que la
+    # amplíe, y luego enviamos el segmento igualmente como sonda (probe).
+    persist_deadline = None
+    probe = None
+    while base < produced or produce():
+
+      # Enviamos todos los segmentos que caben en la ventana, que es la menor
+      # entre la ventana del socket y la ventana de congestión, y cuyos
+      # datos caben en la ventana anunciada por el receptor, juntos en un
+      # lote donde se soporta
+      window = max(int(min(self.__window_size, self.__congestion.cwnd)), 1)
+      now = self.__backend.monotonic()
+      self.__start_batch()
+      try:
+        while next_to_send < base + window and (next_to_send < produced or produce()) and (
+          self.__peer_window is None or
+          seq_diff(ack_seqs[next_to_send], seqs[base]) <= self.__peer_window or
+          (next_to_send == base and persist_deadline is not None and persist_deadline <= now)
+        ):
+          if self.__peer_window is not None and seq_diff(ack_seqs[next_to_send], seqs[base]) > self.__peer_window:
+            probe = next_to_send
+          persist_deadline = None
+          if next_to_send not in acked:
+            self.__send_data_segment(
+              seqs[next_to_send], segments[next_to_send], retransmission=next_to_send < sent
+            )
+            if next_to_send < sent:
+              retransmitted.add(next_to_send)
+            else:
+              sent_at[next_to_send] = now
+              sent = next_to_send + 1
+            deadlines[next_to_send] = now + self.__rto.rto
+            if timer is None:
+              timer = now + self.__rto.rto
+          next_to_send += 1
+      finally:
+        self.__flush_batch()
+
+      # Esperamos respuesta hasta que venza el próximo timer
+      if next_to_send == base:
+        if persist_deadline is None:
+          persist_deadline = now + max(self.__rto.rto, self.PERSIST_TIMEOUT)
+        deadline = persist_deadline
+      elif self.__mode == self.GO_BACK_N:
+        deadline = timer
       else:
-        i += 1
+        deadline = min(deadlines[i] for i in range(base, next_to_send) if i not in acked)
+
+      received = yield deadline
+
+      # Si vence el timer duplicamos el RTO, reducimos la ventana de congestión
+      # y retransmitimos: en Go-Back-N toda la ventana (que vuelve a crecer
+      # desde un segmento), y en Selective Repeat los segmentos cuyo timer
+      # venció dentro de la nueva ventana. La base se retransmite siempre: es
+      # el segmento más antiguo sin confirmar y su timer puede haber quedado
+      # armado con un RTO ya retrocedido, de modo que si sólo venciera un
+      # segmento fuera de la ventana nunca se enviaría nada.
+      if received is None:
+        if next_to_send == base:
+          continue
+        if retransmissions == self.MAX_RETRANSMISSIONS:
+          raise socket.timeout("Connection timed out while waiting for ACK")
+        retransmissions += 1
+        self.__rto.backoff()
+        self.__congestion.on_timeout(next_to_send - base)
+        if self.event_hook is not None:
+          self.event_hook("timeout", seq=seqs[base], rto=self.__rto.rto, cwnd=self.__congestion.cwnd)
+        if self.__mode == self.GO_BACK_N:
+          next_to_send = base
+          timer = None
+        else:
+          window = max(int(min(self.__window_size, self.__congestion.cwnd)), 1)
+          now = self.__backend.monotonic()
+          self.__start_batch()
+          try:
+            for i in range(base, next_to_send):
+              if i in acked or (i != base and deadlines[i] > now):
+                continue
+              if i < base + window:
+                self.__send_data_segment(seqs[i], segments[i], retransmission=True)
+                retransmitted.add(i)
+              else:
+                overdue.add(i)
+              deadlines[i] = now + self.__rto.rto
+          finally:
+            self.__flush_batch()
+        continue
+
+      # Parseamos la respuesta, ignorándola si está malformada
+      recvd_msg, transmitter_address = received
+      try:
+        recvd_msg_header, recvd_msg_data = self.parse_segment(recvd_msg)
+      except (struct.error, ValueError, IndexError):
+        continue
+
+      # Si el servidor retransmitió su SYN+ACK, nuestro ACK del handshake
+      # se perdió y hay que reenviarlo
+      if recvd_msg_header.syn and recvd_msg_header.ack and self.__handshake_ack is not None:
+        self.__sendto(transmitter_address, self.__handshake_ack)
+        continue
+
+      # Si el otro extremo retransmite datos que ya recibimos, nuestro ACK
+      # se perdió y hay que reenviarlo, o ambos quedaríamos esperando
+      if not recvd_msg_header.syn and not recvd_msg_header.ack and not recvd_msg_header.fin:
+        if seq_diff(recvd_msg_header.seq, self.seq) < 0:
+          self.__process_data_segment(recvd_msg_header.seq, recvd_msg_data, transmitter_address)
+        continue
+
+      # Ignoramos todo lo que no sea un ACK
+      if recvd_msg_header.syn or recvd_msg_header.fin or not recvd_msg_header.ack:
+        continue
+
+      # Registramos la ventana anunciada por el receptor. Un ACK que la
+      # amplía cuando esta nos tenía detenidos, o que responde a una sonda
+      # porque el primer segmento en vuelo no cabe en ella, no indica
+      # pérdidas (no es un ACK duplicado) pero sí que la conexión sigue viva.
+      window_update = False
+      if self.__binary_header:
+        blocked = (
+          self.__peer_window is not None and (next_to_send < produced or produce()) and
+          seq_diff(ack_seqs[next_to_send], seqs[base]) > self.__peer_window
+        )
+        window_update = (
+          (blocked and recvd_msg_header.window > self.__peer_window) or
+          seq_diff(ack_seqs[base], seqs[base]) > recvd_msg_header.window
+        )
+        self.__peer_window = recvd_msg_header.window
+
+        # Si el receptor rechazó la sonda por falta de espacio y ahora cabe,
+        # la reenviamos sin esperar a su timer
+        if probe == base and recvd_msg_header.seq == seqs[base] and (
+          seq_diff(ack_seqs[base], seqs[base]) <= self.__peer_window
+        ):
+          self.__send_data_segment(seqs[base], segments[base], retransmission=True)
+          retransmitted.add(base)
+          timer = deadlines[base] = self.__backend.monotonic() + self.__rto.rto
+          probe = None
+          window_update = True
+        if window_update:
+          retransmissions = 0
+
+      # Con ACKs acumulativos y SACK el ACK confirma todos los segmentos
+      # anteriores a su número de secuencia, y sus bloques SACK los que el
+      # receptor guardó fuera de orden, de modo que solo se retransmiten los
+      # huecos. Un ACK por el inicio del primer segmento en vuelo que no
+      # confirma nada nuevo es un ACK duplicado.
+      if self.__sack:
+        end = boundaries.get(recvd_msg_header.seq)
+        if end is None or end > sent:
+          continue
+        newly_acked = [j for j in range(base, end) if j not in acked]
+        cumulative = len(newly_acked)
+        for start, stop in parse_sack(recvd_msg_data)[:self.MAX_SACK_BLOCKS]:
+          j = boundaries.get(start)
+          while j is not None and j < sent and seq_diff(ack_seqs[j], stop) <= 0:
+            if j >= end and j not in acked:
+              newly_acked.append(j)
+            j += 1
+        if not newly_acked:
+          if not window_update and end == base < next_to_send and self.__congestion.on_dup_ack(next_to_send - base):
+            self.__send_data_segment(seqs[base], segments[base], retransmission=True)
+            retransmitted.add(base)
+            timer = deadlines[base] = self.__backend.monotonic() + self.__rto.rto
+          continue
+
+      # En Go-Back-N un ACK por el inicio del primer segmento en vuelo es un
+      # ACK duplicado: el receptor descartó segmentos posteriores a uno
+      # perdido. Tras varios de ellos lo retransmitimos sin esperar al timer
+      # (fast retransmit).
+      elif (
+        self.__mode == self.GO_BACK_N and not window_update and
+        recvd_msg_header.seq == seqs[base] and base < next_to_send
+      ):
+        if self.__congestion.on_dup_ack(next_to_send - base):
+          self.__send_data_segment(seqs[base], segments[base], retransmission=True)
+          retransmitted.add(base)
+          timer = self.__backend.monotonic() + self.__rto.rto
+        continue
+
+      else:
+        # Ignoramos los ACKs que no corresponden a un segmento en vuelo
+        i = acks_to_index.get(recvd_msg_header.seq)
+        if i is None or i < base or i >= sent or i in acked:
+          continue
+
+        # En Go-Back-N el ACK es acumulativo, por lo que confirma todos los
+        # segmentos hasta el i-ésimo, y en Selective Repeat solo el i-ésimo
+        newly_acked = range(base, i + 1) if self.__mode == self.GO_BACK_N else [i]
+        cumulative = len(newly_acked)
+
+      # Tomamos una muestra de RTT del último segmento confirmado que no fue
+      # retransmitido (algoritmo de Karn). Un ACK acumulativo que llega tras
+      # retransmitir alguno de los segmentos que confirma no mide el RTT de
+      # los demás, pero sus bloques SACK sí miden el de los segmentos que
+      # confirman por primera vez.
+      now = self.__backend.monotonic()
+      measurable = newly_acked
+      if any(j in retransmitted for j in newly_acked[:cumulative]):
+        measurable = newly_acked[cumulative:]
+      measurable = [j for j in measurable if j not in retransmitted]
+      if measurable:
+        self.__add_rtt_sample(now - sent_at[max(measurable)])
+      retransmissions = 0
+      acked.update(newly_acked)
+
+      # Deslizamos la ventana hasta el primer segmento sin confirmar,
+      # descartando el estado de los segmentos que quedan atrás, y
+      # reiniciamos el timer si quedan segmentos en vuelo. Si se confirmaron
+      # datos nuevos la conexión volvió a avanzar, por lo que deshacemos el
+      # backoff del RTO aunque el ACK no haya servido como muestra.
+      old_base = base
+      while base in acked:
+        acked.discard(base)
+        retransmitted.discard(base)
+        overdue.discard(base)
+        sent_at.pop(base, None)
+        deadlines.pop(base, None)
+        del segments[base], acks_to_index[ack_seqs.pop(base)], boundaries[seqs.pop(base)]
+        base += 1
+      if base > old_base:
+        self.__rto.reset_backoff()
+      next_to_send = max(next_to_send, base)
+      timer = now + self.__rto.rto if base < next_to_send else None
+
+      # La ventana de congestión crece con los segmentos que dejaron de estar
+      # en vuelo. En Selective Repeat (o con SACK), un ACK que no desliza la
+      # ventana ni la amplía indica que el primer segmento en vuelo se perdió,
+      # por lo que cuenta como ACK duplicado.
+      if base > old_base:
+        self.__congestion.on_ack(base - old_base)
+      elif not window_update and self.__congestion.on_dup_ack(next_to_send - base):
+        self.__send_data_segment(seqs[base], segments[base], retransmission=True)
+        retransmitted.add(base)
+        deadlines[base] = now + self.__rto.rto
+
+      # En Selective Repeat, los segmentos cuyo timer venció cuando no cabían
+      # en la ventana se retransmiten apenas caben, sin esperar otro RTO
+      if overdue:
+        window = max(int(min(self.__window_size, self.__congestion.cwnd)), 1)
+        for j in sorted(overdue):
+          if j >= base + window:
+            break
+          overdue.discard(j)
+          if j not in acked:
+            self.__send_data_segment(seqs[j], segments[j], retransmission=True)
+            retransmitted.add(j)
+            deadlines[j] = now + self.__rto.rto
+
+    # Fijamos el número de secuencia al final del mensaje
+    self.seq = seq
+
+  def __start_transmission(self) -> None:
+    """Comienza a enviar el primer mensaje encolado, si no hay un envío en
+    curso.
+    """
+    if self.__transmission is None and self.__outgoing:
+      self.__transmission = self.__transmit(self.__outgoing[0])
+      self.__advance_transmission(None)
+
+  def __advance_transmission(self, received: tuple[memoryview, tuple[str, int]] | None) -> None:
+    """Entrega al envío en curso un datagrama recibido (con su dirección
+    de origen), o None si venció su timer. Si el envío termina comienza el
+    del siguiente mensaje encolado; si falla se descartan todos.
+
+    Parameters:
+    -----------
+    received (tuple[memoryview, tuple[str, int]] | None): Datagrama y
+        dirección de origen, o None.
+    """
+    try:
+      self.__transmission_deadline = self.__transmission.send(received)
+      return
+    except StopIteration:
+      pass
+    except Exception:
+      self.__transmission = None
+      self.__outgoing.clear()
+      self.__outgoing_bytes = 0
+      raise
+    self.__transmission = None
+    self.__outgoing_bytes -= len(self.__outgoing.popleft())
+    self.__start_transmission()
+
+  def __finish_transmissions(self) -> None:
+    """Envía los mensajes encolados, esperando a que se confirmen todos."""
+    self.__start_transmission()
+    while self.__transmission is not None:
+      try:
+        received = self.__recvfrom(self.__time_until(self.__transmission_deadline))
+      except socket.timeout:
+        received = None
+      self.__advance_transmission(received)
+
+  def __encode_message(self, msg: memoryview | FileMessage) -> tuple[bytes, Iterable[bytes | memoryview]]:
+    """Retorna el segmento con el largo de un mensaje y los trozos de datos
+    a enviar tras él. Si se negoció compresión y el mensaje tiene al menos
+    COMPRESSION_THRESHOLD bytes, se comprime en bloques independientes de
+    COMPRESSION_BLOCK_SIZE bytes a medida que se envían (ver
+    __encode_blocks). Un mensaje de un solo bloque que no se reduce se
+    envía como uno sin comprimir, al igual que uno que cabe completo en los
+    bytes que quedan sin comprimir tras varios bloques que no se redujeron.
+
+    Parameters:
+    -----------
+    msg (memoryview | FileMessage): Mensaje a enviar.
+
+    Returns:
+    --------
+    (tuple[bytes, Iterable[bytes | memoryview]]): Segmento con el largo, y
+        trozos de datos del mensaje.
+    """
+    chunks = msg.chunks() if isinstance(msg, FileMessage) else (msg,)
+    length = str(len(msg)).encode()
+    if self.__codec is None or len(msg) < self.COMPRESSION_THRESHOLD:
+      return length, chunks
+    if self.__compression_skip >= len(msg):
+      self.__compression_skip -= len(msg)
+      return length, chunks
+
+    blocks = self.__encode_blocks(split_chunks(chunks, COMPRESSION_BLOCK_SIZE))
+    if len(msg) > COMPRESSION_BLOCK_SIZE:
+      return COMPRESSED_LENGTH_PREFIX + length, blocks
+
+    # Con un solo bloque sabemos de antemano si se redujo; si no, se envía
+    # sin su header de bloque
+    block_header, block = next(blocks), next(blocks)
+    if block_header[0] != COMPRESSED_BLOCK_FLAG:
+      self.stats.compression_output_bytes -= len(block_header)
+      return length, (block,)
+    return COMPRESSED_LENGTH_PREFIX + length, (block_header, block)
+
+  def __encode_blocks(self, blocks: Iterable[memoryview]) -> Generator[bytes | memoryview, None, None]:
+    """Generador que comprime un mensaje de a un bloque por vez, entregando
+    el header de cada bloque seguido de sus datos. Los bloques que no se
+    reducen bajo COMPRESSION_MAX_RATIO van sin comprimir, y tras
+    COMPRESSION_MAX_FAILURES de ellos seguidos se dejan de comprimir los
+    siguientes COMPRESSION_BACKOFF bytes, pues comprimir no se paga.
+
+    Parameters:
+    -----------
+    blocks (Iterable[memoryview]): Bloques de a COMPRESSION_BLOCK_SIZE bytes
+                                   del mensaje, salvo el último.
+    """
+    for block in blocks:
+      self.stats.compression_input_bytes += len(block)
+      if self.__compression_skip > 0:
+        self.__compression_skip = max(self.__compression_skip - len(block), 0)
+      else:
+        compressed = self.__codec.compress(block)
+        if len(compressed) <= len(block) * self.COMPRESSION_MAX_RATIO:
+          self.__compression_failures = 0
+          self.stats.compression_output_bytes += COMPRESSED_BLOCK.size + len(compressed)
+          yield COMPRESSED_BLOCK.pack(COMPRESSED_BLOCK_FLAG, len(compressed), len(block))
+          yield compressed
+          continue
+        self.__compression_failures += 1
+        if self.__compression_failures >= self.COMPRESSION_MAX_FAILURES:
+          self.__compression_failures = 0
+          self.__compression_skip = self.COMPRESSION_BACKOFF
+      self.stats.compression_output_bytes += RAW_BLOCK.size + len(block)
+      yield RAW_BLOCK.pack(0)
+      yield block
+
+  def __send_data_segment(self, seq: int, data: memoryview, retransmission: bool = False) -> None:
+    """Envía un segmento de datos con número de secuencia seq, sin copiar
+    los datos en un nuevo buffer.
+
+    Parameters:
+    -----------
+    seq (int): Número de secuencia del segmento.
+    data (memoryview): Datos del segmento.
+    retransmission (bool): Si el segmento ya se había enviado.
+    """
+    header = self.__build_header(HeaderTCP(False, False, False, seq), data)
+    self.__sendto(self.conn_sock_addr, header, data)
+    if retransmission:
+      self.stats.retransmissions += 1
+      if self.event_hook is not None:
+        self.event_hook("retransmission", seq=seq, length=len(data))
+
+  def sendfile(self, fileobj: BinaryIO, chunk_size: int | None = None) -> int:
+    """Método encargado de enviar el contenido de un archivo, desde su
+    posición actual hasta el final, como un único mensaje cuyo largo es el
+    tamaño del archivo. Si el archivo tiene descriptor el mensaje es un
+    mmap del archivo, de modo que los segmentos se envían directamente
+    desde él sin cargarlo en memoria; si no, se lee de a trozos a medida
+    que se envían (ver FileMessage).
+
+    El otro extremo debe recibirlo con recv_to_file. Un archivo vacío se
+    envía igualmente, como un mensaje vacío que solo recv_to_file lee.
+
+    Parameters:
+    -----------
+    fileobj (BinaryIO): Archivo abierto en modo binario, que permita seek.
+    chunk_size (int | None): Tamaño máximo de cada lectura de un archivo
+                             sin descriptor. Si es None se usa
+                             FILE_CHUNK_SIZE.
+
+    Returns:
+    --------
+    (int): Cantidad de bytes enviados. Al terminar, la posición del archivo
+           queda tras el último byte enviado.
 
-  def recv(self, buff_size: int) -> Bytes:
+    Raises:
+    -------
+    ValueError: Si el socket está en modo no bloqueante.
+    BrokenPipeError: Si la conexión no admite más envíos (ver send).
+    """
+    if self.__timeout == 0.0:
+      raise ValueError("non-blocking sockets are not supported")
+    self.__check_sendable()
+    chunk_size = chunk_size or self.FILE_CHUNK_SIZE
+    start = fileobj.tell()
+    size = fileobj.seek(0, io.SEEK_END) - start
+    fileobj.seek(start)
+
+    # Un archivo vacío no se puede mapear
+    try:
+      file_map = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+      file_map = None
+
+    # Con mmap los segmentos son vistas del archivo mapeado, por lo que no
+    # se copia en memoria del proceso
+    if file_map is not None:
+      with file_map, memoryview(file_map) as file_view:
+        with file_view[start:start + size] as msg_view:
+          self.__send_message(msg_view)
+      fileobj.seek(start + size)
+      return size
+
+    self.__send_message(FileMessage(fileobj, size, chunk_size))
+    return size
+
+  def recv(self, buff_size: int) -> bytes:
     """Método encargado de recibir un mensaje dado un tamaño de buffer
-    igual a buff_size. Maneja el lado del receptor de Stop & Wait.
+    igual a buff_size. Maneja el lado del receptor de ventana deslizante:
+    en Go-Back-N descarta los segmentos fuera de orden, y en Selective
+    Repeat los guarda hasta poder entregarlos en orden.
+
+    Los segmentos en orden se guardan en el buffer de recepción de la
+    conexión, independiente de buff_size, por lo que una lectura parcial
+    nunca descarta datos ya recibidos.
 
     Parameters:
     -----------
@@ -315,193 +2625,1034 @@ class SocketTCP:
 
     Returns:
     --------
-    (Bytes): Mensaje recibido en el buffer de tamaño buff_size.
+    (bytes): Mensaje recibido en el buffer de tamaño buff_size.
     """
+    if not self.__fill_recv_buffer(buff_size):
+      return b""
 
-    # En un inicio no hemos recibido ningún byte
-    bytes_recvd = 0
+    recvd_total_msg = self.__recv_ring.read(min(buff_size, self.__message_lengths[0]))
+    self.__consume_recv_buffer(len(recvd_total_msg))
+    return recvd_total_msg
 
-    # Recibimos un mensaje
-    last_recvd_msg, transmitter_address = self.__socket.recvfrom(self.__buff_size)
+  def recv_into(self, buffer: bytearray | memoryview, nbytes: int = 0) -> int:
+    """Método análogo a recv, pero que escribe los datos recibidos
+    directamente en un buffer provisto por quien llama, en lugar de
+    crear un nuevo objeto bytes.
 
-    # Revisamos si se está intentando cerrar conexión
-    if self.parse_header(last_recvd_msg.decode()) == HeaderTCP(False, False, True, self.seq):
+    Parameters:
+    -----------
+    buffer (bytearray | memoryview): Buffer escribible donde dejar los datos.
+    nbytes (int): Cantidad máxima de bytes a recibir. Si es 0 se usa el
+                  tamaño de buffer.
 
-      # Enviamos FIN+ACK
-      fin_ack_msg = self.generate_header(
-        HeaderTCP(
-          False, True, True,
-          self.seq+1
-        )
-      )
-      self.__socket.sendto(fin_ack_msg.encode(), transmitter_address)
-
-      # Recibimos y parseamos la respuesta, y vemos si corresponde a un ACK
-      response, _ = self.__socket.recvfrom(self.__buff_size)
-      response = self.parse_header(response.decode())
-      if response == HeaderTCP(False, True, False, self.seq+2):
-
-        # Si correspondía a ACK cerramos la conexión (retornamos para mantener
-        # firma del método y para no bloquear ejecución)
-        self.__socket.close()
-        return "".encode()
-
-    # Si self.__bytes_left_to_recv es igual a 0, significa que no hemos
-    # comenzado a recibir el mensaje siendo enviado, y por ende debemos
-    # recibir primero su largo.
-    if self.__bytes_left_to_recv == 0:
-
-      # Intentamos hacer ACK mientras no tengamos certeza que el emisor
-      # recibió una respuesta.
-      recvd_msg = False
-      while not recvd_msg:
-        try:
-          
-          # Obtenemos la data que debe contener el largo
-          last_msg_data = self.get_data(last_recvd_msg.decode())
-
-          # Actualizamos los bytes recibidos y el número de secuencia
-          bytes_recvd += len(last_msg_data.encode())
-          self.seq += len(last_msg_data.encode())
-
-          # Construimos el header de la respuesta
-          tcp_msg_to_send = self.generate_header(
-            HeaderTCP(
-              False, True, False, 
-              self.seq
-            )
-          )
+    Returns:
+    --------
+    (int): Cantidad de bytes escritos en buffer. Es 0 si se cerró la conexión.
+    """
+    with memoryview(buffer) as raw_view, raw_view.cast("B") as buffer_view:
+      if nbytes <= 0 or nbytes > len(buffer_view):
+        nbytes = len(buffer_view)
 
-          # Enviamos la respuesta
-          self.__socket.sendto(tcp_msg_to_send.encode(), transmitter_address)
+      if not self.__fill_recv_buffer(nbytes):
+        return 0
 
-          # Recibimos y parseamos la respuesta
-          last_recvd_msg, transmitter_address = self.__socket.recvfrom(self.__buff_size)
-          last_recvd_msg_header = self.parse_header(last_recvd_msg.decode())
+      nbytes = self.__recv_ring.read_into(buffer_view, min(nbytes, self.__message_lengths[0]))
 
-          # Si el header de la respuesta no corresponde a 
-          # 0|||0|||0|||seq+bytes_recvd|||, levantamos un error
-          if last_recvd_msg_header != HeaderTCP(False, False, False, self.seq):
-            raise wrongResponseReceiverException()
+    self.__consume_recv_buffer(nbytes)
+    return nbytes
 
-        # Si recibimos una respuesta erronea disminuimos los bytes 
-        # recibidos al valor anterior, y lo mismo respecto al numero de secuencia
-        except wrongResponseReceiverException:
-          bytes_recvd -= len(last_msg_data.encode())
-          self.seq -= len(last_msg_data.encode())
+  def recv_to_file(self, fileobj: BinaryIO, chunk_size: int | None = None) -> int:
+    """Método encargado de recibir un archivo enviado con sendfile y
+    escribirlo en fileobj a medida que llega, de a lo más chunk_size bytes,
+    por lo que el uso de memoria no depende del tamaño del archivo.
 
-        # De lo contrario, si se recibió la respuesta esperada, asignamos
-        # self.__bytes_left_to_recv a int(msg_data), que es el largo en bytes
-        # del mensaje a recibir, y cambiamos recvd_msg a True.
-        else:
-          self.__bytes_left_to_recv = int(last_msg_data)
-          recvd_msg = True
-          print(f'========= TOTAL LENGTH OF MSG: {self.__bytes_left_to_recv} ==========')
+    Parameters:
+    -----------
+    fileobj (BinaryIO): Archivo abierto en modo binario donde escribir.
+    chunk_size (int | None): Tamaño del buffer de escritura. Si es None se
+                             usa FILE_CHUNK_SIZE.
 
-    # Definimos mensaje recibido
-    recvd_total_msg = ""
+    Returns:
+    --------
+    (int): Cantidad de bytes recibidos y escritos en fileobj.
 
-    # Definimos el largo en bytes del largo del mensaje
-    bytes_msg_len = bytes_recvd
+    Raises:
+    -------
+    ConnectionError: Si la conexión se cierra antes de recibir el archivo
+                     completo.
+    ValueError: Si el socket está en modo no bloqueante.
+    """
+    if self.__timeout == 0.0:
+      raise ValueError("non-blocking sockets are not supported")
+    chunk_size = chunk_size or self.FILE_CHUNK_SIZE
+
+    # El archivo llega como un único mensaje, cuyo largo es su tamaño
+    if not self.__fill_recv_buffer(1, empty_messages=True):
+      raise ConnectionError("Connection closed before receiving the file")
+    size = self.__message_lengths[0]
+    if size == 0:
+      self.__consume_recv_buffer(0)
+      return 0
+
+    chunk_buffer = bytearray(chunk_size)
+    with memoryview(chunk_buffer) as chunk_view:
+      received = 0
+      while received < size:
+        nbytes = self.recv_into(chunk_view, min(chunk_size, size - received))
+        if not nbytes:
+          raise ConnectionError(f"Connection closed after receiving {received} of {size} bytes")
+        fileobj.write(chunk_view[:nbytes])
+        received += nbytes
+    return size
+
+  def __fill_recv_buffer(self, buff_size: int, empty_messages: bool = False) -> bool:
+    """Método encargado de recibir segmentos hasta que el buffer de
+    recepción contenga buff_size bytes del mensaje que lee la aplicación,
+    hasta que contenga el resto de dicho mensaje, o hasta que se llene
+    (si buff_size es mayor que el buffer de recepción). Si el otro extremo
+    cerró la conexión con close se responde su cierre (ver __answer_fin).
+
+    Antes de retornar se procesan también los segmentos que ya llegaron al
+    socket (sin esperar por más), y se envía el ACK retrasado pendiente,
+    pues fuera de recv nadie atiende el socket.
+
+    En modo no bloqueante (ver setblocking) se procesa lo que ya llegó, y
+    basta con cualquier dato del mensaje que lee la aplicación.
 
-    # Acá, o recibimos en esta llamada el largo del mensaje a recibir, o
-    # lo recibimos en una llamada anterior, en ambos casos seguimos recibiendo
-    # mientras no hayamos recibido buff_size bytes o self.__bytes_left_to_recv == 0.
-    while True:
+    Parameters:
+    -----------
+    buff_size (int): Cantidad de bytes que se quiere tener disponibles.
+    empty_messages (bool): Si es True un mensaje vacío cuenta como uno con
+                           datos que retornar; si no, se descarta, pues
+                           recv lo confundiría con el fin de la conexión.
 
+    Returns:
+    --------
+    (bool): False si el otro extremo ya no enviará más datos (porque cerró
+            la conexión o hizo shutdown) y ya se leyó todo, True en otro caso.
+
+    Raises:
+    -------
+    BlockingIOError: En modo no bloqueante, si no hay datos que retornar.
+    """
+    # El otro extremo responde tras recibir nuestros mensajes, por lo que
+    # primero terminamos de enviar los encolados en modo no bloqueante
+    nonblocking = self.__timeout == 0.0
+    if self.__transmission is not None and not nonblocking:
+      self.__finish_transmissions()
+
+    polled = False
+    while True:
+      if not empty_messages:
+        while self.__message_lengths and self.__message_lengths[0] == 0:
+          self.__message_lengths.popleft()
+
+      # Si ya tenemos buff_size bytes, o el resto del mensaje, hay datos
+      # que retornar. También si el buffer de recepción se llenó, pues no
+      # llegará nada más hasta que la aplicación lea.
+      available = len(self.__recv_ring)
+      if self.__message_lengths and (
+        available >= min(buff_size, self.__message_lengths[0]) or
+        (available > 0 and (nonblocking or self.__recv_ring.free < self.__mss))
+      ):
+        self.__drain_socket()
+        self.__flush_ack()
+        return True
+
+      # Si el otro extremo no enviará más datos y ya leímos todo, retornamos.
+      # Si cerró la conexión con close además respondemos su cierre; si hizo
+      # shutdown, aún podemos enviarle datos hasta que cerremos.
+      if self.__detached or self.__state not in (self.ESTABLISHED, self.FIN_WAIT):
+        if self.__state == self.CLOSE_WAIT and not self.__peer_half_closed:
+          self.__answer_fin()
+        return False
+
+      # En modo no bloqueante procesamos lo que ya llegó, sin esperar más
+      if nonblocking:
+        if polled:
+          raise BlockingIOError(errno.EAGAIN, "No data available")
+        self.process_events()
+        polled = True
+        continue
+
+      # Recibimos un mensaje, esperando a lo más hasta que venza el timer del
+      # ACK retrasado
+      timeout = self.__timeout
+      if self.__ack_deadline is not None:
+        ack_timeout = self.__time_until(self.__ack_deadline)
+        timeout = ack_timeout if timeout is None else min(timeout, ack_timeout)
       try:
-        
-        # Si el numero de secuencia recibido es menor al guardado, estamos
-        # recibiendo un trozo duplicado, por lo que hay que reenviar el ACK (se perdió).
-        if self.parse_header(last_recvd_msg.decode()).seq < self.seq:
-          last_msg_data = ""
+        last_recvd_msg, transmitter_address = self.__recvfrom(timeout)
+      except socket.timeout:
+        if self.__ack_deadline is None or self.__backend.monotonic() < self.__ack_deadline:
+          raise
+        self.__flush_ack()
+        continue
+      self.__process_received(last_recvd_msg, transmitter_address)
+
+  def __answer_fin(self) -> None:
+    """Método encargado de implementar el cierre de conexión desde el lado
+    del Host B, en CLOSE_WAIT: responde FIN+ACK y pasa a LAST_ACK, cuyas
+    retransmisiones hasta recibir el ACK final se atienden sin bloquear a
+    la aplicación (ver __hand_off).
+    """
+    fin_ack_msg = self.__build_segment(
+      HeaderTCP(
+        False, True, True,
+        self.seq
+      )
+    )
+    self.__sendto(self.conn_sock_addr, fin_ack_msg)
+    self.__hand_off(
+      self.LAST_ACK, self.seq, fin_ack_msg, self.__backend.monotonic() + self.__rto.rto
+    )
+
+  def __receive_fin(self, seq: int, data: bytes | memoryview) -> None:
+    """Registra el FIN del otro extremo, recibido tras todos sus datos: la
+    conexión pasa a CLOSE_WAIT, y el FIN ocupa un número de secuencia. El
+    FIN de shutdown se confirma de inmediato, pues el otro extremo aún
+    recibe; el de close se responde con FIN+ACK una vez que la aplicación
+    lee todo lo recibido.
+
+    Parameters:
+    -----------
+    seq (int): Número de secuencia del FIN.
+    data (bytes | memoryview): Datos del FIN.
+    """
+    self.__state = self.CLOSE_WAIT
+    self.__peer_fin_seq = seq
+    self.__peer_half_closed = bytes(data) == HALF_CLOSE_FLAG
+    self.seq = seq_add(seq, 1)
+    if self.__peer_half_closed:
+      self.__sendto(self.conn_sock_addr, self.__build_segment(HeaderTCP(False, True, False, self.seq)))
+
+  def __enter_time_wait(self, peer_fin_seq: int) -> None:
+    """Confirma el FIN+ACK del otro extremo con el ACK final y pasa a
+    TIME_WAIT, donde se reenvía dicho ACK si el FIN+ACK se retransmite (ver
+    __hand_off).
 
-        
+    Parameters:
+    -----------
+    peer_fin_seq (int): Número de secuencia del FIN+ACK.
+    """
+    ack_msg = self.__build_segment(HeaderTCP(False, True, False, seq_add(peer_fin_seq, 1)))
+    self.__sendto(self.conn_sock_addr, ack_msg)
+    self.__hand_off(self.TIME_WAIT, peer_fin_seq, ack_msg, self.__time_wait_deadline(self.__rto))
+
+  def __time_wait_deadline(self, rto: RTOEstimator) -> float:
+    """Retorna el momento en que termina un TIME_WAIT que comienza ahora:
+    TIME_WAIT_RTOS veces el RTO de la conexión, entre MIN_TIME_WAIT y
+    MAX_TIME_WAIT segundos.
+    """
+    duration = min(max(self.TIME_WAIT_RTOS * rto.rto, self.MIN_TIME_WAIT), self.MAX_TIME_WAIT)
+    return self.__backend.monotonic() + duration
+
+  def __drain_socket(self) -> None:
+    """Procesa los datagramas que ya esperan en el socket, sin bloquear,
+    para que sus datos queden en el buffer de recepción y se confirmen
+    aunque la aplicación tarde en volver a llamar a recv. Los ACKs que
+    esto genere se envían juntos, donde se soporta el envío en lote. Si la
+    conexión entrega su cierre (ver __hand_off) deja de atender el socket.
+    Mientras hay un envío en curso (en modo no bloqueante) los datagramas
+    son suyos.
+    """
+    self.__start_batch()
+    try:
+      while not self.__detached and self.__state in (self.ESTABLISHED, self.FIN_WAIT, self.CLOSE_WAIT):
+        received = self.__poll_datagram()
+        if received is None:
+          return
+        if self.__transmission is not None:
+          self.__advance_transmission(received)
         else:
-          # obtenemos la data del ultimo mensaje
-          last_msg_data = self.get_data(last_recvd_msg.decode())
-
-          # Actualizamos los bytes recibidos, por recibir y el número de secuencia
-          bytes_recvd += len(last_msg_data.encode())
-          self.seq += len(last_msg_data.encode())
-          self.__bytes_left_to_recv -= len(last_msg_data.encode())
-
-        # Construimos el header de la respuesta
-        tcp_msg_to_send = self.generate_header(
-          HeaderTCP(
-            False, True, False, 
-            self.seq
-          )
+          self.__process_received(*received)
+    finally:
+      self.__flush_batch()
+
+      # Mientras recv tenga algo que retornar (datos, o el cierre del otro
+      # extremo) el aviso de fileno debe seguir activo
+      if self.__notifier is not None and (
+        self.pending() or self.__state not in (self.ESTABLISHED, self.FIN_WAIT)
+      ):
+        self.__notifier.notify()
+
+  def __poll_datagram(self) -> tuple[memoryview, tuple[str, int]] | None:
+    """Recibe, sin esperar, un datagrama que ya llegó a la conexión. Si no
+    hay ninguno se limpia el aviso de fileno antes de volver a revisar, de
+    modo que uno que llegue después vuelva a avisar.
+
+    Returns:
+    --------
+    (tuple[memoryview, tuple[str, int]] | None): Datagrama recibido y su
+        dirección de origen (ver __recvfrom), o None si no hay ninguno.
+    """
+    try:
+      return self.__recvfrom(0.0)
+    except (socket.timeout, BlockingIOError):
+      if self.__notifier is None:
+        return None
+    self.__notifier.clear()
+    try:
+      return self.__recvfrom(0.0)
+    except (socket.timeout, BlockingIOError):
+      return None
+
+  def __process_received(self, datagram: memoryview, address: tuple[str, int]) -> None:
+    """Método encargado de procesar un datagrama recibido por el receptor.
+
+    Parameters:
+    -----------
+    datagram (memoryview): Datagrama recibido.
+    address (tuple[str, int]): Dirección desde donde llegó.
+    """
+    try:
+      last_recvd_msg_header, last_recvd_msg_data = self.parse_segment(datagram)
+    except (struct.error, ValueError, IndexError):
+      return
+
+    # Revisamos si se está intentando cerrar conexión. El cierre se atiende
+    # una vez que la aplicación leyó todo lo recibido.
+    if last_recvd_msg_header.fin and not last_recvd_msg_header.syn:
+      self.__process_fin(last_recvd_msg_header, last_recvd_msg_data)
+      return
+
+    # Si el servidor retransmitió su SYN+ACK, nuestro ACK del handshake
+    # se perdió y hay que reenviarlo
+    if last_recvd_msg_header.syn and last_recvd_msg_header.ack and self.__handshake_ack is not None:
+      self.__sendto(address, self.__handshake_ack)
+      return
+
+    # Ignoramos todo lo que no sea un segmento de datos
+    if last_recvd_msg_header.syn or last_recvd_msg_header.ack or last_recvd_msg_header.fin:
+      return
+
+    self.__process_data_segment(last_recvd_msg_header.seq, last_recvd_msg_data, address)
+
+  def __process_fin(self, header: HeaderTCP, data: bytes | memoryview) -> None:
+    """Procesa un FIN o FIN+ACK recibido fuera de close y shutdown, según
+    el estado de la conexión (ver state).
+
+    Parameters:
+    -----------
+    header (HeaderTCP): Header del segmento.
+    data (bytes | memoryview): Datos del segmento.
+    """
+    if not header.ack:
+      # FIN del otro extremo, una vez recibido todo lo anterior
+      if header.seq == self.seq and self.__state == self.ESTABLISHED:
+        self.__receive_fin(header.seq, data)
+
+      # Retransmisión de un FIN de shutdown, cuyo ACK se perdió
+      elif header.seq == self.__peer_fin_seq and self.__peer_half_closed:
+        self.__sendto(
+          self.conn_sock_addr,
+          self.__build_segment(HeaderTCP(False, True, False, seq_add(header.seq, 1)))
         )
 
-        # Si con este mensaje nos pasamos del tamaño del buffer, no respondemos ACK
-        if bytes_recvd > buff_size + bytes_msg_len:
-          self.seq -= len(last_msg_data.encode())
-          print(f'========= LENGTH LEFT TO RCV : {self.__bytes_left_to_recv} ==========')
-          return recvd_total_msg.encode()
-
-        # Si llegamos justo al tamaño del buffer o se acaba el mensaje, respondemos ACK
-        elif self.__bytes_left_to_recv == 0 or bytes_recvd == buff_size + bytes_msg_len:
-          # Enviamos la respuesta
-          self.__socket.sendto(tcp_msg_to_send.encode(), transmitter_address)
-          recvd_total_msg += last_msg_data
-          print(f'========= LENGTH LEFT TO RCV : {self.__bytes_left_to_recv} ==========')
-          return recvd_total_msg.encode()
-
-        # Si no se cumplen las dos condiciones anteriores, también enviamos el mensaje
-        self.__socket.sendto(tcp_msg_to_send.encode(), transmitter_address)
-
-        # Recibimos y parseamos lo que nos responden
-        last_recvd_msg, transmitter_address = self.__socket.recvfrom(self.__buff_size)
-        last_recvd_msg_header = self.parse_header(last_recvd_msg.decode())
-
-        # Si el header de la respuesta no corresponde a 
-        # 0|||0|||0|||seq+bytes_recvd|||, levantamos un error generico
-        if last_recvd_msg_header != HeaderTCP(False, False, False, self.seq):
-          raise wrongResponseReceiverException()
-      
-      # Si recibimos una respuesta erronea volvemos a los valores anteriores de
-      # bytes_recv, self.__bytes_left_to_recv y self.seq 
-      except wrongResponseReceiverException:
-        bytes_recvd -= len(last_msg_data.encode())
-        self.seq -= len(last_msg_data.encode())
-        self.__bytes_left_to_recv += len(last_msg_data.encode())
-
-      # De lo contrario, si se recibió la respuesta esperada, agregamos la
-      # sección recibida al mensaje total.
+    # FIN+ACK con que el otro extremo cierra tras nuestro shutdown
+    elif header.seq == self.seq and self.__state == self.FIN_WAIT:
+      self.__enter_time_wait(header.seq)
+
+  def __consume_recv_buffer(self, nbytes: int) -> None:
+    """Registra que la aplicación leyó nbytes del mensaje actual. Si el
+    espacio libre del buffer de recepción había quedado bajo un MSS y ahora
+    alcanza para un segmento completo, se anuncia la nueva ventana al
+    emisor, que puede estar detenido esperándola.
+
+    Parameters:
+    -----------
+    nbytes (int): Cantidad de bytes entregados.
+    """
+    self.__message_lengths[0] -= nbytes
+    logger.debug("Length left to read: %d", self.__message_lengths[0])
+    if self.__message_lengths[0] == 0:
+      self.__message_lengths.popleft()
+
+    # Los datos descomprimidos que no cabían pasan al espacio liberado
+    if self.__recv_backlog:
+      moved = min(len(self.__recv_backlog), self.__recv_ring.free)
+      self.__recv_ring.write(memoryview(self.__recv_backlog)[:moved])
+      del self.__recv_backlog[:moved]
+
+    if self.__binary_header and self.__advertised_window < self.__mss <= self.__recv_window():
+      self.__flush_ack(force=True, address=self.conn_sock_addr)
+
+  def __recv_window(self) -> int:
+    """Retorna la ventana de recepción: el espacio libre del buffer de
+    recepción, o 0 mientras haya datos descomprimidos que aún no caben en
+    él.
+    """
+    return 0 if self.__recv_backlog else self.__recv_ring.free
+
+  def __fits_in_window(self, seq: int, length: int) -> bool:
+    """Retorna si un segmento cae dentro de la ventana de recepción, es
+    decir, si sus datos caben en el espacio libre del buffer de recepción
+    una vez recibido todo lo anterior a él.
+    """
+    return seq_diff(seq, self.seq) + length <= self.__recv_window()
+
+  def __process_data_segment(self, seq: int, data: memoryview, address: tuple[str, int]) -> None:
+    """Método encargado de procesar un segmento de datos recibido y
+    responder el ACK correspondiente según el modo del socket.
+
+    Parameters:
+    -----------
+    seq (int): Número de secuencia del segmento.
+    data (memoryview): Datos del segmento. Solo son válidos hasta la
+                       siguiente recepción, por lo que se copian si
+                       deben guardarse.
+    address (tuple[str, int]): Dirección desde donde llegó el segmento.
+    """
+    # Contamos los segmentos duplicados (salvo las sondas de keep-alive, que
+    # van vacías) y los que llegan fuera de orden
+    if (seq_diff(seq, self.seq) < 0 and data) or seq in self.__out_of_order:
+      self.stats.duplicate_segments += 1
+      if self.event_hook is not None:
+        self.event_hook("duplicate", seq=seq, length=len(data))
+    elif seq_diff(seq, self.seq) > 0:
+      self.stats.out_of_order_segments += 1
+      if self.event_hook is not None:
+        self.event_hook("out_of_order", seq=seq, expected=self.seq)
+
+    # Con ACKs acumulativos los segmentos en orden se confirman de a varios
+    if self.__sack:
+      self.__process_data_segment_sack(seq, data, address)
+      return
+
+    # Número de secuencia del ACK particular de este segmento
+    segment_ack = seq_add(seq, len(data))
+
+    # Si el numero de secuencia recibido es menor al guardado, estamos
+    # recibiendo un trozo duplicado, por lo que hay que reenviar el ACK (se perdió).
+    if seq_diff(seq, self.seq) < 0:
+      ack_seq = self.seq if self.__mode == self.GO_BACK_N else segment_ack
+
+    # Si el segmento es el esperado (y cabe en el buffer de recepción) lo
+    # entregamos junto a los que teníamos guardados y que le siguen.
+    elif seq == self.seq and self.__fits_in_window(seq, len(data)):
+      self.__deliver(data)
+      self.__deliver_out_of_order()
+      ack_seq = self.seq if self.__mode == self.GO_BACK_N else segment_ack
+
+    # En Go-Back-N los segmentos fuera de orden se descartan, al igual que
+    # en ambos modos el esperado si no cabe en el buffer de recepción,
+    # confirmando nuevamente lo último recibido en orden (con la ventana
+    # actual, lo que responde a las sondas del emisor).
+    elif self.__mode == self.GO_BACK_N or seq == self.seq:
+      ack_seq = self.seq
+
+    # En Selective Repeat los guardamos mientras quepan en la ventana
+    elif seq_diff(seq, self.seq) > 0 and self.__fits_in_window(seq, len(data)) and (
+      seq in self.__out_of_order or len(self.__out_of_order) < self.__window_size
+    ):
+      self.__out_of_order[seq] = bytes(data)
+      ack_seq = segment_ack
+
+    # Si no caben no respondemos
+    else:
+      return
+
+    tcp_msg_to_send = self.__build_segment(HeaderTCP(False, True, False, ack_seq))
+    self.__sendto(address, tcp_msg_to_send)
+
+  def __process_data_segment_sack(self, seq: int, data: memoryview, address: tuple[str, int]) -> None:
+    """Variante de __process_data_segment con ACKs acumulativos retrasados
+    y bloques SACK. Los segmentos en orden se confirman cada ACK_EVERY
+    segmentos o al vencer el timer del ACK retrasado; los duplicados, los
+    fuera de orden, los que no caben en la ventana y el primero en orden
+    tras un hueco se confirman de inmediato, para que el emisor detecte y
+    repare pronto las pérdidas.
+
+    Parameters:
+    -----------
+    seq (int): Número de secuencia del segmento.
+    data (memoryview): Datos del segmento (válidos hasta la siguiente recepción).
+    address (tuple[str, int]): Dirección desde donde llegó el segmento.
+    """
+    if seq == self.seq and self.__fits_in_window(seq, len(data)):
+      filled_gap = self.__gap_seen or bool(self.__out_of_order)
+      self.__gap_seen = False
+      self.__deliver(data)
+      self.__deliver_out_of_order()
+      self.__unacked_segments += 1
+      self.__ack_address = address
+      if filled_gap or self.__unacked_segments >= self.ACK_EVERY:
+        self.__flush_ack()
+      elif self.__ack_deadline is None:
+        self.__ack_deadline = self.__backend.monotonic() + self.DELAYED_ACK_TIMEOUT
+      return
+
+    # En Selective Repeat guardamos los segmentos fuera de orden que quepan
+    # en la ventana, y en Go-Back-N los descartamos
+    if seq_diff(seq, self.seq) > 0 and self.__mode == self.SELECTIVE_REPEAT and self.__fits_in_window(seq, len(data)) and (
+      seq in self.__out_of_order or len(self.__out_of_order) < self.__window_size
+    ):
+      self.__out_of_order[seq] = bytes(data)
+
+    if seq_diff(seq, self.seq) > 0:
+      self.__gap_seen = True
+    self.__ack_address = address
+    self.__flush_ack(force=True)
+
+  def __flush_ack(self, force: bool = False, address: tuple[str, int] | None = None) -> None:
+    """Envía un ACK acumulativo por lo recibido en orden (con los bloques
+    SACK de los segmentos guardados fuera de orden, si se negoció SACK) si
+    hay segmentos sin confirmar o si force.
+
+    Parameters:
+    -----------
+    force (bool): Enviar el ACK aunque no haya segmentos sin confirmar.
+    address (tuple[str, int] | None): Dirección de destino. Por defecto la
+                                      del último segmento recibido.
+    """
+    if not force and self.__unacked_segments == 0:
+      return
+    self.__unacked_segments = 0
+    self.__ack_deadline = None
+
+    # Bloques de segmentos contiguos guardados fuera de orden
+    blocks = []
+    for start in sorted(self.__out_of_order, key=lambda start: seq_diff(start, self.seq)):
+      end = seq_add(start, len(self.__out_of_order[start]))
+      if blocks and blocks[-1][1] == start:
+        blocks[-1] = (blocks[-1][0], end)
       else:
-        recvd_total_msg += last_msg_data
+        blocks.append((start, end))
+
+    ack = self.__build_segment(
+      HeaderTCP(False, True, False, self.seq),
+      encode_sack(blocks[:self.MAX_SACK_BLOCKS]) if self.__sack else b""
+    )
+    self.__sendto(address or self.__ack_address, ack)
+
+  def __deliver(self, data: bytes | memoryview) -> None:
+    """Método encargado de entregar en orden los datos de un segmento,
+    ya sea como el largo del próximo mensaje o como parte del mensaje
+    que se está recibiendo.
+
+    Parameters:
+    -----------
+    data (bytes | memoryview): Datos del segmento a entregar.
+    """
+    self.seq = seq_add(self.seq, len(data))
+
+    # El primer segmento de cada mensaje corresponde a su largo, e indica
+    # si el mensaje viene comprimido
+    if self.__expecting_length:
+      length = bytes(data)
+      self.__compressed_message = (
+        self.__codec is not None and length.startswith(COMPRESSED_LENGTH_PREFIX)
+      )
+      if self.__compressed_message:
+        length = length[len(COMPRESSED_LENGTH_PREFIX):]
+      if not length.isdigit():
+        self.__abort("Malformed message length")
+      self.__bytes_left_to_recv = int(length)
+      self.__expecting_length = self.__bytes_left_to_recv == 0
+      self.__message_lengths.append(self.__bytes_left_to_recv)
+      logger.debug("Total length of message: %d", self.__bytes_left_to_recv)
+    elif self.__compressed_message:
+      self.__inflate(data)
+    else:
+      self.__recv_ring.write(data)
+      self.__bytes_left_to_recv -= len(data)
+      self.__expecting_length = self.__bytes_left_to_recv == 0
+
+  def __inflate(self, data: bytes | memoryview) -> None:
+    """Método encargado de entregar los datos de un segmento de un mensaje
+    comprimido: los acumula hasta completar cada bloque, y deja sus datos
+    originales en el buffer de recepción. Lo que no cabe en este (un bloque
+    puede ocupar mucho más descomprimido que en la ventana) espera en
+    recv_backlog a que la aplicación lea.
+
+    Parameters:
+    -----------
+    data (bytes | memoryview): Datos del segmento a entregar.
+
+    Raises:
+    -------
+    ConnectionError: Si un bloque está corrupto o no corresponde al
+                     mensaje, en cuyo caso se cierra la conexión.
+    """
+    self.__block_buffer += data
+    while self.__block_buffer:
+      # Todo bloque salvo el último ocupa COMPRESSION_BLOCK_SIZE bytes
+      # originales, por lo que los sin comprimir no indican su largo
+      size = min(COMPRESSION_BLOCK_SIZE, self.__bytes_left_to_recv)
+      compressed = self.__block_buffer[0] & COMPRESSED_BLOCK_FLAG
+      if compressed:
+        if len(self.__block_buffer) < COMPRESSED_BLOCK.size:
+          return
+        _, length, original_size = COMPRESSED_BLOCK.unpack_from(self.__block_buffer)
+        if original_size != size:
+          self.__abort("Compressed block does not match the message length")
+        start = COMPRESSED_BLOCK.size
+      else:
+        length = size
+        start = RAW_BLOCK.size
+      end = start + length
+      if len(self.__block_buffer) < end:
+        return
+
+      with memoryview(self.__block_buffer) as block_view:
+        block = block_view[start:end]
+        if compressed:
+          try:
+            block = self.__codec.decompress(block, size)
+          except ValueError as err:
+            del block
+            self.__abort(str(err))
+        fits = 0 if self.__recv_backlog else min(size, self.__recv_ring.free)
+        self.__recv_ring.write(block[:fits])
+        self.__recv_backlog += block[fits:]
+        del block
+      del self.__block_buffer[:end]
+
+      self.__bytes_left_to_recv -= size
+      self.__expecting_length = self.__bytes_left_to_recv == 0
+
+  def __deliver_out_of_order(self) -> None:
+    """Método encargado de entregar los segmentos guardados fuera de
+    orden que ya son contiguos a lo recibido.
+    """
+    while self.seq in self.__out_of_order:
+      self.__deliver(self.__out_of_order.pop(self.seq))
+
+  def __sendto(self, address: tuple[str, int], *parts: bytes | memoryview) -> None:
+    """Envía un datagrama formado por la concatenación de parts. Si el
+    sistema lo permite se usa sendmsg, de modo que las partes (header y
+    datos) no se copian a un buffer intermedio.
+
+    Parameters:
+    -----------
+    address (tuple[str, int]): Dirección de destino.
+    parts (bytes | memoryview): Partes del datagrama.
+    """
+    # Entre __start_batch y __flush_batch los datagramas se encolan, y sus
+    # partes deben seguir siendo válidas hasta entonces
+    if self.__send_queue is not None:
+      self.__send_queue.append((address, parts))
+      nbytes = sum(len(part) for part in parts)
+    else:
+      nbytes = self.__send_parts(address, parts)
+    self.stats.segments_sent += 1
+    self.stats.bytes_sent += nbytes
+    if self.capture is not None:
+      self.capture.record(True, self.__local_address(), address, *parts)
+    if self.event_hook is not None:
+      self.event_hook("datagram_sent", address=address, size=nbytes)
+
+  def __send_parts(self, address: tuple[str, int], parts: tuple[bytes | memoryview, ...]) -> int:
+    """Envía de inmediato un datagrama formado por la concatenación de
+    parts, y retorna su largo. Ver __sendto.
+    """
+    if len(parts) == 1:
+      return self.__socket.sendto(parts[0], address)
+    if hasattr(self.__socket, "sendmsg"):
+      return self.__socket.sendmsg(parts, (), 0, address)
+    return self.__socket.sendto(b"".join(parts), address)
+
+  def __start_batch(self) -> None:
+    """Comienza a encolar los datagramas enviados, para enviarlos juntos en
+    __flush_batch. No tiene efecto si no se soporta el envío en lote, o si
+    ya se están encolando.
+    """
+    if self.__send_queue is None and self.IO_BATCH_SIZE > 1 and self.__backend.batch_io:
+      self.__send_queue = []
+
+  def __flush_batch(self) -> None:
+    """Envía los datagramas encolados desde __start_batch, de a
+    IO_BATCH_SIZE por llamada al sistema, y deja de encolarlos. Los que no
+    se pueden enviar en lote (por ejemplo, si el buffer del socket se
+    llenó) se envían de a uno.
+    """
+    send_queue, self.__send_queue = self.__send_queue, None
+    if not send_queue:
+      return
+    sent = 0
+    if len(send_queue) > 1:
+      if self.__batch_io is None:
+        self.__batch_io = BatchDatagramIO(self.IO_BATCH_SIZE)
+      while sent < len(send_queue):
+        batch = send_queue[sent:sent + self.IO_BATCH_SIZE]
+        batch_sent = self.__batch_io.send(self.__socket, batch, self.__buff_size)
+        sent += batch_sent
+        if batch_sent < len(batch):
+          break
+    for address, parts in send_queue[sent:]:
+      self.__send_parts(address, parts)
+
+  def __recvfrom(self, timeout: float | None) -> tuple[memoryview, tuple[str, int]]:
+    """Recibe un datagrama en el buffer de recepción reutilizable del
+    socket.
+
+    Parameters:
+    -----------
+    timeout (float | None): Tiempo máximo de espera en segundos. None
+                            bloquea sin límite.
+
+    Returns:
+    --------
+    (tuple[memoryview, tuple[str, int]]): Vista del datagrama recibido,
+        válida solo hasta la siguiente recepción, y dirección de origen.
+
+    Raises:
+    -------
+    socket.timeout: Si no llega nada antes de timeout.
+    """
+    deadline = self.__backend.monotonic() + timeout if timeout else None
+    while True:
+
+      # Una conexión creada por un socket que escucha, o que tiene streams,
+      # recibe desde su cola
+      blocked_since = self.__backend.monotonic()
+      try:
+        if self.__inbox is not None:
+          try:
+            datagram, address = self.__inbox.get(timeout=timeout)
+          except queue.Empty:
+            raise socket.timeout("timed out") from None
+          datagram = memoryview(datagram)
+        else:
+          datagram, address = self.__recvfrom_socket(timeout)
+      finally:
+        self.stats.recv_blocked_time += self.__backend.monotonic() - blocked_since
+
+      self.stats.segments_received += 1
+      self.stats.bytes_received += len(datagram)
+      if self.capture is not None and self.__inbox is None:
+        self.capture.record(False, self.__local_address(), address, datagram)
+      if self.event_hook is not None:
+        self.event_hook("datagram_received", address=address, size=len(datagram))
+
+      # Los segmentos corruptos se descartan como si se hubieran perdido, y
+      # el emisor los retransmite. Un socket que escucha deja la revisión a
+      # la conexión a la que entrega cada datagrama.
+      if self.__connections is not None or self.verify_checksum(datagram, self.__checksum):
+        return datagram, address
+      self.stats.corrupted_segments += 1
+      if self.event_hook is not None:
+        self.event_hook("corrupted", address=address, size=len(datagram))
+      if deadline is not None:
+        timeout = self.__time_until(deadline)
+
+  def __local_address(self) -> tuple[str, int]:
+    """Retorna la dirección del socket udp para la captura. Un socket sin
+    bind recibe su puerto con el primer envío, por lo que solo entonces
+    se guarda.
+    """
+    if self.__capture_address is None:
+      address = self.__socket.getsockname()
+      if address[1] == 0:
+        return address
+      self.__capture_address = address
+    return self.__capture_address
+
+  def __recvfrom_socket(self, timeout: float | None) -> tuple[memoryview, tuple[str, int]]:
+    """Recibe un datagrama directamente desde el socket udp subyacente, en
+    el buffer de recepción reutilizable. Ver __recvfrom.
+
+    Donde se soporta, se recibe en lote: una sola llamada al sistema espera
+    el próximo datagrama y recibe junto a él los que ya esperan en el
+    socket, que se entregan de a uno en las llamadas siguientes.
+    """
+    if self.__pending_datagrams:
+      return self.__pending_datagrams.popleft()
+    if self.IO_BATCH_SIZE > 1 and self.__backend.batch_io:
+      if self.__batch_io is None:
+        self.__batch_io = BatchDatagramIO(self.IO_BATCH_SIZE)
+
+      # Sin timeout el socket udp debe ser bloqueante, para que la recepción
+      # en lote espere sin otra llamada al sistema (ver BatchDatagramIO.recv)
+      if timeout is None and self.__socket_timeout is not None:
+        self.__socket.settimeout(None)
+        self.__socket_timeout = None
+      batch = self.__batch_io.recv(self.__socket, self.__buff_size, timeout)
+      if not batch:
+        raise BlockingIOError(errno.EAGAIN, "No datagrams available")
+      self.__pending_datagrams.extend(batch[1:])
+      return batch[0]
+
+    # Solo cambiamos el timeout del socket udp subyacente si es distinto
+    if timeout != self.__socket_timeout:
+      self.__socket.settimeout(timeout)
+      self.__socket_timeout = timeout
+    nbytes, address = self.__socket.recvfrom_into(self.__datagram_buffer)
+    return self.__datagram_view[:nbytes], address
+
+  def __add_rtt_sample(self, rtt: float) -> None:
+    """Registra una muestra de RTT en el estimador del RTO y en las
+    métricas de la conexión.
+    """
+    self.__rto.add_sample(rtt)
+    self.stats.rtt_samples.append(rtt)
+    if self.event_hook is not None:
+      self.event_hook("rtt_sample", rtt=rtt, rto=self.__rto.rto)
+
+  def __handshake_done(self, duration: float) -> None:
+    """Registra la duración del handshake de la conexión."""
+    self.stats.handshake_duration = duration
+    if self.event_hook is not None:
+      self.event_hook("handshake", duration=duration, mss=self.__mss, sack=self.__sack)
+
+  def __time_until(self, deadline: float) -> float:
+    """Retorna el tiempo en segundos que falta para deadline (según el
+    reloj del backend), con un mínimo de un milisegundo.
+    """
+    return max(deadline - self.__backend.monotonic(), 0.001)
+
+  def __send_and_wait(
+    self, segment: bytes, address: tuple[str, int],
+    is_response: Callable[[HeaderTCP, memoryview, tuple[str, int]], bool],
+    max_retransmissions: int | None = None
+  ) -> tuple[memoryview, HeaderTCP, tuple[str, int]] | None:
+    """Envía un segmento de control y lo retransmite cada vez que vence el
+    RTO (duplicándolo en cada ocasión), hasta recibir una respuesta que
+    cumpla is_response. Solo se toma una muestra de RTT si el segmento no
+    fue retransmitido (algoritmo de Karn).
+
+    Parameters:
+    -----------
+    segment (bytes): Segmento a enviar.
+    address (tuple[str, int]): Dirección de destino.
+    is_response (Callable): Función que recibe el header, los datos y la
+                            dirección de origen de cada segmento recibido,
+                            y retorna si corresponde a la respuesta esperada.
+    max_retransmissions (int | None): Cantidad máxima de retransmisiones.
+                                      Por defecto MAX_RETRANSMISSIONS.
+
+    Returns:
+    --------
+    (tuple[memoryview, HeaderTCP, tuple[str, int]] | None): Datagrama, header
+        y dirección de origen de la respuesta, o None si se agotaron las
+        retransmisiones.
+    """
+    if max_retransmissions is None:
+      max_retransmissions = self.MAX_RETRANSMISSIONS
+
+    retransmissions = 0
+    sent_at = self.__backend.monotonic()
+    deadline = sent_at + self.__rto.rto
+    self.__sendto(address, segment)
+    while True:
+      try:
+        response, response_address = self.__recvfrom(self.__time_until(deadline))
+        response_header, response_data = self.parse_segment(response)
+
+      # Si vence el timer duplicamos el RTO y retransmitimos
+      except socket.timeout:
+        if retransmissions == max_retransmissions:
+          return None
+        retransmissions += 1
+        self.__rto.backoff()
+        deadline = self.__backend.monotonic() + self.__rto.rto
+        self.__sendto(address, segment)
+        self.stats.retransmissions += 1
+        if self.event_hook is not None:
+          self.event_hook("retransmission", seq=None, length=len(segment))
+        continue
+
+      # Si la respuesta está malformada la ignoramos
+      except (struct.error, ValueError, IndexError):
+        continue
+
+      if is_response(response_header, response_data, response_address):
+        if retransmissions == 0:
+          self.__add_rtt_sample(self.__backend.monotonic() - sent_at)
+        return response, response_header, response_address
+
+  def keepalive(self) -> bool:
+    """Método encargado de revisar si una conexión inactiva sigue viva,
+    enviando una sonda de keep-alive: un segmento de datos vacío con un
+    número de secuencia ya confirmado, que el otro extremo responde con un
+    ACK duplicado mientras atienda la conexión. La sonda se retransmite
+    cada vez que vence el RTO, a lo más MAX_KEEPALIVE_PROBES veces.
+
+    Solo debe usarse entre mensajes, cuando ningún extremo está enviando.
+    Como el otro extremo solo atiende la conexión dentro de sus llamadas,
+    responde mientras espera un mensaje en recv (como un servidor que
+    atiende varias transferencias por conexión).
+
+    Returns:
+    --------
+    (bool): True si el otro extremo respondió, False si no respondió, si
+            cerró la conexión (en cuyo caso basta llamar a close para
+            terminar de cerrarla) o si la conexión no está establecida.
+    """
+    if self.__state != self.ESTABLISHED:
+      return False
+    probe_msg = self.__build_segment(HeaderTCP(False, False, False, seq_add(self.seq, -1)))
+
+    def is_probe_ack(header: HeaderTCP, data: memoryview, address: tuple[str, int]) -> bool:
+      # Un FIN en vez del ACK indica que el otro extremo cerró la conexión
+      if header.fin and not header.ack and not header.syn:
+        self.__process_fin(header, data)
+        return self.__state != self.ESTABLISHED
+      return header.ack and not header.syn and not header.fin
+
+    response = self.__send_and_wait(
+      probe_msg, self.conn_sock_addr, is_probe_ack, self.MAX_KEEPALIVE_PROBES - 1
+    )
+    return response is not None and self.__state == self.ESTABLISHED
+
+  def shutdown(self, how: int) -> None:
+    """Método encargado de cerrar solo la dirección de envío de la conexión
+    (half-close): envía un FIN que indica que aún recibimos, y lo
+    retransmite cada vez que vence el RTO hasta que el otro extremo lo
+    confirma. La conexión pasa a FIN_WAIT: ya no se puede enviar, pero recv
+    sigue entregando lo que el otro extremo envíe, y retorna b"" cuando
+    este cierra. Si el otro extremo deja de responder la conexión se cierra.
+
+    Si el otro extremo ya había dejado de enviar (CLOSE_WAIT), equivale a
+    close. Un extremo antiguo, que no soporta half-close, responde el FIN
+    cerrando la conexión.
+
+    Parameters:
+    -----------
+    how (int): Dirección a cerrar. Solo se soporta socket.SHUT_WR.
+
+    Raises:
+    -------
+    ValueError: Si how no es socket.SHUT_WR.
+    """
+    if how != socket.SHUT_WR:
+      raise ValueError("Only SHUT_WR is supported")
+    self.__finish_transmissions()
+    if self.__state == self.CLOSE_WAIT:
+      self.__answer_fin()
+      return
+    if self.__state != self.ESTABLISHED:
+      return
+
+    fin_seq = self.seq
+    fin_msg_to_send = self.__build_segment(HeaderTCP(False, False, True, fin_seq), HALF_CLOSE_FLAG)
+    self.__state = self.FIN_WAIT
+
+    def is_fin_confirmation(header: HeaderTCP, data: memoryview, address: tuple[str, int]) -> bool:
+      # Si el otro extremo también envió su FIN, respondemos como si
+      # hubiera llegado primero, y ambos cierran con el FIN+ACK del otro
+      if header == HeaderTCP(False, False, True, fin_seq):
+        self.__sendto(address, self.__build_segment(HeaderTCP(False, True, True, seq_add(fin_seq, 1))))
+        return False
+
+      # Reconfirmamos los segmentos de datos duplicados. Uno nuevo también
+      # confirma el FIN, pues el otro extremo solo envía tras recibirlo.
+      if not header.syn and not header.ack and not header.fin:
+        if seq_diff(header.seq, fin_seq) < 0:
+          self.__process_data_segment(header.seq, data, address)
+        return seq_diff(header.seq, fin_seq) > 0
+
+      # El ACK del FIN, o el FIN+ACK de un extremo que cierra la conexión
+      return not header.syn and header.ack and header.seq == seq_add(fin_seq, 1)
+
+    response = self.__send_and_wait(
+      fin_msg_to_send, self.conn_sock_addr, is_fin_confirmation, self.MAX_FIN_RETRANSMISSIONS
+    )
+    if response is None:
+      self.__state = self.CLOSED
+      self.__release()
+      return
+
+    datagram, header, address = response
+    self.seq = seq_add(fin_seq, 1)
+    if header.fin:
+      self.__enter_time_wait(header.seq)
+    elif not header.ack:
+      self.__process_received(datagram, address)
 
   def close(self) -> None:
     """Método encargado de implementar el cierre de conexión desde el
-    lado del Host A.
+    lado del Host A. El FIN se retransmite cada vez que vence el RTO; si
+    mientras tanto llegan segmentos de datos duplicados (porque se perdió
+    nuestro último ACK) se vuelven a confirmar. Si el otro extremo deja de
+    responder la conexión se cierra de todas formas.
+
+    Al recibir el FIN+ACK se responde el ACK final y la conexión pasa a
+    TIME_WAIT, donde dicho ACK se reenvía si el FIN+ACK se retransmite.
+    Tras shutdown, en cambio, no se espera el FIN del otro extremo. Si el
+    otro extremo ya había cerrado (CLOSE_WAIT), solo se responde su cierre.
+    En ningún caso close espera al fin de LAST_ACK o TIME_WAIT, que se
+    atienden sin la aplicación (ver state).
+
+    En modo no bloqueante (ver setblocking) close no espera: si aún hay
+    mensajes encolados, el FIN se envía cuando process_events termine de
+    enviarlos, y su retransmisión hasta recibir el FIN+ACK se atiende, al
+    igual que TIME_WAIT, sin la aplicación.
+
+    En un socket que escucha (ver listen) se deja de escuchar y se cierra
+    el socket udp, lo que termina todas sus conexiones.
     """
+    if self.__connections is not None:
+      self.__state = self.CLOSED
+      self.__socket.close()
+      self.__close_notifier()
+      return
+
+    # Si la conexión ya entregó su cierre no queda nada por hacer
+    if self.__detached:
+      return
+
+    # Los mensajes encolados se envían antes del FIN
+    if self.__outgoing:
+      if self.__timeout == 0.0:
+        self.__close_pending = True
+        return
+      self.__finish_transmissions()
+    self.__close_pending = False
+
+    # Si el otro extremo ya había cerrado la conexión (por ejemplo, mientras
+    # la revisábamos con keepalive) solo respondemos su cierre
+    if self.__state == self.CLOSE_WAIT:
+      self.__answer_fin()
+      return
+
+    # Tras shutdown solo liberamos el socket udp, al igual que en un socket
+    # nunca conectado. Una conexión de un socket que escucha ya cerrada no
+    # lo libera de nuevo, pues su lugar pudo pasar a otra conexión.
+    if self.__state != self.ESTABLISHED:
+      if self.__state == self.FIN_WAIT or (self.__state == self.CLOSED and self.__listener is None):
+        self.__state = self.CLOSED
+        self.__release()
+      return
 
     # Construimos el FIN
-    fin_msg_to_send = self.generate_header(
+    fin_msg_to_send = self.__build_segment(
       HeaderTCP(
         False, False, True, 
         self.seq
       )
     )
-    self.__socket.sendto(fin_msg_to_send.encode(), self.conn_sock_addr)
-
-    # Recibimos y parseamos la respuesta, y vemos si corresponde a un FIN+ACK
-    response, _ = self.__socket.recvfrom(self.__buff_size)
-    response = self.parse_header(response.decode())
-
-    if response == HeaderTCP(False, True, True, self.seq + 1):
-      # Si correspondía a un FIN+ACK, respondemos ACK
-      ack_msg_to_send = self.generate_header(
-        HeaderTCP(
-          False, True, False, 
-          self.seq+2)
-      )
-      self.__socket.sendto(ack_msg_to_send.encode(), self.conn_sock_addr)
-
-      # Cerramos conexión
-      self.__socket.close()
-
-
+    self.__state = self.FIN_WAIT
 
+    # En modo no bloqueante no esperamos el FIN+ACK (ver __hand_off)
+    if self.__timeout == 0.0:
+      self.__sendto(self.conn_sock_addr, fin_msg_to_send)
+      self.__hand_off(
+        self.FIN_WAIT, self.seq, fin_msg_to_send, self.__backend.monotonic() + self.__rto.rto
+      )
+      return
+
+    def is_fin_ack(header: HeaderTCP, data: memoryview, address: tuple[str, int]) -> bool:
+      # Reconfirmamos los segmentos de datos duplicados
+      if not header.syn and not header.ack and not header.fin and seq_diff(header.seq, self.seq) < 0:
+        self.__process_data_segment(header.seq, data, address)
+        return False
+
+      # Si el otro extremo también envió su FIN, respondemos como si
+      # hubiera llegado primero, y ambos cierran con el FIN+ACK del otro
+      if header == HeaderTCP(False, False, True, self.seq):
+        self.__sendto(address, self.__build_segment(HeaderTCP(False, True, True, seq_add(self.seq, 1))))
+        return False
+      return header == HeaderTCP(False, True, True, seq_add(self.seq, 1))
+
+    # Enviamos el FIN hasta recibir un FIN+ACK, y respondemos el ACK final
+    response = self.__send_and_wait(
+      fin_msg_to_send, self.conn_sock_addr, is_fin_ack, self.MAX_FIN_RETRANSMISSIONS
+    )
+    if response is not None:
+      self.__enter_time_wait(seq_add(self.seq, 1))
+      return
 
+    # Si el otro extremo dejó de responder, cerramos conexión
+    self.__state = self.CLOSED
+    self.__release()
@@ -0,0 +1,90 @@
+import asyncio
+import random
+import socket
+import unittest
+from unittest import mock
+import async_socketTCP
+from async_socketTCP import AsyncSocketTCP
+from utilities import SEQ_MODULO
+
+
+class AsyncSocketTCPTest(unittest.IsolatedAsyncioTestCase):
+  """Transferencias con AsyncSocketTCP sobre sockets udp locales."""
+
+  async def transfer(self, payload: bytes, mode: str, window: int = 8) -> tuple[bytes, bytes, AsyncSocketTCP]:
+    """Envía payload del cliente al servidor, que responde b"ok" tras
+    recibirlo completo y espera a que el cliente cierre la conexión.
+
+    Returns:
+    --------
+    (tuple[bytes, bytes, AsyncSocketTCP]): Datos recibidos por el servidor,
+        respuesta recibida por el cliente y socket del cliente.
+    """
+    server_socketTCP = AsyncSocketTCP(window, mode)
+    await server_socketTCP.bind(("127.0.0.1", 0))
+    server_socketTCP.listen()
+    server_socketTCP.settimeout(10)
+
+    async def serve() -> bytes:
+      connection, _ = await server_socketTCP.accept()
+      connection.settimeout(10)
+      received = bytearray()
+      while len(received) < len(payload):
+        received += await connection.recv(len(payload))
+      await connection.send(b"ok")
+      self.assertEqual(await connection.recv(1), b"")
+      await server_socketTCP.close()
+      return bytes(received)
+
+    client_socketTCP = AsyncSocketTCP(window, mode)
+    client_socketTCP.settimeout(10)
+    server = asyncio.create_task(serve())
+    await client_socketTCP.connect(server_socketTCP.address)
+    await client_socketTCP.send(payload)
+    reply = await client_socketTCP.recv(10)
+    await client_socketTCP.close()
+    received = await server
+    return received, reply, client_socketTCP
+
+  async def test_round_trip(self):
+    payload = random.Random(1).randbytes(50000)
+    for mode in (AsyncSocketTCP.GO_BACK_N, AsyncSocketTCP.SELECTIVE_REPEAT):
+      with self.subTest(mode=mode):
+        received, reply, _ = await self.transfer(payload, mode)
+        self.assertEqual(received, payload)
+        self.assertEqual(reply, b"ok")
+
+  async def test_sequence_numbers_wrap(self):
+    # El número de secuencia inicial del cliente queda a pocos segmentos de
+    # SEQ_MODULO, por lo que se desborda durante la transferencia
+    payload = random.Random(2).randbytes(50000)
+    randint = async_socketTCP.randint
+
+    def initial_seq(a: int, b: int) -> int:
+      return SEQ_MODULO - 3000 if (a, b) == (0, 100) else randint(a, b)
+
+    with mock.patch.object(async_socketTCP, "randint", initial_seq):
+      received, reply, client_socketTCP = await self.transfer(payload, AsyncSocketTCP.SELECTIVE_REPEAT)
+    self.assertEqual(received, payload)
+    self.assertEqual(reply, b"ok")
+    self.assertLess(client_socketTCP.seq, SEQ_MODULO - 3000)
+
+  async def test_recv_timeout(self):
+    server_socketTCP = AsyncSocketTCP()
+    await server_socketTCP.bind(("127.0.0.1", 0))
+    server_socketTCP.listen()
+    server_socketTCP.settimeout(10)
+    client_socketTCP = AsyncSocketTCP()
+    client_socketTCP.settimeout(0.2)
+    accept = asyncio.create_task(server_socketTCP.accept())
+    await client_socketTCP.connect(server_socketTCP.address)
+    await accept
+
+    # El servidor no envía nada, por lo que recv se rinde tras el timeout
+    with self.assertRaises(socket.timeout):
+      await client_socketTCP.recv(10)
+    await server_socketTCP.close()
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,78 @@
+import socket
+import unittest
+from batch_io import BatchDatagramIO
+
+
+@unittest.skipUnless(BatchDatagramIO.available, "recvmmsg and sendmmsg are not available")
+class BatchDatagramIOTest(unittest.TestCase):
+  """Envío y recepción en lote sobre sockets udp locales."""
+
+  def setUp(self):
+    self.receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    self.receiver.bind(("127.0.0.1", 0))
+    self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    self.sender.bind(("127.0.0.1", 0))
+    self.receiver_address = self.receiver.getsockname()
+    self.sender_address = self.sender.getsockname()
+    self.batch_io = BatchDatagramIO(batch_size=8)
+
+  def tearDown(self):
+    self.receiver.close()
+    self.sender.close()
+
+  def test_recv_batch(self):
+    datagrams = [bytes([i]) * (i * 100 + 1) for i in range(5)]
+    for datagram in datagrams:
+      self.sender.sendto(datagram, self.receiver_address)
+
+    # Los datagramas pueden llegar en más de un lote, y las vistas de cada
+    # lote solo son válidas hasta recibir el siguiente
+    received = []
+    while len(received) < len(datagrams):
+      received += [(bytes(data), address) for data, address in self.batch_io.recv(self.receiver, 1500, 1.0)]
+    self.assertEqual([data for data, _ in received], datagrams)
+    self.assertEqual({address for _, address in received}, {self.sender_address})
+
+  def test_recv_truncates_to_slot_size(self):
+    self.sender.sendto(bytes(100), self.receiver_address)
+    [(data, _)] = self.batch_io.recv(self.receiver, 10, timeout=1.0)
+    self.assertEqual(len(data), 10)
+
+  def test_recv_without_datagrams(self):
+    self.assertEqual(self.batch_io.recv(self.receiver, 1500, timeout=0.0), [])
+    with self.assertRaises(socket.timeout):
+      self.batch_io.recv(self.receiver, 1500, timeout=0.05)
+
+  def test_recv_on_closed_socket(self):
+    self.receiver.close()
+    for timeout in (0.0, 0.05, None):
+      with self.subTest(timeout=timeout):
+        with self.assertRaises(OSError) as context:
+          self.batch_io.recv(self.receiver, 1500, timeout)
+        self.assertNotIsInstance(context.exception, socket.timeout)
+
+  def test_send_batch(self):
+    datagrams = [(self.receiver_address, (b"header", bytes([i]) * 50)) for i in range(5)]
+    self.assertEqual(self.batch_io.send(self.sender, datagrams, 1500), 5)
+    self.receiver.settimeout(1.0)
+    for i in range(5):
+      data, address = self.receiver.recvfrom(1500)
+      self.assertEqual(data, b"header" + bytes([i]) * 50)
+      self.assertEqual(address, self.sender_address)
+
+  def test_send_stops_at_unsendable_datagram(self):
+    # Un datagrama que no cabe en slot_size, o con una dirección que no es
+    # una IP numérica, termina el lote: él y los siguientes se envían de a uno
+    datagrams = [
+      (self.receiver_address, (b"a" * 10,)),
+      (self.receiver_address, (b"b" * 100,)),
+      (self.receiver_address, (b"c" * 10,)),
+    ]
+    self.assertEqual(self.batch_io.send(self.sender, datagrams, 50), 1)
+    self.assertEqual(self.batch_io.send(self.sender, [(("localhost", 1), (b"a",))], 50), 0)
+    self.receiver.settimeout(1.0)
+    self.assertEqual(self.receiver.recv(1500), b"a" * 10)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,140 @@
+import io
+import random
+import unittest
+from capture import PacketCapture, analyze_capture, read_capture
+from simulation import LinkConditions, SimulatedHost, SimulatedNetwork
+from socketTCP import SocketTCP
+from utilities import SEQ_MODULO
+
+SERVER_ADDRESS = ("10.0.0.1", 5000)
+CLIENT_IP = "10.0.0.2"
+
+
+def captured_transfer(
+  payload: bytes, conditions: LinkConditions, seed: int, snaplen: int = 0xFFFF,
+  client_host: type[SimulatedHost] = SimulatedHost
+) -> tuple:
+  """Transfiere payload de un cliente, asociado a un host de tipo
+  client_host, a un servidor sobre la red simulada, capturando los
+  datagramas de ambos extremos.
+
+  Returns:
+  --------
+  (tuple[bytes, SocketTCP, io.BytesIO]): Datos recibidos por el servidor,
+      socket del cliente y archivo con la captura.
+  """
+  file = io.BytesIO()
+  with SimulatedNetwork(conditions, seed) as network:
+    capture = PacketCapture(file, snaplen, clock=lambda: network.now)
+    server_socketTCP = SocketTCP(
+      16, SocketTCP.SELECTIVE_REPEAT, capture=capture, backend=network.host(SERVER_ADDRESS[0])
+    )
+    server_socketTCP.bind(SERVER_ADDRESS)
+    server_socketTCP.listen()
+    server_socketTCP.settimeout(60)
+    client_socketTCP = SocketTCP(
+      16, SocketTCP.SELECTIVE_REPEAT, capture=capture, backend=client_host(network, CLIENT_IP)
+    )
+    client_socketTCP.settimeout(60)
+
+    def serve() -> bytes:
+      connection, _ = server_socketTCP.accept()
+      connection.settimeout(60)
+      received = bytearray()
+      while data := connection.recv(len(payload)):
+        received += data
+      server_socketTCP.close()
+      return bytes(received)
+
+    def client() -> None:
+      client_socketTCP.connect(SERVER_ADDRESS)
+      client_socketTCP.send(payload)
+      client_socketTCP.close()
+
+    received, _ = network.run(serve, client)
+    capture.close()
+  file.seek(0)
+  return received, client_socketTCP, file
+
+
+class PacketCaptureTest(unittest.TestCase):
+  """Captura en formato pcap y su análisis."""
+
+  def test_capture_round_trip(self):
+    payload = random.Random(1).randbytes(50000)
+    received, client_socketTCP, file = captured_transfer(payload, LinkConditions(delay=0.01), 1)
+    self.assertEqual(received, payload)
+
+    # Cada datagrama aparece como enviado por un extremo y recibido por el
+    # otro, salvo el último ACK del cierre, que llega con el servidor cerrado
+    datagrams = list(read_capture(file))
+    sent = [datagram for datagram in datagrams if datagram.sent and datagram.local[0] == CLIENT_IP]
+    delivered = [datagram for datagram in datagrams if not datagram.sent and datagram.local == SERVER_ADDRESS]
+    self.assertEqual(len(sent), client_socketTCP.stats.segments_sent)
+    self.assertEqual(sorted(d.data for d in sent[:-1]), sorted(d.data for d in delivered))
+    self.assertTrue(all(datagram.remote == SERVER_ADDRESS for datagram in sent))
+    self.assertEqual([d.time for d in datagrams], sorted(d.time for d in datagrams))
+
+  def test_analyze_lossy_transfer(self):
+    payload = random.Random(2).randbytes(100000)
+    conditions = LinkConditions(loss=0.05, delay=0.02, jitter=0.005)
+    received, client_socketTCP, file = captured_transfer(payload, conditions, 2)
+    self.assertEqual(received, payload)
+
+    timelines = analyze_capture(read_capture(file))
+    [client] = [timeline for timeline in timelines if timeline.local[0] == CLIENT_IP]
+    [server] = [timeline for timeline in timelines if timeline.local == SERVER_ADDRESS]
+
+    # El cliente envía el mensaje tras el segmento con su largo, y el
+    # servidor lo recibe completo una vez sin contar duplicados
+    length_segment = len(str(len(payload)))
+    self.assertEqual(client.bytes_sent, len(payload) + length_segment)
+    self.assertEqual(server.bytes_received, len(payload) + length_segment)
+    self.assertEqual(client.retransmissions, client_socketTCP.stats.retransmissions)
+    self.assertGreater(client.retransmissions, 0)
+    self.assertTrue(client.rtt_samples)
+    self.assertTrue(all(rtt >= 0.04 for rtt in client.rtt_samples))
+    self.assertEqual(client.segments[0].kind, "SYN")
+    self.assertEqual(server.segments[0].kind, "SYN")
+
+  def test_rtt_across_sequence_wrap(self):
+    # Un segmento que cruza SEQ_MODULO se confirma con el número de
+    # secuencia ya reducido, y aun así se mide. Con este número inicial el
+    # cuarto ACK de datos confirma 100 bytes tras SEQ_MODULO.
+    class WrappingHost(SimulatedHost):
+      def randint(self, a: int, b: int) -> int:
+        return SEQ_MODULO - 10071 if (a, b) == (0, 100) else super().randint(a, b)
+
+    payload = random.Random(4).randbytes(50000)
+    rtt_samples = []
+    for client_host in (SimulatedHost, WrappingHost):
+      received, _, file = captured_transfer(payload, LinkConditions(delay=0.01), 4, client_host=client_host)
+      self.assertEqual(received, payload)
+      [client] = [
+        timeline for timeline in analyze_capture(read_capture(file)) if timeline.local[0] == CLIENT_IP
+      ]
+      rtt_samples.append(client.rtt_samples)
+    self.assertTrue(rtt_samples[0])
+    self.assertEqual(rtt_samples[1], rtt_samples[0])
+
+  def test_snaplen_truncates_datagrams(self):
+    payload = random.Random(3).randbytes(20000)
+    received, _, file = captured_transfer(payload, LinkConditions(delay=0.01), 3, snaplen=40)
+    self.assertEqual(received, payload)
+    datagrams = list(read_capture(file))
+    self.assertTrue(all(len(datagram.data) <= 40 for datagram in datagrams))
+    self.assertTrue(any(datagram.length > 40 for datagram in datagrams))
+
+    # Los headers siguen completos, por lo que el análisis cuenta los bytes
+    # de datos a partir del largo original
+    timelines = analyze_capture(datagrams)
+    [client] = [timeline for timeline in timelines if timeline.local[0] == CLIENT_IP]
+    self.assertEqual(client.bytes_sent, len(payload) + len(str(len(payload))))
+
+  def test_not_a_capture(self):
+    with self.assertRaises(ValueError):
+      list(read_capture(io.BytesIO(b"not a pcap file at all")))
+
+
+if __name__ == "__main__":
+  unittest.main()
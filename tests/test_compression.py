@@ -0,0 +1,86 @@
+import random
+import unittest
+import zlib
+from compression import CODECS, DEFAULT_CODECS, Lz4Codec, ZlibCodec
+
+
+class CodecTest:
+  """Pruebas comunes a todos los codecs. Las subclases definen codec."""
+
+  codec = None
+
+  def test_round_trip(self):
+    for block in (b"a", b"a" * 65536, random.Random(1).randbytes(65536), bytes(range(256)) * 10):
+      with self.subTest(size=len(block)):
+        compressed = self.codec.compress(block)
+        self.assertEqual(self.codec.decompress(compressed, len(block)), block)
+
+  def test_memoryview_input(self):
+    block = b"hola mundo " * 100
+    compressed = self.codec.compress(memoryview(block))
+    self.assertEqual(self.codec.decompress(memoryview(compressed), len(block)), block)
+
+  def test_smaller_size_is_rejected(self):
+    # Un bloque que descomprime más que el tamaño anunciado se rechaza sin
+    # producir más de size bytes
+    compressed = self.codec.compress(bytes(1 << 20))
+    with self.assertRaises(ValueError):
+      self.codec.decompress(compressed, 1000)
+
+  def test_larger_size_is_rejected(self):
+    compressed = self.codec.compress(b"a" * 1000)
+    with self.assertRaises(ValueError):
+      self.codec.decompress(compressed, 1001)
+
+  def test_zero_size_is_rejected(self):
+    compressed = self.codec.compress(b"a" * 1000)
+    with self.assertRaises(ValueError):
+      self.codec.decompress(compressed, 0)
+
+  def test_corrupted_block_is_rejected(self):
+    with self.assertRaises(ValueError):
+      self.codec.decompress(random.Random(2).randbytes(100), 1000)
+
+
+class ZlibCodecTest(CodecTest, unittest.TestCase):
+  """Compresión con zlib."""
+
+  codec = ZlibCodec()
+
+  def test_trailing_data_is_rejected(self):
+    # Datos tras el final del stream no corresponden al bloque
+    compressed = self.codec.compress(b"a" * 1000)
+    with self.assertRaises(ValueError):
+      self.codec.decompress(compressed + b"extra", 1000)
+
+  def test_truncated_block_is_rejected(self):
+    compressed = self.codec.compress(random.Random(3).randbytes(1000))
+    with self.assertRaises(ValueError):
+      self.codec.decompress(compressed[:-10], 1000)
+
+  def test_empty_block(self):
+    self.assertEqual(self.codec.decompress(zlib.compress(b""), 0), b"")
+
+
+@unittest.skipUnless(Lz4Codec.available, "lz4 is not installed")
+class Lz4CodecTest(CodecTest, unittest.TestCase):
+  """Compresión con LZ4."""
+
+  codec = Lz4Codec() if Lz4Codec.available else None
+
+
+class CodecRegistryTest(unittest.TestCase):
+  """Codecs disponibles y ofrecidos por defecto."""
+
+  def test_zlib_is_always_available(self):
+    self.assertIs(CODECS[ZlibCodec.codec_id], ZlibCodec)
+    self.assertIn(ZlibCodec, DEFAULT_CODECS)
+
+  def test_unavailable_codecs_are_not_offered(self):
+    for codec in DEFAULT_CODECS:
+      self.assertTrue(codec.available)
+    self.assertEqual(Lz4Codec in DEFAULT_CODECS, Lz4Codec.available)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,139 @@
+import random
+import unittest
+from framing import DelimiterFramer, FramedSocket, LengthPrefixFramer, StrCodec
+from simulation import LinkConditions, SimulatedNetwork
+from socketTCP import SocketTCP
+
+SERVER_ADDRESS = ("10.0.0.1", 5000)
+CLIENT_IP = "10.0.0.2"
+
+
+def feed_in_pieces(framer, data: bytes, piece_size: int) -> list[bytes]:
+  """Entrega data a framer de a piece_size bytes, retornando los frames
+  completos a medida que aparecen.
+  """
+  frames = []
+  for offset in range(0, len(data), piece_size):
+    framer.feed(data[offset:offset + piece_size])
+    while (payload := framer.next_frame()) is not None:
+      frames.append(payload)
+  return frames
+
+
+class LengthPrefixFramerTest(unittest.TestCase):
+  """Frames precedidos por su largo."""
+
+  def test_frames_split_across_feeds(self):
+    payloads = [b"", b"a", random.Random(1).randbytes(3000), b"hola"]
+    framer = LengthPrefixFramer()
+    data = b"".join(framer.frame(payload) for payload in payloads)
+    for piece_size in (1, 3, 7, len(data)):
+      with self.subTest(piece_size=piece_size):
+        framer = LengthPrefixFramer()
+        self.assertEqual(feed_in_pieces(framer, data, piece_size), payloads)
+        self.assertEqual(len(framer), 0)
+
+  def test_max_frame_size(self):
+    framer = LengthPrefixFramer(max_frame_size=10)
+    with self.assertRaises(ValueError):
+      framer.frame(bytes(11))
+
+    # El largo anunciado se rechaza antes de recibir el contenido
+    framer.feed(LengthPrefixFramer().frame(bytes(11))[:4])
+    with self.assertRaises(ValueError):
+      framer.next_frame()
+
+
+class DelimiterFramerTest(unittest.TestCase):
+  """Frames terminados por un delimitador."""
+
+  def test_delimiter_split_across_feeds(self):
+    payloads = [b"GET / HTTP/1.1", b"", b"\r\n\r", b"\nfin"]
+    framer = DelimiterFramer()
+    data = b"".join(framer.frame(payload) for payload in payloads)
+
+    # Con cada tamaño de trozo el delimitador queda dividido en distintas
+    # posiciones entre dos recepciones
+    for piece_size in range(1, 9):
+      with self.subTest(piece_size=piece_size):
+        framer = DelimiterFramer()
+        self.assertEqual(feed_in_pieces(framer, data, piece_size), payloads)
+        self.assertEqual(len(framer), 0)
+
+  def test_delimiter_split_after_partial_match(self):
+    # Un inicio de delimitador que no se completa no debe ocultar al
+    # delimitador real que comienza justo después
+    framer = DelimiterFramer(b"abab")
+    framer.feed(b"xaba")
+    self.assertIsNone(framer.next_frame())
+    framer.feed(b"c")
+    self.assertIsNone(framer.next_frame())
+    framer.feed(b"aba")
+    self.assertIsNone(framer.next_frame())
+    framer.feed(b"b")
+    self.assertEqual(framer.next_frame(), b"xabac")
+    self.assertIsNone(framer.next_frame())
+    self.assertEqual(len(framer), 0)
+
+  def test_payload_with_delimiter_is_rejected(self):
+    framer = DelimiterFramer()
+    with self.assertRaises(ValueError):
+      framer.frame(b"a\r\n\r\nb")
+
+    # El delimitador tampoco puede formarse con el final del contenido
+    with self.assertRaises(ValueError):
+      framer.frame(b"a\r\n")
+
+  def test_max_frame_size(self):
+    framer = DelimiterFramer(b"\n", max_frame_size=4)
+    framer.feed(b"1234")
+    self.assertIsNone(framer.next_frame())
+    framer.feed(b"5")
+    self.assertIsNone(framer.next_frame())
+    framer.feed(b"6")
+    with self.assertRaises(ValueError):
+      framer.next_frame()
+
+  def test_empty_delimiter(self):
+    with self.assertRaises(ValueError):
+      DelimiterFramer(b"")
+
+
+class FramedSocketTest(unittest.TestCase):
+  """Mensajes delimitados sobre una conexión SocketTCP."""
+
+  def test_messages_over_lossy_link(self):
+    messages = [f"mensaje {i} " + "ñ" * i for i in range(200)]
+    with SimulatedNetwork(LinkConditions(loss=0.05, delay=0.02), 1) as network:
+      server_socketTCP = SocketTCP(8, SocketTCP.SELECTIVE_REPEAT, backend=network.host(SERVER_ADDRESS[0]))
+      server_socketTCP.bind(SERVER_ADDRESS)
+      server_socketTCP.listen()
+      server_socketTCP.settimeout(60)
+
+      # El servidor lee de a pocos bytes, por lo que los frames (y los
+      # caracteres de varios bytes) quedan divididos entre recepciones
+      def serve() -> list[str]:
+        connection, _ = server_socketTCP.accept()
+        connection.settimeout(60)
+        framed = FramedSocket(connection, DelimiterFramer(b"\n"), StrCodec(), buff_size=7)
+        received = list(framed)
+        framed.close()
+        server_socketTCP.close()
+        return received
+
+      def client() -> None:
+        client_socketTCP = SocketTCP(8, SocketTCP.SELECTIVE_REPEAT, backend=network.host(CLIENT_IP))
+        client_socketTCP.settimeout(60)
+        client_socketTCP.connect(SERVER_ADDRESS)
+        framed = FramedSocket(client_socketTCP, DelimiterFramer(b"\n"), StrCodec())
+        for message in messages:
+          framed.send(message)
+        framed.close()
+
+      received, _ = network.run(serve, client)
+
+    self.assertEqual(received, messages)
+
+
+if __name__ == "__main__":
+  unittest.main()
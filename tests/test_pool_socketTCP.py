@@ -0,0 +1,118 @@
+import socket
+import threading
+import unittest
+from pool_socketTCP import SocketTCPPool
+from socketTCP import SocketTCP
+
+
+class EchoServer:
+  """Servidor SocketTCP local que atiende cada conexión en un hilo,
+  respondiendo cada mensaje de 4 bytes con el mismo mensaje hasta que el
+  cliente cierra la conexión.
+  """
+
+  def __init__(self):
+    self.listener = SocketTCP()
+    self.listener.bind(("127.0.0.1", 0))
+    self.listener.listen()
+    self.address = self.listener.address
+    self.accepted = 0
+    self.__threads = []
+    threading.Thread(target=self.__accept, daemon=True).start()
+
+  def __accept(self) -> None:
+    while True:
+      try:
+        connection, _ = self.listener.accept()
+      except OSError:
+        return
+      self.accepted += 1
+      thread = threading.Thread(target=self.__serve, args=(connection,), daemon=True)
+      self.__threads.append(thread)
+      thread.start()
+
+  @staticmethod
+  def __serve(connection: SocketTCP) -> None:
+    connection.settimeout(10)
+    while data := connection.recv(4):
+      connection.send(data)
+    connection.close()
+
+  def close(self) -> None:
+    for thread in self.__threads:
+      thread.join(10)
+    self.listener.close()
+
+
+class SocketTCPPoolTest(unittest.TestCase):
+  """Reutilización de conexiones sobre sockets udp locales."""
+
+  def setUp(self):
+    self.server = EchoServer()
+    self.pool = SocketTCPPool(max_connections_per_host=2, timeout=10)
+
+  def tearDown(self):
+    self.pool.close()
+    self.server.close()
+
+  def echo(self, connection: SocketTCP, msg: bytes) -> bytes:
+    connection.send(msg)
+    return connection.recv(len(msg))
+
+  def test_connection_is_reused(self):
+    with self.pool.connection(self.server.address) as connection:
+      self.assertEqual(self.echo(connection, b"uno!"), b"uno!")
+    with self.pool.connection(self.server.address) as reused:
+      self.assertIs(reused, connection)
+      self.assertEqual(self.echo(reused, b"dos!"), b"dos!")
+    self.assertEqual(self.server.accepted, 1)
+
+  def test_connections_per_host_are_bounded(self):
+    first = self.pool.acquire(self.server.address)
+    second = self.pool.acquire(self.server.address)
+    self.assertIsNot(first, second)
+    with self.assertRaises(socket.timeout):
+      self.pool.acquire(self.server.address, timeout=0.1)
+
+    # Al devolverse una conexión, quien espera la recibe
+    threading.Timer(0.1, self.pool.release, (self.server.address, first)).start()
+    self.assertIs(self.pool.acquire(self.server.address, timeout=10), first)
+    self.pool.release(self.server.address, first)
+    self.pool.release(self.server.address, second)
+    self.assertEqual(self.server.accepted, 2)
+
+  def test_failed_connection_is_not_reused(self):
+    with self.assertRaises(KeyError):
+      with self.pool.connection(self.server.address) as connection:
+        self.echo(connection, b"uno!")
+        raise KeyError
+    with self.pool.connection(self.server.address) as new_connection:
+      self.assertIsNot(new_connection, connection)
+      self.assertEqual(self.echo(new_connection, b"dos!"), b"dos!")
+    self.assertEqual(self.server.accepted, 2)
+
+  def test_stale_connection_is_checked(self):
+    # Con keepalive_interval vencido la conexión se revisa con una sonda
+    # antes de entregarse, y el servidor, que espera en recv, la responde
+    pool = SocketTCPPool(keepalive_interval=1e-9, timeout=10)
+    with pool.connection(self.server.address) as connection:
+      self.echo(connection, b"uno!")
+    with pool.connection(self.server.address) as reused:
+      self.assertIs(reused, connection)
+      self.assertEqual(self.echo(reused, b"dos!"), b"dos!")
+    pool.close()
+
+  def test_closed_pool(self):
+    self.pool.close()
+    with self.assertRaises(RuntimeError):
+      self.pool.acquire(self.server.address)
+
+  def test_invalid_arguments(self):
+    with self.assertRaises(ValueError):
+      SocketTCPPool(max_connections_per_host=0)
+    with self.assertRaises(ValueError):
+      SocketTCPPool(idle_timeout=0)
+
+
+if __name__ == "__main__":
+  unittest.main()
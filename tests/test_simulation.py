@@ -0,0 +1,441 @@
+import io
+import queue
+import random
+import socket
+import unittest
+from compression import DEFAULT_CODECS
+from simulation import LinkConditions, SimulatedHost, SimulatedNetwork, run_scenario
+from socketTCP import SocketTCP
+from utilities import COMPRESSION_BLOCK_SIZE, SEQ_MODULO, FastOpenCache, HeaderTCP
+
+SERVER_ADDRESS = ("10.0.0.1", 5000)
+CLIENT_IP = "10.0.0.2"
+
+
+def sleep(host: SimulatedHost, seconds: float) -> None:
+  """Bloquea el hilo simulado actual durante seconds segundos virtuales.
+
+  Parameters:
+  -----------
+  host (SimulatedHost): Host de la red simulada desde el cual se espera.
+  seconds (float): Segundos a esperar.
+  """
+  try:
+    host.queue().get(timeout=seconds)
+  except queue.Empty:
+    pass
+
+
+def transfer(
+  network: SimulatedNetwork, payload: bytes, server_options: dict | None = None,
+  client_options: dict | None = None, read_size: int | None = None
+) -> tuple[bytes, SocketTCP, SocketTCP]:
+  """Transfiere payload de un cliente a un servidor SocketTCP sobre la red
+  simulada, y cierra la conexión.
+
+  Parameters:
+  -----------
+  network (SimulatedNetwork): Red simulada.
+  payload (bytes): Datos a enviar.
+  server_options (dict | None): Argumentos del constructor del servidor.
+  client_options (dict | None): Argumentos del constructor del cliente.
+  read_size (int | None): Bytes que lee el servidor en cada recv. Si es
+                         None lee todo lo disponible.
+
+  Returns:
+  --------
+  (tuple[bytes, SocketTCP, SocketTCP]): Datos recibidos por el servidor,
+      conexión aceptada por el servidor y socket del cliente.
+  """
+  server_socketTCP = SocketTCP(
+    16, SocketTCP.SELECTIVE_REPEAT, backend=network.host(SERVER_ADDRESS[0]), **(server_options or {})
+  )
+  server_socketTCP.bind(SERVER_ADDRESS)
+  server_socketTCP.listen()
+  server_socketTCP.settimeout(60)
+  client_socketTCP = SocketTCP(
+    16, SocketTCP.SELECTIVE_REPEAT, backend=network.host(CLIENT_IP), **(client_options or {})
+  )
+  client_socketTCP.settimeout(60)
+
+  def serve() -> tuple[bytes, SocketTCP]:
+    connection, _ = server_socketTCP.accept()
+    connection.settimeout(60)
+    received = bytearray()
+    while data := connection.recv(read_size or len(payload)):
+      received += data
+    server_socketTCP.close()
+    return bytes(received), connection
+
+  def client() -> None:
+    client_socketTCP.connect(SERVER_ADDRESS)
+    client_socketTCP.send(payload)
+    client_socketTCP.close()
+
+  (received, connection), _ = network.run(serve, client)
+  return received, connection, client_socketTCP
+
+
+def segments(network: SimulatedNetwork, event: str, source_ip: str) -> list:
+  """Retorna los headers y datos de los segmentos de la traza de la red
+  con el evento y la ip de origen dados.
+  """
+  return [
+    SocketTCP.parse_segment(packet.data) for packet in network.trace
+    if packet.event == event and packet.source[0] == source_ip
+  ]
+
+
+def count_data_and_acks(network: SimulatedNetwork) -> tuple[int, int]:
+  """Retorna la cantidad de segmentos de datos enviados por el cliente y
+  de ACKs (sin SYN ni FIN) enviados por el servidor en la red.
+  """
+  data = sum(
+    not (header.syn or header.ack or header.fin) for header, _ in segments(network, "sent", CLIENT_IP)
+  )
+  acks = sum(
+    header.ack and not (header.syn or header.fin) for header, _ in segments(network, "sent", SERVER_ADDRESS[0])
+  )
+  return data, acks
+
+
+class SlidingWindowTest(unittest.TestCase):
+  """Transferencias completas con Go-Back-N y Selective Repeat sobre
+  enlaces con pérdidas y reordenamiento.
+  """
+
+  def test_go_back_n_under_loss_and_reorder(self):
+    # Las semillas 41, 43, 77, 82, 86 y 89 se detenían con el RTO
+    # retrocedido tras retransmitir la ventana
+    conditions = LinkConditions(loss=0.05, delay=0.02, jitter=0.005, reorder=0.05)
+    for seed in range(100):
+      with self.subTest(seed=seed):
+        complete, _ = run_scenario(seed, conditions, 50000, 8, SocketTCP.GO_BACK_N)
+        self.assertTrue(complete)
+
+  def test_go_back_n_loss_sweep(self):
+    # Sin retardo el primer envío ocurre en el instante 0.0 virtual, que se
+    # confundía con un segmento nunca enviado y hacía ignorar los ACKs
+    for conditions in (
+      LinkConditions(loss=0.05), LinkConditions(loss=0.1),
+      LinkConditions(loss=0.05, delay=0.02, jitter=0.005, duplicate=0.01, reorder=0.02),
+      LinkConditions(loss=0.1, delay=0.02, jitter=0.005, duplicate=0.01, reorder=0.02),
+    ):
+      for seed in range(100):
+        with self.subTest(conditions=conditions, seed=seed):
+          complete, _ = run_scenario(seed, conditions, 20000, 16, SocketTCP.GO_BACK_N)
+          self.assertTrue(complete)
+
+  def test_selective_repeat_under_loss_and_reorder(self):
+    conditions = LinkConditions(loss=0.1, delay=0.02, jitter=0.005, reorder=0.1)
+    for seed in (1, 2, 3):
+      with self.subTest(seed=seed):
+        complete, _ = run_scenario(seed, conditions, 200000, 16, SocketTCP.SELECTIVE_REPEAT)
+        self.assertTrue(complete)
+
+  def test_selective_repeat_under_loss_reorder_and_corruption(self):
+    # Con estas semillas un timeout de un segmento fuera de la ventana no
+    # retransmitía nada, y el RTO crecía hasta que el receptor se rendía
+    conditions = LinkConditions(loss=0.1, delay=0.02, jitter=0.005, duplicate=0.01, reorder=0.1, corrupt=0.05)
+    for seed in (13, 17, 19):
+      with self.subTest(seed=seed):
+        complete, _ = run_scenario(seed, conditions, 200000, 16, SocketTCP.SELECTIVE_REPEAT)
+        self.assertTrue(complete)
+
+
+class SackTest(unittest.TestCase):
+  """ACKs acumulativos con bloques SACK y ACKs retrasados."""
+
+  def test_sack_under_loss_and_reorder(self):
+    payload = random.Random(4).randbytes(200000)
+    events = []
+    conditions = LinkConditions(loss=0.05, delay=0.02, jitter=0.005, reorder=0.1)
+    with SimulatedNetwork(conditions, 4) as network:
+      received, _, _ = transfer(
+        network, payload, client_options={"event_hook": lambda name, **details: events.append((name, details))}
+      )
+    self.assertEqual(received, payload)
+    handshake = [details for name, details in events if name == "handshake"]
+    self.assertTrue(handshake[0]["sack"])
+
+  def test_delayed_acks(self):
+    payload = random.Random(5).randbytes(100000)
+    with SimulatedNetwork(LinkConditions(delay=0.02), 5) as network:
+      received, _, _ = transfer(network, payload)
+    self.assertEqual(received, payload)
+
+    # Sin pérdidas el receptor confirma de a varios segmentos
+    data, acks = count_data_and_acks(network)
+    self.assertLess(acks, data)
+
+  def test_one_ack_per_segment_without_sack(self):
+    payload = random.Random(5).randbytes(100000)
+    with SimulatedNetwork(LinkConditions(delay=0.02), 5) as network:
+      received, _, _ = transfer(network, payload, client_options={"sack": False})
+    self.assertEqual(received, payload)
+    data, acks = count_data_and_acks(network)
+    self.assertEqual(acks, data)
+
+
+class FlowControlTest(unittest.TestCase):
+  """Control de flujo con la ventana anunciada por el receptor."""
+
+  def test_persist_probe_after_lost_window_update(self):
+    # El servidor lee de a poco con un buffer pequeño, por lo que anuncia
+    # ventanas menores a un segmento, y se pierden ACKs que la amplían
+    payload = random.Random(6).randbytes(50000)
+    with SimulatedNetwork(LinkConditions(delay=0.02), 6) as network:
+      network.set_link(SERVER_ADDRESS[0], CLIENT_IP, LinkConditions(loss=0.2, delay=0.02))
+      received, _, _ = transfer(network, payload, server_options={"recv_buffer_size": 4096}, read_size=1024)
+    self.assertEqual(received, payload)
+
+    # Con la ventana detenida el emisor envía igualmente un segmento (la
+    # sonda) tras PERSIST_TIMEOUT, en lugar de esperar para siempre
+    window = None
+    probes = []
+    for packet in network.trace:
+      header, data = SocketTCP.parse_segment(packet.data)
+      if packet.event == "delivered" and packet.source == SERVER_ADDRESS and header.ack:
+        window, window_time = header.window, packet.time
+      elif packet.event == "sent" and packet.source[0] == CLIENT_IP and not (header.syn or header.ack or header.fin):
+        if window is not None and len(data) > window:
+          probes.append(packet.time - window_time)
+    self.assertTrue(probes)
+    self.assertGreaterEqual(round(min(probes), 3), SocketTCP.PERSIST_TIMEOUT)
+
+
+class ChecksumTest(unittest.TestCase):
+  """Descarte de segmentos corruptos con el CRC32 del header binario."""
+
+  def test_corrupted_segments_are_dropped(self):
+    payload = random.Random(7).randbytes(100000)
+    with SimulatedNetwork(LinkConditions(delay=0.02, corrupt=0.1), 7) as network:
+      received, connection, _ = transfer(network, payload)
+    self.assertEqual(received, payload)
+    self.assertGreater(connection.stats.corrupted_segments, 0)
+
+
+class TeardownTest(unittest.TestCase):
+  """Half-close y TIME_WAIT."""
+
+  def test_half_close(self):
+    request = random.Random(8).randbytes(20000)
+    response = random.Random(9).randbytes(30000)
+    conditions = LinkConditions(loss=0.05, delay=0.02, jitter=0.005)
+    with SimulatedNetwork(conditions, 8) as network:
+      client_host = network.host(CLIENT_IP)
+      server_socketTCP = SocketTCP(8, SocketTCP.SELECTIVE_REPEAT, backend=network.host(SERVER_ADDRESS[0]))
+      server_socketTCP.bind(SERVER_ADDRESS)
+      server_socketTCP.listen()
+      server_socketTCP.settimeout(60)
+
+      # El servidor lee hasta el fin de la dirección de envío del cliente,
+      # y recién entonces responde y cierra
+      def serve() -> bytes:
+        connection, _ = server_socketTCP.accept()
+        connection.settimeout(60)
+        received = bytearray()
+        while data := connection.recv(len(request)):
+          received += data
+        connection.send(response)
+        connection.close()
+        return bytes(received)
+
+      def client() -> tuple[bytes, str, str]:
+        client_socketTCP = SocketTCP(8, SocketTCP.SELECTIVE_REPEAT, backend=client_host)
+        client_socketTCP.settimeout(60)
+        client_socketTCP.connect(SERVER_ADDRESS)
+        client_socketTCP.send(request)
+        client_socketTCP.shutdown(socket.SHUT_WR)
+        received = bytearray()
+        while data := client_socketTCP.recv(len(response)):
+          received += data
+        state = client_socketTCP.state
+        sleep(client_host, SocketTCP.MAX_TIME_WAIT + 1)
+        return bytes(received), state, client_socketTCP.state
+
+      server_received, (client_received, state, final_state) = network.run(serve, client)
+      server_socketTCP.close()
+
+    self.assertEqual(server_received, request)
+    self.assertEqual(client_received, response)
+    self.assertEqual(state, SocketTCP.TIME_WAIT)
+    self.assertEqual(final_state, SocketTCP.CLOSED)
+
+
+class SendfileTest(unittest.TestCase):
+  """Envío de archivos con sendfile y recv_to_file."""
+
+  def test_file_without_descriptor_is_read_while_sending(self):
+    payload = random.Random(11).randbytes(300000)
+    reads = []
+
+    # Archivo sin descriptor, que registra el tamaño y el momento (virtual)
+    # de cada lectura
+    class RecordingFile(io.BytesIO):
+      def read(self, size=-1):
+        reads.append((size, network.now))
+        return super().read(size)
+
+    with SimulatedNetwork(LinkConditions(loss=0.05, delay=0.02), 11) as network:
+      server_socketTCP = SocketTCP(16, SocketTCP.SELECTIVE_REPEAT, backend=network.host(SERVER_ADDRESS[0]))
+      server_socketTCP.bind(SERVER_ADDRESS)
+      server_socketTCP.listen()
+      server_socketTCP.settimeout(60)
+
+      def serve() -> bytes:
+        connection, _ = server_socketTCP.accept()
+        connection.settimeout(60)
+        received = io.BytesIO()
+        connection.recv_to_file(received)
+        connection.close()
+        server_socketTCP.close()
+        return received.getvalue()
+
+      def client() -> int:
+        client_socketTCP = SocketTCP(16, SocketTCP.SELECTIVE_REPEAT, backend=network.host(CLIENT_IP))
+        client_socketTCP.settimeout(60)
+        client_socketTCP.connect(SERVER_ADDRESS)
+        sent = client_socketTCP.sendfile(RecordingFile(payload), 10000)
+        client_socketTCP.close()
+        return sent
+
+      received, sent = network.run(serve, client)
+
+    self.assertEqual(received, payload)
+    self.assertEqual(sent, len(payload))
+
+    # El archivo se lee de a trozos a medida que se envía, no completo antes
+    # de enviar el primer segmento
+    self.assertLessEqual(max(size for size, _ in reads), 10000)
+    self.assertGreater(reads[-1][1], reads[0][1])
+
+
+class CompressionTest(unittest.TestCase):
+  """Mensajes comprimidos por bloques."""
+
+  def test_compression_resumes_after_backoff(self):
+    # Tras varios bloques que no se reducen se dejan de comprimir solo los
+    # siguientes COMPRESSION_BACKOFF bytes, aunque sean del mismo mensaje
+    incompressible = random.Random(12).randbytes(SocketTCP.COMPRESSION_MAX_FAILURES * COMPRESSION_BLOCK_SIZE)
+    payload = incompressible + b"a" * (2 * SocketTCP.COMPRESSION_BACKOFF)
+    options = {"compression": DEFAULT_CODECS}
+    with SimulatedNetwork(LinkConditions(delay=0.001), 12) as network:
+      received, _, client_socketTCP = transfer(network, payload, options, options)
+    self.assertEqual(received, payload)
+    self.assertEqual(client_socketTCP.stats.compression_input_bytes, len(payload))
+    self.assertLess(
+      client_socketTCP.stats.compression_output_bytes,
+      len(incompressible) + SocketTCP.COMPRESSION_BACKOFF + COMPRESSION_BLOCK_SIZE
+    )
+
+
+class WrappingHost(SimulatedHost):
+  """Host cuyos sockets eligen un número de secuencia inicial cercano a
+  SEQ_MODULO, de modo que este da la vuelta durante la conexión.
+  """
+
+  def randint(self, a: int, b: int) -> int:
+    if (a, b) == (0, 100):
+      return SEQ_MODULO - 20000
+    return super().randint(a, b)
+
+
+class SequenceWrapTest(unittest.TestCase):
+  """Números de secuencia de 32 bits, que avanzan módulo SEQ_MODULO."""
+
+  def test_binary_header_seq_wraps(self):
+    header = SocketTCP.generate_binary_header(HeaderTCP(False, False, False, SEQ_MODULO + 5), 1400)
+    parsed, _ = SocketTCP.parse_segment(header + bytes(1400))
+    self.assertEqual(parsed.seq, 5)
+
+  def test_transfer_across_wrap(self):
+    request = random.Random(13).randbytes(100000)
+    response = random.Random(14).randbytes(30000)
+    conditions = LinkConditions(loss=0.05, delay=0.02, jitter=0.005, reorder=0.05)
+    for mode, sack in (
+      (SocketTCP.GO_BACK_N, True), (SocketTCP.SELECTIVE_REPEAT, True), (SocketTCP.SELECTIVE_REPEAT, False)
+    ):
+      with self.subTest(mode=mode, sack=sack), SimulatedNetwork(conditions, 13) as network:
+        server_socketTCP = SocketTCP(16, mode, sack=sack, backend=network.host(SERVER_ADDRESS[0]))
+        server_socketTCP.bind(SERVER_ADDRESS)
+        server_socketTCP.listen()
+        server_socketTCP.settimeout(60)
+
+        def serve() -> bytes:
+          connection, _ = server_socketTCP.accept()
+          connection.settimeout(60)
+          received = bytearray()
+          while data := connection.recv(len(request)):
+            received += data
+          connection.send(response)
+          connection.close()
+          server_socketTCP.close()
+          return bytes(received)
+
+        # El cliente envía y recibe tras dar la vuelta el número de
+        # secuencia, y cierra con un FIN posterior a ella
+        def client() -> tuple[bytes, int]:
+          client_socketTCP = SocketTCP(16, mode, sack=sack, backend=WrappingHost(network, CLIENT_IP))
+          client_socketTCP.settimeout(60)
+          client_socketTCP.connect(SERVER_ADDRESS)
+          client_socketTCP.send(request)
+          client_socketTCP.shutdown(socket.SHUT_WR)
+          received = bytearray()
+          while data := client_socketTCP.recv(len(response)):
+            received += data
+          return bytes(received), client_socketTCP.seq
+
+        server_received, (client_received, seq) = network.run(serve, client)
+
+      self.assertEqual(server_received, request)
+      self.assertEqual(client_received, response)
+      self.assertLess(seq, SEQ_MODULO - 20000)
+
+
+class FastOpenTest(unittest.TestCase):
+  """Mensajes enviados en el SYN con una cookie de fast open."""
+
+  def test_syn_with_data(self):
+    message = b"hola mundo"
+    cache = FastOpenCache()
+    with SimulatedNetwork(LinkConditions(delay=0.02), 10) as network:
+      server_socketTCP = SocketTCP(
+        8, SocketTCP.SELECTIVE_REPEAT, fast_open=True, backend=network.host(SERVER_ADDRESS[0])
+      )
+      server_socketTCP.bind(SERVER_ADDRESS)
+      server_socketTCP.listen()
+      server_socketTCP.settimeout(60)
+
+      def serve() -> list[bytes]:
+        messages = []
+        for _ in range(2):
+          connection, _ = server_socketTCP.accept()
+          connection.settimeout(60)
+          messages.append(connection.recv(len(message)))
+          connection.close()
+        server_socketTCP.close()
+        return messages
+
+      # La primera conexión obtiene la cookie, y la segunda la presenta
+      # junto al mensaje
+      def client() -> None:
+        for _ in range(2):
+          client_socketTCP = SocketTCP(
+            8, SocketTCP.SELECTIVE_REPEAT, fast_open=True, fast_open_cache=cache,
+            backend=network.host(CLIENT_IP)
+          )
+          client_socketTCP.settimeout(60)
+          client_socketTCP.connect(SERVER_ADDRESS, message)
+          client_socketTCP.close()
+
+      messages, _ = network.run(serve, client)
+
+    self.assertEqual(messages, [message, message])
+    syns = [data for header, data in segments(network, "sent", CLIENT_IP) if header.syn and not header.ack]
+    self.assertNotIn(message, bytes(syns[0]))
+    self.assertIn(message, bytes(syns[-1]))
+
+
+if __name__ == "__main__":
+  unittest.main()
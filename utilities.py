@@ -1,5 +1,95 @@
-from dataclasses import dataclass
+from __future__ import annotations
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import BinaryIO, Callable, Iterable, Iterator
 import socket
+import struct
+import threading
+import weakref
+
+# Los números de secuencia ocupan 32 bits en el header binario, por lo que
+# avanzan módulo SEQ_MODULO y se comparan como números de serie (RFC 1982):
+# uno va antes que otro si este está a menos de media vuelta por delante.
+SEQ_MODULO = 1 << 32
+
+# Formato binario del header TCP: versión, flags, identificador de
+# conexión, identificador de stream, número de secuencia, ventana (en
+# bytes) y largo de los datos, en orden de red.
+BINARY_HEADER = struct.Struct("!BBHHIIH")
+
+# Primer byte de todo segmento en formato binario. Nunca coincide con el
+# primer caracter de un header en texto ("0" o "1"), lo que permite
+# distinguir ambos formatos. Cambia con cada cambio del formato.
+BINARY_HEADER_VERSION = 0xB2
+
+# Flags del header binario
+SYN_FLAG = 0x01
+ACK_FLAG = 0x02
+FIN_FLAG = 0x04
+
+# Flag que indica que el header binario va seguido de un CHECKSUM: el CRC32
+# del header (incluyendo este flag) y de los datos del segmento. No cuenta
+# en el largo del header.
+CHECKSUM_FLAG = 0x08
+CHECKSUM = struct.Struct("!I")
+
+# Marca que un cliente agrega a los datos de su SYN (en texto) para
+# indicar que soporta el formato binario. Un servidor antiguo la ignora.
+BINARY_NEGOTIATION_FLAG = b"BIN"
+
+# Opciones negociadas en el handshake, codificadas como [TIPO][LARGO][VALOR].
+# Viajan en los datos del SYN+ACK, y en los del SYN tras BINARY_NEGOTIATION_FLAG
+# (en hexadecimal, para que un servidor antiguo pueda decodificarlo como texto).
+OPTION_HEADER = struct.Struct("!BB")
+MSS_OPTION = 1
+MSS_VALUE = struct.Struct("!H")
+
+# Opción (sin valor) con que un extremo anuncia que soporta ACKs
+# acumulativos retrasados con bloques SACK. Si ambos la anuncian, cada ACK
+# confirma todo lo anterior a su número de secuencia, y en sus datos lleva
+# la opción SACK_OPTION con los rangos [inicio, fin) recibidos fuera de orden.
+SACK_PERMITTED_OPTION = 2
+SACK_OPTION = 3
+SACK_BLOCK = struct.Struct("!II")
+
+# Opción (sin valor) con que un extremo anuncia que soporta varios streams
+# independientes sobre la conexión, distinguidos por el identificador de
+# stream del header. El stream 0 es la conexión misma.
+STREAMS_OPTION = 4
+
+# Opción con que un cliente pide (sin valor) o presenta (con su valor) una
+# cookie de fast open, y con que el servidor la emite en el SYN+ACK. Con una
+# cookie válida el SYN puede llevar el primer mensaje de la conexión, tras
+# FAST_OPEN_DATA_SEPARATOR, y el servidor indica con FAST_OPEN_DATA_OPTION
+# (sin valor) que lo aceptó.
+FAST_OPEN_OPTION = 5
+FAST_OPEN_DATA_OPTION = 6
+FAST_OPEN_DATA_SEPARATOR = b"|"
+
+# Opción con que el cliente ofrece los algoritmos de compresión que soporta
+# (sus identificadores, uno por byte, en orden de preferencia) y con que el
+# servidor responde el elegido. Con compresión negociada, el segmento con
+# el largo de un mensaje comprimido comienza con COMPRESSED_LENGTH_PREFIX, y
+# sus datos son una secuencia de bloques de COMPRESSION_BLOCK_SIZE bytes
+# originales (salvo el último): [FLAGS][LARGO][LARGO ORIGINAL][DATOS] si sus
+# flags incluyen COMPRESSED_BLOCK_FLAG, o [FLAGS][DATOS] si van sin comprimir.
+COMPRESSION_OPTION = 7
+COMPRESSED_LENGTH_PREFIX = b"z"
+COMPRESSION_BLOCK_SIZE = 1 << 16
+COMPRESSED_BLOCK = struct.Struct("!BII")
+COMPRESSED_BLOCK_FLAG = 0x01
+RAW_BLOCK = struct.Struct("!B")
+
+# Datos del FIN con que un extremo indica que solo dejó de enviar (shutdown)
+# y aún recibe. El otro extremo lo confirma de inmediato con un ACK, en lugar
+# de responder FIN+ACK al leer todo lo recibido. Un extremo antiguo lo ignora
+# y cierra la conexión.
+HALF_CLOSE_FLAG = b"WR"
+
+# Opción (sin valor) con que un extremo anuncia que soporta el checksum de
+# los segmentos. Si ambos la anuncian, todo segmento en formato binario lleva
+# CHECKSUM_FLAG, y los que no lo llevan o no coinciden con él se descartan.
+CHECKSUM_OPTION = 8
 
 class ArgumentsParsingException(Exception):
     pass
@@ -7,7 +97,7 @@ class ArgumentsParsingException(Exception):
 class wrongResponseReceiverException(Exception):
     pass
 
-@dataclass
+@dataclass(slots=True)
 class HeaderTCP:
     """Data Class usada para representar un Header TCP.
 
@@ -18,48 +108,531 @@ class HeaderTCP:
     ack (bool): Mensaje de confirmación.
     fin (bool): Mensaje de termino de comunicación.
     seq (int): Número de secuencia
+    window (int): Ventana anunciada por el emisor del segmento (solo en
+                  formato binario). No se considera al comparar headers.
+    conn_id (int): Identificador de la conexión asignado por el servidor
+                   (solo en formato binario, 0 si no hay). No se considera
+                   al comparar headers.
+    stream_id (int): Identificador del stream de la conexión al que
+                     pertenece el segmento (solo en formato binario, 0 si no
+                     hay). No se considera al comparar headers.
     """
     syn: bool
     ack: bool
     fin: bool
     seq: int
+    window: int = field(default=0, compare=False)
+    conn_id: int = field(default=0, compare=False)
+    stream_id: int = field(default=0, compare=False)
+
+@dataclass
+class PendingHandshake:
+    """Data Class usada para representar un handshake en curso en un
+    socket que escucha: se recibió el SYN y se espera el ACK final.
+
+    Attributes:
+    -----------
+
+    syn_seq (int): Número de secuencia del SYN recibido.
+    syn_ack (bytes): Segmento SYN+ACK enviado, para retransmitirlo.
+    sent_at (float): Momento (time.monotonic) del primer envío del SYN+ACK.
+    deadline (float): Momento en que vence el timer de retransmisión.
+    retransmissions (int): Cantidad de retransmisiones del SYN+ACK.
+    fast_open_length (int): Bytes de datos del SYN aceptados con fast open.
+                            Si es mayor que 0 la conexión ya pasó a la cola
+                            de conexiones por aceptar.
+    """
+    syn_seq: int
+    syn_ack: bytes
+    sent_at: float
+    deadline: float
+    retransmissions: int = 0
+    fast_open_length: int = 0
+
+@dataclass
+class PendingTeardown:
+    """Data Class usada para representar el cierre en curso de una conexión
+    que la aplicación ya no atiende: en FIN_WAIT (tras un close no
+    bloqueante) se retransmite su FIN hasta recibir el FIN+ACK, en LAST_ACK
+    se retransmite su FIN+ACK hasta recibir el ACK final, y en TIME_WAIT se
+    reenvía su ACK final cada vez que el otro extremo retransmite su
+    FIN+ACK, hasta que vence el timer.
+
+    Attributes:
+    -----------
+
+    state (str): Estado de la conexión (SocketTCP.FIN_WAIT, LAST_ACK o
+                 TIME_WAIT).
+    seq (int): Número de secuencia del FIN o FIN+ACK: el propio en FIN_WAIT
+               y LAST_ACK, y el del otro extremo en TIME_WAIT.
+    segment (bytes): Segmento enviado (FIN, FIN+ACK o ACK final), para
+                     reenviarlo.
+    deadline (float): Momento en que vence el timer: el de retransmisión en
+                      FIN_WAIT y LAST_ACK, y el fin de TIME_WAIT.
+    rto (RTOEstimator): Estimador del RTO de la conexión.
+    checksum (bool): Si se negoció checksum en la conexión.
+    connection (Callable[[], object | None]): Referencia a la conexión, para
+                 marcarla cerrada al terminar. Es débil salvo en FIN_WAIT,
+                 donde la conexión construye las respuestas.
+    retransmissions (int): Cantidad de retransmisiones del segmento.
+    """
+    state: str
+    seq: int
+    segment: bytes
+    deadline: float
+    rto: RTOEstimator
+    checksum: bool
+    connection: Callable[[], object | None]
+    retransmissions: int = 0
+
+@dataclass
+class ConnectionStats:
+    """Data Class usada para acumular las métricas de una conexión
+    SocketTCP. Los segmentos y bytes enviados y recibidos cuentan datagramas
+    completos, con sus headers, incluyendo los de control.
+
+    Attributes:
+    -----------
+
+    segments_sent (int): Datagramas enviados.
+    bytes_sent (int): Bytes enviados.
+    segments_received (int): Datagramas recibidos.
+    bytes_received (int): Bytes recibidos.
+    retransmissions (int): Segmentos retransmitidos (de datos o de control).
+    duplicate_segments (int): Segmentos de datos recibidos que ya se habían
+                              recibido.
+    out_of_order_segments (int): Segmentos de datos recibidos antes que
+                                 alguno anterior a ellos.
+    rtt_samples (deque[float]): Últimas muestras de RTT tomadas, en segundos.
+    recv_blocked_time (float): Segundos bloqueados esperando datagramas.
+    handshake_duration (float | None): Segundos que tomó el handshake, None
+                                       si aún no termina.
+    compression_input_bytes (int): Bytes de los mensajes enviados
+                                   comprimidos, antes de comprimirlos.
+    compression_output_bytes (int): Bytes de dichos mensajes una vez
+                                    comprimidos, con sus headers de bloque.
+    corrupted_segments (int): Datagramas recibidos descartados por no
+                              coincidir con su checksum.
+    """
+    segments_sent: int = 0
+    bytes_sent: int = 0
+    segments_received: int = 0
+    bytes_received: int = 0
+    retransmissions: int = 0
+    duplicate_segments: int = 0
+    out_of_order_segments: int = 0
+    rtt_samples: deque[float] = field(default_factory=lambda: deque(maxlen=128))
+    recv_blocked_time: float = 0.0
+    handshake_duration: float | None = None
+    compression_input_bytes: int = 0
+    compression_output_bytes: int = 0
+    corrupted_segments: int = 0
+
+class FastOpenCache:
+    """Caché del lado del cliente con las cookies de fast open emitidas por
+    cada servidor, junto al MSS que este anunció, indexadas por su
+    dirección. Guarda a lo más max_entries servidores, descartando el usado
+    hace más tiempo. Puede compartirse entre hilos.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        """Constructor de FastOpenCache.
+
+        Parameters:
+        -----------
+        max_entries (int): Cantidad máxima de servidores recordados.
+        """
+        self.max_entries: int = max_entries
+        self.__entries: OrderedDict[tuple[str, int], tuple[bytes, int]] = OrderedDict()
+        self.__lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def get(self, address: tuple[str, int]) -> tuple[bytes, int] | None:
+        """Retorna la cookie y el MSS guardados para address, o None si no
+        hay.
+        """
+        with self.__lock:
+            entry = self.__entries.get(address)
+            if entry is not None:
+                self.__entries.move_to_end(address)
+            return entry
+
+    def put(self, address: tuple[str, int], cookie: bytes, mss: int) -> None:
+        """Guarda la cookie emitida por el servidor en address y su MSS."""
+        with self.__lock:
+            self.__entries[address] = (cookie, mss)
+            self.__entries.move_to_end(address)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+
+    def discard(self, address: tuple[str, int]) -> None:
+        """Olvida la cookie del servidor en address, si había una."""
+        with self.__lock:
+            self.__entries.pop(address, None)
+
+class RTOEstimator:
+    """Estimador del tiempo de retransmisión (RTO) de una conexión, según
+    el algoritmo de Jacobson/Karels (RFC 6298). Mantiene un promedio suavizado
+    del RTT (srtt) y de su variación (rttvar), y duplica el RTO cada vez que
+    este vence (backoff exponencial).
+
+    Las muestras de RTT solo deben tomarse de segmentos que no fueron
+    retransmitidos (algoritmo de Karn), lo que es responsabilidad de quien
+    llama a add_sample.
+
+    Attributes:
+    -----------
+
+    rto (float): Tiempo de retransmisión actual, en segundos.
+    srtt (float | None): RTT suavizado, None si no hay muestras.
+    rttvar (float | None): Variación del RTT, None si no hay muestras.
+    samples (deque[float]): Últimas muestras de RTT tomadas, en segundos.
+    """
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+
+    def __init__(self, initial_rto: float = 1.0, min_rto: float = 0.2,
+                 max_rto: float = 60.0, max_samples: int = 128):
+        self.rto: float = initial_rto
+        self.srtt: float | None = None
+        self.rttvar: float | None = None
+        self.samples: deque[float] = deque(maxlen=max_samples)
+        self.__initial_rto = initial_rto
+        self.__min_rto = min_rto
+        self.__max_rto = max_rto
+
+    def add_sample(self, rtt: float) -> None:
+        """Actualiza el estimador con una nueva muestra de RTT, lo que
+        además deshace el backoff acumulado.
+
+        Parameters:
+        -----------
+        rtt (float): Muestra de RTT en segundos.
+        """
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        self.samples.append(rtt)
+        self.rto = min(max(self.srtt + self.K * self.rttvar, self.__min_rto), self.__max_rto)
+
+    def backoff(self) -> None:
+        """Duplica el RTO tras el vencimiento del timer de retransmisión."""
+        self.rto = min(self.rto * 2, self.__max_rto)
+
+    def reset_backoff(self) -> None:
+        """Deshace el backoff acumulado sin tomar una muestra, volviendo al
+        RTO que indican srtt y rttvar (o al inicial, si no hay muestras).
+        Debe llamarse cuando un ACK confirma datos nuevos: por el algoritmo
+        de Karn un ACK de segmentos retransmitidos no es una muestra, pero
+        sí indica que la conexión volvió a avanzar.
+        """
+        if self.srtt is None:
+            self.rto = self.__initial_rto
+        else:
+            self.rto = min(max(self.srtt + self.K * self.rttvar, self.__min_rto), self.__max_rto)
+
+class RingBuffer:
+    """Buffer circular de capacidad fija, usado como buffer de recepción
+    de una conexión: los datos se escriben al final a medida que llegan en
+    orden, y se leen desde el inicio a medida que la aplicación los pide,
+    sin desplazar el resto de los datos.
+
+    Attributes:
+    -----------
+
+    capacity (int): Capacidad del buffer, en bytes.
+    free (int): Espacio libre del buffer, en bytes.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity: int = capacity
+        self.__buffer = bytearray(capacity)
+        self.__view = memoryview(self.__buffer)
+        self.__start: int = 0
+        self.__size: int = 0
+
+    def __len__(self) -> int:
+        return self.__size
+
+    @property
+    def free(self) -> int:
+        return self.capacity - self.__size
+
+    def write(self, data: bytes | memoryview) -> None:
+        """Agrega data al final del buffer.
+
+        Parameters:
+        -----------
+        data (bytes | memoryview): Datos a agregar.
+
+        Raises:
+        -------
+        ValueError: Si los datos no caben en el espacio libre.
+        """
+        length = len(data)
+        if length > self.free:
+            raise ValueError("data does not fit in the ring buffer")
+
+        # Los datos pueden quedar divididos entre el final y el inicio del
+        # arreglo subyacente
+        end = (self.__start + self.__size) % self.capacity
+        first = min(length, self.capacity - end)
+        self.__view[end:end + first] = data[:first]
+        self.__view[:length - first] = data[first:]
+        self.__size += length
+
+    def read_into(self, buffer: memoryview, nbytes: int) -> int:
+        """Copia y descarta a lo más nbytes desde el inicio del buffer.
+
+        Parameters:
+        -----------
+        buffer (memoryview): Vista de bytes escribible donde copiar los datos.
+        nbytes (int): Cantidad máxima de bytes a leer.
+
+        Returns:
+        --------
+        (int): Cantidad de bytes leídos.
+        """
+        nbytes = min(nbytes, self.__size, len(buffer))
+        first = min(nbytes, self.capacity - self.__start)
+        buffer[:first] = self.__view[self.__start:self.__start + first]
+        buffer[first:nbytes] = self.__view[:nbytes - first]
+        self.__start = (self.__start + nbytes) % self.capacity
+        self.__size -= nbytes
+        return nbytes
+
+    def read(self, nbytes: int) -> bytes:
+        """Retorna y descarta a lo más nbytes desde el inicio del buffer.
+
+        Parameters:
+        -----------
+        nbytes (int): Cantidad máxima de bytes a leer.
+
+        Returns:
+        --------
+        (bytes): Datos leídos.
+        """
+        data = bytearray(min(nbytes, self.__size))
+        self.read_into(memoryview(data), len(data))
+        return bytes(data)
+
+class FileMessage:
+    """Mensaje enviado desde un archivo, cuyos datos se leen a medida que se
+    envían, de a trozos de a lo más chunk_size bytes, en lugar de cargarlo
+    completo en memoria.
+
+    Attributes:
+    -----------
+
+    fileobj (BinaryIO): Archivo abierto en modo binario, posicionado al
+                        inicio del mensaje.
+    size (int): Largo del mensaje, en bytes.
+    chunk_size (int): Tamaño máximo de cada lectura, en bytes.
+    """
+
+    def __init__(self, fileobj: BinaryIO, size: int, chunk_size: int):
+        self.fileobj: BinaryIO = fileobj
+        self.size: int = size
+        self.chunk_size: int = chunk_size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def chunks(self) -> Iterator[memoryview]:
+        """Lee el mensaje desde el archivo de a un trozo por vez. Cada trozo
+        es un buffer nuevo, pues los segmentos en vuelo son vistas de él.
+
+        Returns:
+        --------
+        (Iterator[memoryview]): Trozos del mensaje, en orden.
+
+        Raises:
+        -------
+        EOFError: Si el archivo se acaba antes de leer size bytes.
+        """
+        read = 0
+        while read < self.size:
+            chunk = self.fileobj.read(min(self.chunk_size, self.size - read))
+            if not chunk:
+                raise EOFError("File shrank while it was being sent")
+            read += len(chunk)
+            yield memoryview(chunk)
+
+def encode_options(options: dict[int, bytes]) -> bytes:
+    """Codifica las opciones del handshake como una secuencia de
+    [TIPO][LARGO][VALOR].
+
+    Parameters:
+    -----------
+    options (dict[int, bytes]): Valor de cada opción, indexado por su tipo.
+
+    Returns:
+    --------
+    (bytes): Opciones codificadas.
+    """
+    return b"".join(
+        OPTION_HEADER.pack(kind, len(value)) + value for kind, value in options.items()
+    )
+
+def parse_options(data: bytes | memoryview) -> dict[int, bytes]:
+    """Decodifica las opciones del handshake codificadas con encode_options.
+    Las opciones truncadas se ignoran.
+
+    Parameters:
+    -----------
+    data (bytes | memoryview): Opciones codificadas.
+
+    Returns:
+    --------
+    (dict[int, bytes]): Valor de cada opción, indexado por su tipo.
+    """
+    options = {}
+    offset = 0
+    while offset + OPTION_HEADER.size <= len(data):
+        kind, length = OPTION_HEADER.unpack_from(data, offset)
+        offset += OPTION_HEADER.size
+        if offset + length > len(data):
+            break
+        options[kind] = bytes(data[offset:offset + length])
+        offset += length
+    return options
+
+def encode_sack(blocks: list[tuple[int, int]]) -> bytes:
+    """Codifica bloques SACK como los datos de un ACK.
+
+    Parameters:
+    -----------
+    blocks (list[tuple[int, int]]): Rangos [inicio, fin) recibidos.
+
+    Returns:
+    --------
+    (bytes): Opción SACK_OPTION con los bloques, o b"" si no hay bloques.
+    """
+    if not blocks:
+        return b""
+    return encode_options({
+        SACK_OPTION: b"".join(SACK_BLOCK.pack(start, end) for start, end in blocks)
+    })
+
+def parse_sack(data: bytes | memoryview) -> list[tuple[int, int]]:
+    """Decodifica los bloques SACK de los datos de un ACK.
+
+    Parameters:
+    -----------
+    data (bytes | memoryview): Datos del ACK.
+
+    Returns:
+    --------
+    (list[tuple[int, int]]): Rangos [inicio, fin) recibidos por el otro extremo.
+    """
+    value = parse_options(data).get(SACK_OPTION, b"")
+    usable = len(value) - len(value) % SACK_BLOCK.size
+    return list(SACK_BLOCK.iter_unpack(value[:usable]))
+
+def seq_add(seq: int, n: int) -> int:
+    """Retorna el número de secuencia que está n bytes por delante de seq
+    (o por detrás, si n es negativo), módulo SEQ_MODULO.
+
+    Parameters:
+    -----------
+    seq (int): Número de secuencia.
+    n (int): Cantidad de bytes a avanzar.
+
+    Returns:
+    --------
+    (int): Número de secuencia resultante.
+    """
+    return (seq + n) % SEQ_MODULO
+
+def seq_diff(a: int, b: int) -> int:
+    """Retorna cuántos bytes está el número de secuencia a por delante de
+    b, o un valor negativo si está por detrás, suponiendo que ambos están a
+    menos de media vuelta (SEQ_MODULO / 2) el uno del otro.
+
+    Parameters:
+    -----------
+    a (int): Número de secuencia.
+    b (int): Número de secuencia de referencia.
+
+    Returns:
+    --------
+    (int): Distancia con signo de b a a.
+    """
+    return (a - b + SEQ_MODULO // 2) % SEQ_MODULO - SEQ_MODULO // 2
+
+def split_chunks(chunks: Iterable[bytes | memoryview], size: int) -> Iterator[memoryview]:
+    """Reparte datos que llegan de a trozos en partes de size bytes, salvo
+    la última, que puede ser menor. Las partes contenidas en un trozo son
+    vistas de él, y solo se copian las que quedan entre dos trozos.
+
+    Parameters:
+    -----------
+    chunks (Iterable[bytes | memoryview]): Trozos de datos, en orden.
+    size (int): Tamaño de cada parte, en bytes.
+
+    Returns:
+    --------
+    (Iterator[memoryview]): Partes de los datos, en orden.
+    """
+    pending = bytearray()
+    for chunk in chunks:
+        view = memoryview(chunk)
+
+        # Completamos la parte que quedó pendiente del trozo anterior
+        if pending:
+            taken = size - len(pending)
+            pending += view[:taken]
+            view = view[taken:]
+            if len(pending) < size:
+                continue
+            yield memoryview(bytes(pending))
+            pending.clear()
+
+        full = len(view) - len(view) % size
+        for offset in range(0, full, size):
+            yield view[offset:offset + size]
+        pending += view[full:]
+    if pending:
+        yield memoryview(bytes(pending))
+
+# FramedSocket de cada conexión que usa receive_full_mesage, junto a su
+# secuencia de fin de mensaje. Se descarta al liberarse la conexión.
+_framed_sockets: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_framed_sockets_lock: threading.Lock = threading.Lock()
 
 # Función reciclada de la primera actividad del semestre
 def receive_full_mesage(connection_socket, buff_size: int, end_of_message: str) -> str:
-    from socketTCP import SocketTCP
+    from framing import DelimiterFramer, FramedSocket, StrCodec
     # esta función se encarga de recibir el mensaje completo desde el cliente
     # en caso de que el mensaje sea más grande que el tamaño del buffer 'buff_size', esta función va esperar a que
-    # llegue el resto
+    # llegue el resto. La secuencia de fin de mensaje se busca de forma incremental (sin volver a revisar lo
+    # ya recibido), y el mensaje se decodifica completo, por lo que no importa si un caracter de varios bytes
+    # queda dividido entre dos trozos. Cada conexión usa siempre el mismo framing.FramedSocket, de modo que
+    # los bytes recibidos tras la secuencia de fin de mensaje quedan para la siguiente llamada.
+    with _framed_sockets_lock:
+        delimiter, framed_socket = _framed_sockets.get(connection_socket, (end_of_message, None))
+        if delimiter != end_of_message:
+            raise ValueError("end_of_message must be the same in every call on a connection")
+        if framed_socket is None:
+            # El FramedSocket referencia a la conexión a través de un proxy,
+            # pues si no la mantendría viva en _framed_sockets
+            framed_socket = FramedSocket(
+                weakref.proxy(connection_socket), DelimiterFramer(end_of_message.encode()), StrCodec(),
+                buff_size
+            )
+            _framed_sockets[connection_socket] = (end_of_message, framed_socket)
+    full_message = framed_socket.recv()
 
-    # recibimos la primera parte del mensaje
-    buffer = connection_socket.recv(buff_size)
-    full_message = buffer.decode()
-
-    # verificamos si llegó el mensaje completo o si aún faltan partes del mensaje
-    is_end_of_message = contains_end_of_message(full_message, end_of_message)
-
-    # si el mensaje llegó completo (o sea que contiene la secuencia de fin de mensaje) removemos la secuencia de fin de mensaje
-    if is_end_of_message:
-        full_message = full_message[0:(len(full_message) - len(end_of_message))]
-
-    # si el mensaje no está completo (no contiene la secuencia de fin de mensaje)
-    else:
-        # entramos a un while para recibir el resto y seguimos esperando información
-        # mientras el buffer no contenga secuencia de fin de mensaje
-        while not is_end_of_message:
-            # recibimos un nuevo trozo del mensaje
-            buffer = connection_socket.recv(buff_size)
-            # y lo añadimos al mensaje "completo"
-            full_message += buffer.decode()
-
-            # verificamos si es la última parte del mensaje
-            is_end_of_message = contains_end_of_message(full_message, end_of_message)
-            if is_end_of_message:
-                # removemos la secuencia de fin de mensaje
-                full_message = full_message[0:(len(full_message) - len(end_of_message))]
-
-    # finalmente retornamos el mensaje
-    return full_message
+    # finalmente retornamos el mensaje (vacío si se cerró la conexión)
+    return "" if full_message is None else full_message
 
 def contains_end_of_message(message: str, end_sequence: str) -> bool:
     if end_sequence == message[(len(message) - len(end_sequence)):len(message)]: